@@ -1,115 +1,647 @@
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
 from planner import GoalPlanner
-from tools.search import LeadSearcher
-from tools.write_email import EmailWriter
-from tools.send_email import EmailSender
+from tools.registry import ToolRegistry
 from memory.storage import MemoryStorage
-import time
+from memory.outbox import DRY_RUN, Outbox, OutboxItem
+from memory.runs import COMPLETED, FAILED, RUNNING, RunStore
+from metrics import Metrics, NullMetrics
+from events import EMAILS_RENDERED, EMAILS_SENT, LEADS_FOUND, RUN_STARTED, STEP, EventBus
+from pipeline import Channel
+from scheduler import StepScheduler
+from itertools import islice
+import os
+import threading
+import uuid
+
+if TYPE_CHECKING:
+    from profiling import StepProfiler
+    from tools.search import LeadSearcher
+    from tools.send_email import EmailSender
+    from tools.summarize import CompanySummarizer
+    from tools.write_email import EmailWriter
+
+# Tools that can run as stages of a streaming pipeline
+STREAMING_TOOLS = {"search", "summarize", "write_email", "send_email"}
 
 class AgentSender:
-    def __init__(self, tone: str = "professional"):
+    def __init__(self, tone: str = "professional", memory: Optional[MemoryStorage] = None,
+                 outbox: Optional[Outbox] = None, dedup: bool = True,
+                 sender: Optional["EmailSender"] = None, metrics: Optional[Metrics] = None,
+                 profiler: Optional["StepProfiler"] = None, runs: Optional[RunStore] = None,
+                 events: Optional[EventBus] = None, dedup_dir: Optional[str] = None):
+        self.memory = memory if memory is not None else MemoryStorage()
+        # Run state is checkpointed at every step transition so an
+        # interrupted run can be resumed
+        self.runs = runs if runs is not None else RunStore(os.path.join(self.memory.logs_dir, "runs"))
+        # Timings and counters; a no-op unless a Metrics instance is passed
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.metrics.collect("storage_bytes_written_total", lambda: self.memory.bytes_written,
+                             kind="counter", help="Bytes of records written to storage")
+        # Step, lead, render and send events; progress is read from its counters
+        self.events = events if events is not None else EventBus()
+        # When set, run() profiles each step on its own
+        self.profiler = profiler
         self.planner = GoalPlanner()
-        self.searcher = LeadSearcher()
-        self.writer = EmailWriter()
-        self.sender = EmailSender()
-        self.memory = MemoryStorage()
+        # Leads emailed by any earlier run are neither stored nor emailed
+        # again. A lead is added to the index once an email to it is sent,
+        # so a run that fails before sending loses no leads. The index lives
+        # in dedup_dir (default <logs_dir>/dedup)
+        self.dedup = dedup
+        self.dedup_dir = dedup_dir or os.path.join(self.memory.logs_dir, "dedup")
+        # Tools are imported and built the first time a step needs them
+        self.tools = ToolRegistry()
+        self.tools.register("search", self._make_searcher)
+        self.tools.register("summarize", self._make_summarizer)
+        self.tools.register("write_email", self._make_writer)
+        self.tools.register("send_email", self._make_sender)
+        if sender is not None:
+            self.tools.set("send_email", sender)
+        self.outbox = outbox if outbox is not None else Outbox(os.path.join(self.memory.logs_dir, "outbox.db"))
+        self.run_id = None
         self.current_goal = None
         self.current_steps = []
         self.leads = []
         self.emails = []
+        # Leads and emails of each goal segment, keyed by segment index
+        self.segment_leads = {}
+        self.segment_emails = {}
+        self.stage_progress = {}
+        self._state_lock = threading.Lock()
+        # Set while running a resumed run, whose searches may have saved
+        # leads before the interruption
+        self._resumed = False
+        # Lead lists at least this long are rendered on a process pool and
+        # streamed straight into storage instead of being kept in memory
+        self.shard_threshold = 50000
+        self.shard_chunk_size = 10000
+        self.shard_workers = None
         self.tone = tone
     
+    @property
+    def searcher(self) -> "LeadSearcher":
+        return self.tools.get("search")
+    
+    @searcher.setter
+    def searcher(self, searcher: "LeadSearcher"):
+        self.tools.set("search", searcher)
+    
+    @property
+    def summarizer(self) -> "CompanySummarizer":
+        return self.tools.get("summarize")
+    
+    @summarizer.setter
+    def summarizer(self, summarizer: "CompanySummarizer"):
+        self.tools.set("summarize", summarizer)
+    
+    @property
+    def writer(self) -> "EmailWriter":
+        return self.tools.get("write_email")
+    
+    @writer.setter
+    def writer(self, writer: "EmailWriter"):
+        self.tools.set("write_email", writer)
+    
+    @property
+    def sender(self) -> "EmailSender":
+        return self.tools.get("send_email")
+    
+    @sender.setter
+    def sender(self, sender: "EmailSender"):
+        self.tools.set("send_email", sender)
+    
+    def _dedup_index(self, name: str):
+        from memory.dedup import shared_index
+        bloom_capacity = int(os.getenv("LEAD_DEDUP_BLOOM_CAPACITY", 0)) or None
+        return shared_index(os.path.join(self.dedup_dir, name), bloom_capacity)
+    
+    def _make_searcher(self) -> "LeadSearcher":
+        from tools.search import LeadSearcher
+        from tools.search_cache import SearchCache
+        search_cache = SearchCache(
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", 3600)),
+            disk_path=os.path.join(self.memory.logs_dir, "cache", "search.db")
+        )
+        # Comma-separated candidate pages to scrape instead of the mock leads
+        source_urls = [url.strip() for url in os.getenv("LEAD_SOURCE_URLS", "").split(",") if url.strip()]
+        source = None
+        if source_urls:
+            from tools.lead_sources import WebLeadSource
+            source = WebLeadSource(source_urls)
+        lead_index = self._dedup_index("contacted") if self.dedup else None
+        return LeadSearcher(lead_index, cache=search_cache, source=source)
+    
+    def _make_summarizer(self) -> "CompanySummarizer":
+        from tools.summarize import summarizer_from_env
+        return summarizer_from_env(os.path.join(self.memory.logs_dir, "cache", "summaries.db"))
+    
+    def _make_writer(self) -> "EmailWriter":
+        from tools.llm_writer import personalizer_from_env
+        from tools.write_email import EmailWriter
+        # Off unless EMAIL_PERSONALIZE is set; drafts are cached across runs
+        personalizer = personalizer_from_env(os.path.join(self.memory.logs_dir, "cache", "drafts.db"))
+        return EmailWriter(dedup_index=self._dedup_index("contacted") if self.dedup else None,
+                           personalizer=personalizer)
+    
+    def _make_sender(self) -> "EmailSender":
+        from tools.send_email import EmailSender
+        return EmailSender()
+    
     def set_goal(self, goal: str, tone: str = None):
         """Set a new goal and break it down into steps."""
         self.current_goal = goal
         if tone:
             self.tone = tone
+        self.run_id = uuid.uuid4().hex
         self.current_steps = self.planner.break_down_goal(goal)
+        self.leads = []
+        self.emails = []
+        self.segment_leads = {}
+        self.segment_emails = {}
+        self.stage_progress = {}
+        self._resumed = False
         
         # Log the initial goal and steps
         self.memory.save_step({
             "type": "goal_set",
             "goal": goal,
             "steps": self.current_steps
-        })
+        }, run_id=self.run_id)
+        self.memory.flush()
+        self._checkpoint()
+        self.events.publish(RUN_STARTED, self.run_id, goal=goal, total_steps=len(self.current_steps))
+    
+    def load_run(self, run_id: str):
+        """
+        Restore an earlier run from its last checkpoint so run() can finish it.
+        
+        Completed steps are kept and skipped; steps that were running or
+        failed are retried. Leads and emails are reloaded from storage for
+        this run only.
+        
+        Args:
+            run_id (str): Run to restore
+        Raises:
+            KeyError: If the run has no checkpoint
+        """
+        state = self.runs.load(run_id)
+        self.run_id = run_id
+        self.current_goal = state["goal"]
+        self.tone = state.get("tone") or self.tone
+        self.current_steps = state["steps"]
+        for step in self.current_steps:
+            if step["status"] != "completed":
+                step["status"] = "pending"
+                step.pop("error", None)
+                step.pop("result", None)
+        self.leads = []
+        self.emails = []
+        self.segment_leads = {}
+        self.segment_emails = {}
+        self.stage_progress = {}
+        self._resumed = True
+        
+        segment_leads, segment_emails = {}, {}
+        for lead in self.memory.iter_leads({"run_id": run_id}):
+            segment_leads.setdefault(lead.get("segment", 0), []).append(_unscoped(lead))
+        for email in self.memory.iter_emails({"run_id": run_id}):
+            segment_emails.setdefault(email.get("segment", 0), []).append(_unscoped(email))
+        # Summaries live in the summarize step's result, not on the stored leads
+        summaries = {}
+        for step in self.current_steps:
+            if step["tool"] == "summarize" and step["status"] == "completed":
+                summaries.setdefault(step.get("segment", 0), {}).update(
+                    (step.get("result") or {}).get("summaries") or {})
+        if summaries:
+            from tools.summarize import apply_summaries
+            for segment, leads in segment_leads.items():
+                if summaries.get(segment):
+                    segment_leads[segment] = apply_summaries(leads, summaries[segment])
+        for segment, leads in segment_leads.items():
+            self._set_segment_leads(segment, leads)
+        for segment, emails in segment_emails.items():
+            self._set_segment_emails(segment, emails)
+        
+        self.memory.save_step({"type": "run_resumed", "goal": self.current_goal}, run_id=run_id)
+        self._checkpoint()
+        completed = sum(1 for step in self.current_steps if step["status"] == "completed")
+        self.events.publish(RUN_STARTED, run_id, goal=self.current_goal, total_steps=len(self.current_steps),
+                            steps={"completed": completed, "pending": len(self.current_steps) - completed},
+                            resumed=True)
+    
+    def resume(self, run_id: str, **run_options) -> List[Dict]:
+        """
+        Finish an interrupted run: restore it with load_run, then run the
+        steps it had not completed.
+        
+        Args:
+            run_id (str): Run to resume
+            **run_options: Passed on to run() (e.g. streaming=True)
+        Returns:
+            List[Dict]: Results of the steps that ran, in plan order
+        """
+        self.load_run(run_id)
+        return self.run(**run_options)
+    
+    def _publish_step(self, step: Dict, previous: str):
+        self.events.publish(STEP, self.run_id, step_id=step["step_id"], tool=step["tool"],
+                            segment=step.get("segment", 0), status=step["status"], previous=previous,
+                            error=step.get("error"))
+    
+    def _checkpoint(self, status: str = RUNNING):
+        self.runs.save(self.run_id, self.current_goal, self.tone, self.current_steps, status=status)
+    
+    def _finish_run(self):
+        """Checkpoint the run as completed, or failed if any step failed."""
+        self.memory.flush()
+        done = all(step["status"] == "completed" for step in self.current_steps)
+        self._checkpoint(COMPLETED if done else FAILED)
     
     def execute_step(self, step: Dict) -> Dict:
         """Execute a single step and return the result."""
+        previous = step["status"]
         step["status"] = "in_progress"
-        self.memory.save_step(step)
+        self.memory.save_step(step, run_id=self.run_id)
+        self._checkpoint()
+        self._publish_step(step, previous)
         
-        try:
-            if step["tool"] == "search":
-                self.leads = self.searcher.search_leads(step["description"])
-                self.memory.save_leads(self.leads)
-                result = self.leads
-            elif step["tool"] == "write_email":
-                if not self.leads:
-                    self.leads = self.memory.get_all_leads()
-                self.emails = self.writer.write_emails(self.leads, tone=self.tone)
-                for email in self.emails:
-                    self.memory.save_email(email)
-                result = self.emails
-            elif step["tool"] == "send_email":
-                if not self.emails:
-                    self.emails = self.memory.get_all_emails()
-                send_results = self.sender.send_emails(self.emails)
-                for res in send_results:
-                    self.memory.save_step({"type": "email_send_result", **res})
-                result = send_results
-            else:
-                result = {"error": f"Tool {step['tool']} not implemented yet"}
+        segment = step.get("segment", 0)
+        metrics = self.metrics
+        with metrics.span("step", tool=step["tool"]):
+            try:
+                if step["tool"] == "search":
+                    with metrics.span("tool", tool="search"):
+                        leads = self.searcher.search_leads(step["description"])
+                    # A retried search finds the leads an interrupted attempt
+                    # already saved again; keep those from storage
+                    stored = self.segment_leads.get(segment, [])
+                    if stored:
+                        known = {lead.get("email") for lead in stored}
+                        leads = [lead for lead in leads if lead.get("email") not in known]
+                    metrics.inc("leads_found_total", len(leads))
+                    self.events.publish(LEADS_FOUND, self.run_id, segment=segment, count=len(leads))
+                    self.memory.save_leads([{**lead, "segment": segment} for lead in leads], run_id=self.run_id)
+                    leads = stored + leads
+                    self._set_segment_leads(segment, leads)
+                    result = leads
+                elif step["tool"] == "summarize":
+                    leads = self._leads_for_segment(segment)
+                    with metrics.span("tool", tool="summarize"):
+                        summaries = self.summarizer.summarize(leads)
+                    metrics.inc("companies_summarized_total", len(summaries))
+                    from tools.summarize import apply_summaries
+                    self._set_segment_leads(segment, apply_summaries(leads, summaries))
+                    result = {"companies": len(summaries), "leads": len(leads), "summaries": summaries}
+                elif step["tool"] == "write_email":
+                    leads = self._leads_for_segment(segment)
+                    # As with search, leads an interrupted attempt already
+                    # wrote to are not written to again
+                    stored = self.segment_emails.get(segment, [])
+                    if stored:
+                        written = {email.get("to") for email in stored}
+                        leads = [lead for lead in leads if lead.get("email") not in written]
+                    if len(leads) >= self.shard_threshold:
+                        # Emails go to storage shard by shard; the send step
+                        # picks them up from there
+                        with metrics.span("tool", tool="write_email"):
+                            written = self.writer.write_emails_sharded(
+                                leads, lambda emails: self._store_emails(emails, segment), tone=self.tone,
+                                chunk_size=self.shard_chunk_size, workers=self.shard_workers
+                            )
+                        metrics.inc("emails_rendered_total", written)
+                        self.events.publish(EMAILS_RENDERED, self.run_id, segment=segment, count=written)
+                        self._set_segment_emails(segment, [])
+                        result = {"emails_written": written}
+                    else:
+                        with metrics.span("tool", tool="write_email"):
+                            emails = self.writer.write_emails(leads, tone=self.tone)
+                        metrics.inc("emails_rendered_total", len(emails))
+                        self.events.publish(EMAILS_RENDERED, self.run_id, segment=segment, count=len(emails))
+                        self._store_emails(emails, segment)
+                        emails = stored + emails
+                        self._set_segment_emails(segment, emails)
+                        result = emails
+                elif step["tool"] == "send_email":
+                    emails = self.segment_emails.get(segment)
+                    if not emails:
+                        # Sharded writes keep their emails in storage only
+                        emails = (_unscoped(email) for email in
+                                  self.memory.iter_emails({"run_id": self.run_id, "segment": segment}))
+                    result = self._send_emails(emails, segment)
+                else:
+                    result = {"error": f"Tool {step['tool']} not implemented yet"}
             
-            step["status"] = "completed"
-            step["result"] = result
+                step["status"] = "completed"
+                step["result"] = result
             
-        except Exception as e:
-            step["status"] = "failed"
-            step["error"] = str(e)
-            result = {"error": str(e)}
+            except Exception as e:
+                step["status"] = "failed"
+                step["error"] = str(e)
+                result = {"error": str(e)}
+        metrics.inc("steps_total", tool=step["tool"], status=step["status"])
         
-        self.memory.save_step(step)
+        self.memory.save_step(step, run_id=self.run_id)
+        # Records are written in batches; make each finished step durable
+        # before its checkpoint says it is done
+        self.memory.flush()
+        self._checkpoint()
+        self._publish_step(step, "in_progress")
         return result
     
-    def run(self) -> List[Dict]:
-        """Run the agent loop until all steps are completed."""
+    def _fail_step(self, step: Dict, error: str):
+        """Mark a step failed without running it."""
+        previous = step["status"]
+        step["status"] = "failed"
+        step["error"] = error
+        step["result"] = {"error": error}
+        self.memory.save_step(step, run_id=self.run_id)
+        self._checkpoint()
+        self._publish_step(step, previous)
+    
+    def _leads_for_segment(self, segment: int) -> List[Dict]:
+        """This segment's leads, reloaded from this run's storage if not in memory."""
+        leads = self.segment_leads.get(segment)
+        if not leads:
+            leads = self.memory.get_leads_for_run(self.run_id)
+            leads = [lead for lead in leads if lead.get("segment", 0) == segment]
+            self._set_segment_leads(segment, leads)
+        return leads
+    
+    def _set_segment_leads(self, segment: int, leads: List[Dict]):
+        with self._state_lock:
+            self.segment_leads[segment] = leads
+            self.leads = [lead for key in sorted(self.segment_leads) for lead in self.segment_leads[key]]
+    
+    def _set_segment_emails(self, segment: int, emails: List[Dict]):
+        with self._state_lock:
+            self.segment_emails[segment] = emails
+            self.emails = [email for key in sorted(self.segment_emails) for email in self.segment_emails[key]]
+    
+    def _store_emails(self, emails: List[Dict], segment: int = 0):
+        """Save generated emails; the send step queues them for sending."""
+        self.memory.save_emails([{**email, "segment": segment} for email in emails], run_id=self.run_id)
+    
+    def _send_emails(self, emails: Iterable[Dict], segment: int = 0, chunk_size: int = 10000) -> List[Dict]:
+        """
+        Send this segment's emails through the outbox and record each result.
+        
+        In a dry run the emails are only built: nothing goes into the
+        outbox or the dedup index, so a later real run still sends them.
+        """
+        emails = iter(emails)
+        leads = {}
+        if getattr(self.sender, "dry_run", False):
+            delivered = []
+            with self.metrics.span("tool", tool="send_email"):
+                for chunk in iter(lambda: list(islice(emails, chunk_size)), []):
+                    results = self.sender.send_emails(chunk)
+                    delivered.extend((OutboxItem(None, self.run_id, email, 0), res)
+                                     for email, res in zip(chunk, results))
+            return self._record_deliveries(delivered)
+        # Already-sent emails are skipped by their idempotency key, and
+        # anything this segment left outstanding before an interruption is
+        # sent too. Mail other runs left queued is not touched (see flush_outbox).
+        for chunk in iter(lambda: list(islice(emails, chunk_size)), []):
+            self.outbox.enqueue(chunk, run_id=self.run_id, segment=segment)
+            leads.update((email["to"], email["lead"]) for email in chunk if isinstance(email.get("lead"), dict))
+        with self.metrics.span("tool", tool="send_email"):
+            delivered = self.sender.deliver_outbox(self.outbox, run_id=self.run_id, segment=segment)
+        return self._record_deliveries(delivered, leads)
+    
+    def flush_outbox(self) -> List[Dict]:
+        """
+        Send everything still queued in the outbox, whichever run queued it
+        (e.g. mail of runs that failed and won't be resumed). Results are
+        recorded under the run each email belongs to.
+        """
+        with self.metrics.span("tool", tool="send_email"):
+            delivered = self.sender.deliver_outbox(self.outbox)
+        return self._record_deliveries(delivered)
+    
+    def _record_deliveries(self, delivered: List, leads: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """
+        Save send results under their runs, and add every lead that was
+        emailed to the dedup index. ``leads`` (by address) supply the full
+        lead for its fuzzy key; other recipients are added by address.
+        """
+        leads = leads or {}
+        send_results = []
+        outcomes = {}
+        contacted = []
+        for item, res in delivered:
+            self.memory.save_send_result(res, run_id=item.run_id)
+            status = res.get("status", "unknown")
+            self.metrics.inc("emails_sent_total", status=status)
+            counts = outcomes.setdefault(item.run_id, {"sent": 0, "failed": 0, "dry_run": 0})
+            if status == "sent":
+                counts["sent"] += 1
+                if self.dedup:
+                    contacted.append(leads.get(res["to"]) or {"email": res["to"]})
+            elif status == DRY_RUN:
+                counts["dry_run"] += 1
+            else:
+                counts["failed"] += 1
+            send_results.append(res)
+        if contacted:
+            self._dedup_index("contacted").add_many(contacted)
+        for run_id, counts in outcomes.items():
+            self.events.publish(EMAILS_SENT, run_id, **counts)
+        return send_results
+    
+    def run(self, streaming: bool = False, queue_size: int = 100, send_batch_size: int = 50,
+            max_workers: int = 4) -> List[Dict]:
+        """
+        Run the agent loop until all steps are completed.
+        
+        Steps run as soon as the steps they depend on have completed, up to
+        ``max_workers`` at a time, so independent goal segments proceed side
+        by side. Results are returned in plan order.
+        
+        Args:
+            streaming (bool): Run the steps as a pipeline instead of one after
+                another; see run_streaming
+            queue_size (int): Items buffered between streaming stages
+            send_batch_size (int): Most emails handed to the sender at once
+                in streaming mode
+            max_workers (int): Most steps running at the same time; always 1
+                while a profiler is set, so each profile covers one step only
+        """
         if not self.current_goal:
             raise ValueError("No goal set. Call set_goal() first.")
+        if streaming:
+            if self.profiler is not None:
+                raise ValueError("Profiling runs steps one at a time; it can't be combined with streaming")
+            return self.run_streaming(queue_size=queue_size, send_batch_size=send_batch_size)
         
-        results = []
-        while self.current_steps:
-            # Get the next pending step
-            next_step = next(
-                (step for step in self.current_steps if step["status"] == "pending"),
-                None
-            )
-            
-            if not next_step:
-                break
-            
-            # Execute the step
-            result = self.execute_step(next_step)
-            results.append(result)
-            
-            # Add a small delay between steps
-            time.sleep(1)
+        execute = self.execute_step
+        if self.profiler is not None:
+            execute = self._execute_profiled
+            max_workers = 1
+        pending = [step["step_id"] for step in self.current_steps if step["status"] == "pending"]
+        scheduler = StepScheduler(self.current_steps, execute, self._fail_step,
+                                  max_workers=max_workers)
+        results = scheduler.run()
+        self._finish_run()
+        return [results[step_id] for step_id in pending]
+    
+    def _execute_profiled(self, step: Dict) -> Dict:
+        with self.profiler.profile(step, self.run_id):
+            return self.execute_step(step)
+    
+    def run_streaming(self, queue_size: int = 100, send_batch_size: int = 50) -> List[Dict]:
+        """
+        Run all pending steps concurrently as a streaming pipeline.
+        
+        Each step runs on its own thread and passes items to the next step
+        of its goal segment through a bounded channel as soon as they are
+        produced: leads flow from search into write_email and emails into
+        send_email, which sends whatever has queued up (at most
+        ``send_batch_size``) at once. Full channels block the producer, so
+        memory stays flat however many leads there are. Items are saved as
+        they pass, but not kept on the agent. Segments run side by side and
+        a failure only stops its own segment.
+        
+        Returns:
+            List[Dict]: One summary per step with the number of items it produced
+        """
+        steps = [step for step in self.current_steps if step["status"] == "pending"]
+        if not steps:
+            return []
         
-        return results
+        self.stage_progress = {
+            step["step_id"]: {"tool": step["tool"], "status": "pending", "processed": 0}
+            for step in steps
+        }
+        segments = {}
+        for step in steps:
+            segments.setdefault(step.get("segment", 0), []).append(step)
+        
+        threads = []
+        for segment_steps in segments.values():
+            stop = threading.Event()
+            channels = [Channel(queue_size, stop) for _ in segment_steps[1:]]
+            for i, step in enumerate(segment_steps):
+                inbox = channels[i - 1] if i > 0 else None
+                outbox = channels[i] if i < len(channels) else None
+                threads.append(threading.Thread(
+                    target=self._run_stage, args=(step, inbox, outbox, stop, send_batch_size),
+                    name=f"stage-{step['step_id']}-{step['tool']}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self._finish_run()
+        return [step["result"] for step in steps]
+    
+    def _stage_inbox(self, inbox: Optional[Channel], segment: int) -> Iterable[Dict]:
+        """Leads for a lead-consuming stage."""
+        if inbox is None and self._resumed:
+            # The stage before finished before the interruption; its leads are in storage
+            return (_unscoped(lead) for lead in
+                    self.memory.iter_leads({"run_id": self.run_id, "segment": segment}))
+        return inbox if inbox is not None else ()
+    
+    def _stage_items(self, step: Dict, inbox: Optional[Channel], send_batch_size: int) -> Iterator:
+        """Items produced by one streaming stage."""
+        segment = step.get("segment", 0)
+        if step["tool"] == "search":
+            seen = set()
+            if self._resumed:
+                # Leads saved before the interruption are deduplicated away
+                # by a new search (or found again); pass them on from storage
+                for lead in self.memory.iter_leads({"run_id": self.run_id, "segment": segment}):
+                    seen.add(lead.get("email"))
+                    yield _unscoped(lead)
+            for lead in self.searcher.stream_leads(step["description"]):
+                if seen and lead.get("email") in seen:
+                    continue
+                self.memory.save_leads([{**lead, "segment": segment}], run_id=self.run_id)
+                self.metrics.inc("leads_found_total")
+                self.events.publish(LEADS_FOUND, self.run_id, segment=segment, count=1)
+                yield lead
+        elif step["tool"] == "summarize":
+            leads = self._stage_inbox(inbox, segment)
+            yield from self.summarizer.stream(leads)
+        elif step["tool"] == "write_email":
+            leads = self._stage_inbox(inbox, segment)
+            if self._resumed:
+                # Emails written before the interruption are passed on from
+                # storage rather than written again
+                written = set()
+                for email in self.memory.iter_emails({"run_id": self.run_id, "segment": segment}):
+                    written.add(email.get("to"))
+                    yield _unscoped(email)
+                if written:
+                    leads = (lead for lead in leads if lead.get("email") not in written)
+            for email in self.writer.stream_emails(leads, tone=self.tone):
+                self.memory.save_emails([{**email, "segment": segment}], run_id=self.run_id)
+                self.metrics.inc("emails_rendered_total")
+                self.events.publish(EMAILS_RENDERED, self.run_id, segment=segment, count=1)
+                yield email
+        elif step["tool"] == "send_email":
+            if inbox is None:
+                # The stage before finished before the interruption; its emails are in storage
+                yield from self._send_emails((_unscoped(email) for email in
+                                              self.memory.iter_emails({"run_id": self.run_id, "segment": segment})),
+                                             segment)
+            else:
+                for batch in inbox.batches(send_batch_size):
+                    yield from self._send_emails(batch, segment)
+        elif inbox is not None:
+            # Unknown tools pass items through untouched, as the batch loop
+            # moves past them
+            yield from inbox
+    
+    def _run_stage(self, step: Dict, inbox: Optional[Channel], outbox: Optional[Channel],
+                   stop: threading.Event, send_batch_size: int):
+        progress = self.stage_progress[step["step_id"]]
+        previous = step["status"]
+        step["status"] = progress["status"] = "in_progress"
+        self.memory.save_step(step, run_id=self.run_id)
+        self._checkpoint()
+        self._publish_step(step, previous)
+        try:
+            with self.metrics.span("step", tool=step["tool"]):
+                for item in self._stage_items(step, inbox, send_batch_size):
+                    progress["processed"] += 1
+                    if outbox is not None and not outbox.put(item):
+                        break
+            if stop.is_set():
+                raise RuntimeError("Pipeline stopped because another step failed")
+            step["status"] = "completed"
+            step["result"] = {"tool": step["tool"], "processed": progress["processed"]}
+            if step["tool"] not in STREAMING_TOOLS:
+                step["result"]["error"] = f"Tool {step['tool']} not implemented yet"
+        except Exception as e:
+            stop.set()
+            step["status"] = "failed"
+            step["error"] = str(e)
+            step["result"] = {"error": str(e)}
+        finally:
+            self.metrics.inc("steps_total", tool=step["tool"], status=step["status"])
+            if outbox is not None:
+                outbox.close()
+            progress["status"] = step["status"]
+            self.memory.save_step(step, run_id=self.run_id)
+            self.memory.flush()
+            self._checkpoint()
+            self._publish_step(step, "in_progress")
     
     def get_progress(self) -> Dict:
         """Get the current progress of the agent."""
         if not self.current_steps:
             return {"status": "no_goal"}
         
-        total_steps = len(self.current_steps)
-        completed_steps = sum(1 for step in self.current_steps if step["status"] == "completed")
-        failed_steps = sum(1 for step in self.current_steps if step["status"] == "failed")
-        
-        return {
-            "goal": self.current_goal,
-            "total_steps": total_steps,
-            "completed_steps": completed_steps,
-            "failed_steps": failed_steps,
-            "pending_steps": total_steps - completed_steps - failed_steps,
-            "progress_percentage": (completed_steps / total_steps) * 100 if total_steps > 0 else 0
-        } 
\ No newline at end of file
+        # Kept up to date by the events this run publishes, so this is O(1)
+        progress = self.events.progress(self.run_id)
+        progress["goal"] = self.current_goal
+        if self.stage_progress:
+            progress["stages"] = {step_id: dict(stage) for step_id, stage in self.stage_progress.items()}
+        if self.metrics.enabled:
+            progress["metrics"] = self.metrics.snapshot()
+        return progress 
+
+def _unscoped(record: Dict) -> Dict:
+    """A stored lead or email without the run bookkeeping added when it was saved."""
+    return {key: value for key, value in record.items() if key not in ("run_id", "segment")}
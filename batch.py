@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from agent import AgentSender
+from events import EventBus
+from memory.outbox import Outbox
+from memory.storage import MemoryStorage
+from tools.rate_limiter import SendScheduler
+from tools.send_email import EmailSender, scheduler_from_env
+
+def read_goals(lines: Iterable[str]) -> List[Dict]:
+    """
+    Parse a goals file: one goal per line, or one JSON object per line
+    with a "goal" and an optional "tone". Blank lines and lines starting
+    with '#' are skipped.
+
+    Args:
+        lines (Iterable[str]): Lines of the file (or stdin)
+
+    Returns:
+        List[Dict]: One {"goal": ..., "tone": ...} dict per goal
+    """
+    goals = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e})")
+            if not entry.get("goal"):
+                raise ValueError(f"Line {number}: missing \"goal\"")
+            goals.append({"goal": entry["goal"], "tone": entry.get("tone")})
+        else:
+            goals.append({"goal": line, "tone": None})
+    return goals
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class BatchRunner:
+    """
+    Runs many goals in one process on a pool of agent workers.
+
+    Each goal gets its own AgentSender with its own logs directory for its
+    leads, emails, steps and checkpoints. The dedup index and the outbox
+    live in ``shared_dir`` and are shared by every goal and every batch, so
+    a lead is emailed once however many goals (or nightly batches) find
+    it. All agents share one SendScheduler, so the configured send rate
+    limits apply to the batch as a whole rather than to each goal.
+    """
+
+    def __init__(self, workers: int = 4, logs_dir: Optional[str] = None, storage: str = "jsonl",
+                 streaming: bool = False, scheduler: Optional[SendScheduler] = None,
+                 default_tone: str = "professional", events: Optional[EventBus] = None,
+                 shared_dir: str = "logs"):
+        """
+        Args:
+            workers (int): Goals running at the same time
+            logs_dir (str): Parent of the per-goal logs directories;
+                defaults to logs/batch/<timestamp>
+            storage (str): "jsonl" or "sqlite"
+            streaming (bool): Run each goal as a streaming pipeline
+            scheduler (SendScheduler): Shared send scheduler; built from the
+                EMAIL_RATE_* settings if omitted
+            default_tone (str): Tone for goals that don't set one
+            events (EventBus): Event bus shared by every goal's agent, so
+                one dashboard follows the whole batch
+            shared_dir (str): Directory of the dedup index and outbox
+                shared across goals and batches (by default the same ones
+                single runs use)
+        """
+        self.workers = workers
+        self.logs_dir = logs_dir or os.path.join("logs", "batch", datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.storage = storage
+        self.streaming = streaming
+        self.scheduler = scheduler if scheduler is not None else scheduler_from_env()
+        self.default_tone = default_tone
+        self.events = events
+        self.shared_dir = shared_dir
+        self.dedup_dir = os.path.join(shared_dir, "dedup")
+        # Each run only sends the mail it queued, so one outbox serves every goal
+        self.outbox = Outbox(os.path.join(shared_dir, "outbox.db"))
+        self._print_lock = threading.Lock()
+
+    def _make_agent(self, logs_dir: str, tone: str) -> AgentSender:
+        if self.storage == "sqlite":
+            from memory.sqlite_storage import SQLiteMemoryStorage
+            memory = SQLiteMemoryStorage(logs_dir=logs_dir)
+        else:
+            memory = MemoryStorage(logs_dir=logs_dir)
+        return AgentSender(tone=tone, memory=memory, outbox=self.outbox, dedup_dir=self.dedup_dir,
+                           sender=EmailSender(scheduler=self.scheduler), events=self.events)
+
+    def run_goal(self, index: int, goal: Dict) -> Dict:
+        """Run one goal in its own namespace and report how it went."""
+        logs_dir = os.path.join(self.logs_dir, f"goal_{index:05d}")
+        result = {"index": index, "goal": goal["goal"], "logs_dir": logs_dir}
+        start = time.perf_counter()
+        try:
+            agent = self._make_agent(logs_dir, goal.get("tone") or self.default_tone)
+            agent.set_goal(goal["goal"])
+            agent.run(streaming=self.streaming)
+            progress = agent.get_progress()
+            result.update({
+                "run_id": agent.run_id,
+                "status": "failed" if progress["failed_steps"] else "completed",
+                "completed_steps": progress["completed_steps"],
+                "failed_steps": progress["failed_steps"]
+            })
+            if agent.tools.loaded("send_email"):
+                agent.sender.close()
+        except Exception as e:
+            result.update({"status": "failed", "error": str(e)})
+        result["latency"] = time.perf_counter() - start
+
+        with self._print_lock:
+            print(f"[{index}] {result['status']} in {result['latency']:.2f}s: {goal['goal']}")
+        return result
+
+    def run(self, goals: List[Dict]) -> Dict:
+        """
+        Run every goal and summarize the batch.
+
+        Returns:
+            Dict: "results" (one dict per goal, in input order) plus
+                throughput and latency statistics
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self.run_goal, range(1, len(goals) + 1), goals))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(result["latency"] for result in results)
+        return {
+            "goals": len(results),
+            "completed": sum(1 for result in results if result["status"] == "completed"),
+            "failed": sum(1 for result in results if result["status"] == "failed"),
+            "elapsed": elapsed,
+            "goals_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+            "latency": {
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "max": latencies[-1] if latencies else 0.0
+            },
+            "logs_dir": self.logs_dir,
+            "results": results
+        }
+
+def format_summary(summary: Dict) -> str:
+    """Human-readable summary of a batch run."""
+    latency = summary["latency"]
+    return "\n".join([
+        f"Goals: {summary['goals']} ({summary['completed']} completed, {summary['failed']} failed)",
+        f"Wall time: {summary['elapsed']:.2f}s ({summary['goals_per_second']:.2f} goals/s)",
+        f"Latency: mean {latency['mean']:.2f}s, p50 {latency['p50']:.2f}s, "
+        f"p95 {latency['p95']:.2f}s, max {latency['max']:.2f}s",
+        f"Logs: {summary['logs_dir']}"
+    ])
@@ -0,0 +1,113 @@
+"""
+MIME building and SMTP submission microbenchmark.
+
+Compares the per-message ``MIMEMultipart`` + ``as_string()`` build with
+MessageBuilder's pre-encoded bytes, and one-by-one ``sendmail`` with
+pipelined submission to a local SMTP sink (needs aiosmtpd). Run from the
+repository root:
+
+    python -m benchmarks.bench_mime --messages 20000 --send 2000
+"""
+import argparse
+import json
+import smtplib
+import socket
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional
+from benchmarks.synthetic import generate_leads
+from tools.mime_fast import MessageBuilder, submit_messages
+from tools.write_email import EmailWriter
+
+SENDER = "bench@example.com"
+
+def legacy_build(email: Dict) -> str:
+    """How EmailSender built each message before MessageBuilder."""
+    msg = MIMEMultipart()
+    msg["From"] = SENDER
+    msg["To"] = email["to"]
+    msg["Subject"] = email["subject"]
+    msg.attach(MIMEText(email["body"], "plain"))
+    return msg.as_string()
+
+class PipeliningSink:
+    """Local SMTP sink; advertises PIPELINING unless ``pipelining`` is False."""
+
+    def __init__(self, pipelining: bool = True):
+        from aiosmtpd.controller import Controller
+
+        sink = self
+
+        class Handler:
+            async def handle_EHLO(self, server, session, envelope, hostname, responses):
+                session.host_name = hostname
+                if pipelining:
+                    responses.insert(-1, "250-PIPELINING")
+                return responses
+
+            async def handle_DATA(self, server, session, envelope):
+                sink.received += 1
+                return "250 Message accepted for delivery"
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.received = 0
+        self.controller = Controller(Handler(), hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+def timed(fn: Callable[[], object], items: int) -> Dict:
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    return {"seconds": round(seconds, 6), "items_per_second": round(items / seconds, 1) if seconds else None}
+
+def bench_build(emails: List[Dict]) -> Dict[str, Dict]:
+    builder = MessageBuilder(SENDER)
+    return {
+        "build_legacy": timed(lambda: [legacy_build(email) for email in emails], len(emails)),
+        "build_fast": timed(lambda: [builder.build(email) for email in emails], len(emails))
+    }
+
+def bench_submit(emails: List[Dict]) -> Dict[str, Dict]:
+    builder = MessageBuilder(SENDER)
+    messages = [(email["to"], builder.build(email)) for email in emails]
+    results = {}
+    for name, pipelining in (("submit_sendmail", False), ("submit_pipelined", True)):
+        sink = PipeliningSink(pipelining=pipelining)
+        server = smtplib.SMTP("127.0.0.1", sink.port)
+        try:
+            results[name] = timed(lambda: list(submit_messages(server, builder, messages)), len(messages))
+        finally:
+            server.quit()
+            sink.stop()
+        if sink.received != len(messages):
+            raise RuntimeError(f"{name}: sink received {sink.received} of {len(messages)} messages")
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MIME building and SMTP submission")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages built per variant")
+    parser.add_argument("--send", type=int, default=2000, help="Messages submitted per variant (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    emails = EmailWriter().write_emails(generate_leads(max(args.messages, args.send), seed=args.seed))
+    results = bench_build(emails[:args.messages])
+    if args.send:
+        try:
+            results.update(bench_submit(emails[:args.send]))
+        except ImportError:
+            print("aiosmtpd is not installed; skipping submission", file=sys.stderr)
+    for name, entry in results.items():
+        print(f"{name:<18} {entry['seconds']:9.3f}s  {entry['items_per_second']:>12} msgs/s", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Pipeline stage benchmarks.
+
+Times every stage of the pipeline on synthetic leads (see synthetic.py)
+and measures its peak Python memory, then writes the results as JSON and
+compares them with a stored baseline. Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --sizes 1000 100000 --output bench.json
+    python -m benchmarks.bench_pipeline --baseline bench.json --fail-on-regression
+
+Each stage runs twice on fresh state: once for wall time and once under
+tracemalloc for peak memory, so tracing overhead never skews the timings.
+The send stage needs aiosmtpd for its local SMTP sink, and is capped at
+``--send-limit`` messages.
+"""
+import argparse
+import json
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from benchmarks.synthetic import generate_goals, generate_leads
+from memory.storage import MemoryStorage
+from planner import GoalPlanner
+from tools.send_email import EmailSender
+from tools.write_email import EmailWriter
+
+# A stage turns (leads, scratch directory) into the operation to measure;
+# any setup it needs (e.g. pre-written storage) happens before returning
+Stage = Callable[[List[Dict], str], Callable[[], object]]
+
+def stage_planner(leads: List[Dict], workdir: str) -> Callable[[], object]:
+    goals = generate_goals(len(leads))
+    planner = GoalPlanner()
+    return lambda: planner.break_down_goals(goals)
+
+def stage_writer(leads: List[Dict], workdir: str) -> Callable[[], object]:
+    writer = EmailWriter()
+    return lambda: writer.write_emails(leads)
+
+def stage_storage_write(leads: List[Dict], workdir: str) -> Callable[[], object]:
+    memory = MemoryStorage(logs_dir=workdir)
+
+    def write():
+        memory.save_leads(leads, run_id="bench")
+        memory.flush()
+    return write
+
+def _written_storage(leads: List[Dict], workdir: str) -> MemoryStorage:
+    memory = MemoryStorage(logs_dir=workdir)
+    memory.save_leads(leads, run_id="bench")
+    memory.flush()
+    return memory
+
+def stage_storage_read(leads: List[Dict], workdir: str) -> Callable[[], object]:
+    memory = _written_storage(leads, workdir)
+    return memory.get_all_leads
+
+def stage_storage_export(leads: List[Dict], workdir: str) -> Callable[[], object]:
+    memory = _written_storage(leads, workdir)
+    return lambda: memory.export_to_csv("leads")
+
+class _SMTPSink:
+    """Local SMTP server that accepts and counts every message."""
+
+    def __init__(self):
+        from aiosmtpd.controller import Controller
+
+        sink = self
+
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                sink.received += 1
+                return "250 Message accepted for delivery"
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.received = 0
+        self.controller = Controller(Handler(), hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+def make_stage_sender(sink: _SMTPSink, limit: int) -> Stage:
+    def stage_sender(leads: List[Dict], workdir: str) -> Callable[[], object]:
+        emails = EmailWriter().write_emails(leads[:limit])
+        sender = EmailSender(smtp_server="127.0.0.1", smtp_port=sink.port, use_tls=False, dry_run=False)
+        sender.email_address = "bench@example.com"
+        # Measure raw sending, not the configured rate limits
+        sender.scheduler = None
+
+        def send():
+            sender.send_emails(emails)
+            sender.close()
+        return send
+    return stage_sender
+
+def measure(stage: Stage, leads: List[Dict], root: str) -> Dict:
+    """Run a stage once for wall time and once for peak traced memory."""
+    workdir = tempfile.mkdtemp(dir=root)
+    operation = stage(leads, workdir)
+    start = time.perf_counter()
+    operation()
+    seconds = time.perf_counter() - start
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    workdir = tempfile.mkdtemp(dir=root)
+    operation = stage(leads, workdir)
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"seconds": seconds, "peak_bytes": peak}
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[Dict]:
+    """
+    Compare results with a baseline run of this script.
+
+    Args:
+        results (List[Dict]): Results of this run
+        baseline (Dict): Parsed JSON output of an earlier run
+        tolerance (float): Allowed slowdown or memory growth, as a fraction
+
+    Returns:
+        List[Dict]: One entry per stage and size found in both runs, with
+            time and memory ratios (current / baseline) and a regression flag
+    """
+    previous = {(entry["stage"], entry["size"]): entry for entry in baseline.get("results", [])}
+    comparison = []
+    for entry in results:
+        old = previous.get((entry["stage"], entry["size"]))
+        if old is None:
+            continue
+        time_ratio = entry["seconds"] / old["seconds"] if old["seconds"] else 1.0
+        memory_ratio = entry["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1.0
+        comparison.append({
+            "stage": entry["stage"],
+            "size": entry["size"],
+            "time_ratio": round(time_ratio, 3),
+            "memory_ratio": round(memory_ratio, 3),
+            "regression": time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        })
+    return comparison
+
+STAGES: Dict[str, Stage] = {
+    "planner": stage_planner,
+    "writer": stage_writer,
+    "storage_write": stage_storage_write,
+    "storage_read": stage_storage_read,
+    "storage_export": stage_storage_export,
+}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic leads")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000],
+                        help="Lead counts to run (e.g. 1000 100000 1000000)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES) + ["sender"],
+                        default=list(STAGES) + ["sender"])
+    parser.add_argument("--send-limit", type=int, default=2000,
+                        help="Most emails sent through the local SMTP sink per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, help="Write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", type=str, help="Earlier JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown or memory growth before flagging a regression")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any stage regressed")
+    args = parser.parse_args(argv)
+
+    stages = {name: STAGES[name] for name in args.stages if name in STAGES}
+    sink = None
+    if "sender" in args.stages:
+        try:
+            sink = _SMTPSink()
+            stages["sender"] = make_stage_sender(sink, args.send_limit)
+        except ImportError:
+            print("aiosmtpd is not installed; skipping the sender stage", file=sys.stderr)
+
+    results = []
+    root = tempfile.mkdtemp(prefix="agentsender-bench-")
+    try:
+        for size in args.sizes:
+            leads = generate_leads(size, seed=args.seed)
+            for name, stage in stages.items():
+                items = min(size, args.send_limit) if name == "sender" else size
+                measured = measure(stage, leads, root)
+                entry = {
+                    "stage": name,
+                    "size": size,
+                    "items": items,
+                    "seconds": round(measured["seconds"], 6),
+                    "items_per_second": round(items / measured["seconds"], 1) if measured["seconds"] else None,
+                    "peak_bytes": measured["peak_bytes"]
+                }
+                results.append(entry)
+                print(f"{name:<15} {size:>9} leads  {entry['seconds']:9.3f}s  "
+                      f"{entry['peak_bytes'] / 2**20:9.1f} MiB peak", file=sys.stderr)
+    finally:
+        if sink is not None:
+            sink.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed
+        },
+        "results": results
+    }
+    if args.baseline:
+        with open(args.baseline, 'r', encoding="utf-8") as f:
+            report["comparison"] = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    regressions = [entry for entry in report.get("comparison", []) if entry["regression"]]
+    for entry in regressions:
+        print(f"Regression: {entry['stage']} at {entry['size']} leads "
+              f"(time x{entry['time_ratio']}, memory x{entry['memory_ratio']})", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
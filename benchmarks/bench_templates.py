@@ -0,0 +1,63 @@
+"""
+Template rendering benchmark.
+
+Compares the original per-lead ``str.format`` + split approach with the
+compiled templates used by EmailWriter, for single renders and the batch
+API. Run from the repository root:
+
+    python -m benchmarks.bench_templates --leads 200000
+"""
+import argparse
+import time
+from tools.write_email import EmailWriter
+
+def make_leads(n: int):
+    return [
+        {
+            "name": f"Lead {i}",
+            "company": f"Company {i % 1000}",
+            "email": f"lead{i}@company{i % 1000}.com",
+            "company_description": "building developer tools" if i % 3 else "",
+        }
+        for i in range(n)
+    ]
+
+def format_baseline(template: str, leads):
+    emails = []
+    for lead in leads:
+        email_body = template.format(
+            name=lead["name"],
+            company=lead["company"],
+            company_description=lead.get("company_description", "their work")
+        )
+        emails.append({
+            "to": lead["email"],
+            "subject": email_body.split("\n")[0].replace("Subject: ", ""),
+            "body": "\n".join(email_body.split("\n")[1:]),
+            "lead": lead
+        })
+    return emails
+
+def timed(label: str, fn, n: int):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {n / elapsed * 60 / 1e6:8.2f}M renders/min")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark email template rendering")
+    parser.add_argument("--leads", type=int, default=200000)
+    args = parser.parse_args()
+
+    writer = EmailWriter()
+    leads = make_leads(args.leads)
+    columns = {key: [lead[key] for lead in leads] for key in leads[0]}
+    source = writer.templates["professional"].replace("{company_description|their work}", "{company_description}")
+
+    timed("str.format (original)", lambda: format_baseline(source, leads), args.leads)
+    timed("compiled, write_emails", lambda: writer.write_emails(leads), args.leads)
+    timed("compiled, write_batch rows", lambda: writer.write_batch(leads), args.leads)
+    timed("compiled, write_batch cols", lambda: writer.write_batch(columns), args.leads)
+
+if __name__ == "__main__":
+    main()
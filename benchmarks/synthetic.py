@@ -0,0 +1,50 @@
+"""
+Deterministic synthetic leads for benchmarks.
+
+The same ``n`` and ``seed`` always give the same leads, so runs on
+different machines or commits measure the same work.
+"""
+import random
+from typing import Dict, Iterator, List
+
+FIRST_NAMES = ["Sarah", "Michael", "Emma", "David", "Priya", "Carlos", "Aiko", "Olivia",
+               "Noah", "Fatima", "Liam", "Chen", "Sofia", "Mateo", "Amara", "Lucas"]
+LAST_NAMES = ["Chen", "Rodriguez", "Thompson", "Patel", "Kim", "Okafor", "Schmidt", "Silva",
+              "Nguyen", "Cohen", "Rossi", "Novak", "Haddad", "Larsen", "Tanaka", "Garcia"]
+ROLES = ["CEO & Founder", "CTO & Co-founder", "Founder & CEO", "VP Engineering",
+         "Head of Growth", "COO", "Head of Product"]
+SECTORS = ["healthcare", "fintech", "logistics", "education", "climate", "security",
+           "retail", "developer tools"]
+PRODUCTS = ["AI-powered diagnostics", "fraud detection", "route optimization", "tutoring robots",
+            "carbon accounting", "threat detection", "demand forecasting", "code review"]
+
+def iter_leads(n: int, seed: int = 0) -> Iterator[Dict]:
+    """Yield ``n`` synthetic leads; companies repeat so grouping is realistic."""
+    rng = random.Random(seed)
+    companies = max(1, n // 20)
+    for i in range(n):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        company_id = rng.randrange(companies)
+        sector = SECTORS[company_id % len(SECTORS)]
+        yield {
+            "name": f"{first} {last}",
+            "company": f"{sector.title().replace(' ', '')}Co {company_id}",
+            "role": rng.choice(ROLES),
+            "email": f"{first.lower()}.{last.lower()}{i}@company{company_id}.example",
+            "company_description": f"Building {PRODUCTS[company_id % len(PRODUCTS)]} for {sector}"
+        }
+
+def generate_leads(n: int, seed: int = 0) -> List[Dict]:
+    """List of ``n`` synthetic leads; see iter_leads."""
+    return list(iter_leads(n, seed))
+
+def generate_goals(n: int, seed: int = 0) -> List[str]:
+    """``n`` templated goals, as generated from CRM segments."""
+    rng = random.Random(seed)
+    verbs = ["Find", "Research", "Contact", "Reach out to", "Connect with", "Email"]
+    roles = ["founders", "CTOs", "heads of growth", "VPs of engineering"]
+    return [
+        f"{rng.choice(verbs)} {rng.choice(roles)} in {SECTORS[i % len(SECTORS)]} (segment {i})"
+        for i in range(n)
+    ]
@@ -0,0 +1,98 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+class SinkHandler:
+    def __init__(self):
+        self.messages = []
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.messages.append((envelope.rcpt_tos, envelope.content))
+        return "250 Message accepted for delivery"
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def free_port() -> int:
+    """A local port nothing is listening on."""
+    return _free_port()
+
+@pytest.fixture
+def smtp_sink():
+    """
+    Local SMTP server that accepts every message. Received
+    (recipients, content) pairs are in ``smtp_sink.handler.messages``.
+    """
+    from aiosmtpd.controller import Controller
+    controller = Controller(SinkHandler(), hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+@pytest.fixture
+def completions_stub():
+    """
+    Starts local stand-ins for an OpenAI-compatible /v1/chat/completions
+    endpoint: ``completions_stub(answer)`` returns the stub's state, with
+    its ``base_url``. ``answer`` turns the JSON user message into the JSON
+    reply; the first ``rate_limited`` requests get a 429, and requests for
+    which ``slow_when`` is true take ``delay`` seconds.
+    """
+    servers = []
+
+    def start(answer, rate_limited=0, slow_when=lambda request: False, delay=1.0):
+        stub = {"requests": [], "in_flight": 0, "max_in_flight": 0, "rate_limited": rate_limited}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                request = json.loads(payload["messages"][-1]["content"])
+                with lock:
+                    stub["requests"].append(request)
+                    stub["in_flight"] += 1
+                    stub["max_in_flight"] = max(stub["max_in_flight"], stub["in_flight"])
+                    limited = stub["rate_limited"] > 0
+                    stub["rate_limited"] -= 1
+                try:
+                    if limited:
+                        self._reply(429, {"error": {"message": "slow down"}}, {"Retry-After": "0"})
+                        return
+                    time.sleep(delay if slow_when(request) else 0.02)
+                    content = json.dumps(answer(request))
+                    self._reply(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+                finally:
+                    with lock:
+                        stub["in_flight"] -= 1
+
+            def _reply(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        stub["base_url"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        return stub
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,92 @@
+"""
+Live progress dashboard.
+
+Follows the JSONL event file written by ``main.py --events`` and shows
+per-run progress and the latest events. Each refresh reads only the events
+appended since the previous one and applies them to counters kept in the
+session, so a refresh costs the same however long the campaign has run.
+
+    python main.py --goal "..." --events logs/events.jsonl
+    streamlit run dashboard.py -- --events logs/events.jsonl
+"""
+import argparse
+import time
+from collections import deque
+from datetime import datetime
+import streamlit as st
+from events import ProgressCounters, read_events
+
+RECENT_EVENTS = 200
+# Most events applied per refresh, so catching up on a long file stays responsive
+MAX_EVENTS_PER_REFRESH = 100000
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AgentSender live dashboard")
+    parser.add_argument("--events", type=str, default="logs/events.jsonl", help="Event file to follow")
+    parser.add_argument("--refresh", type=float, default=2.0, help="Seconds between refreshes (0 to refresh only on demand)")
+    # Streamlit passes its own arguments through; ignore anything unknown
+    args, _ = parser.parse_known_args()
+    return args
+
+def _session(path: str):
+    """Per-viewer state: read offset, counters per run and recent events."""
+    state = st.session_state
+    if state.get("events_path") != path:
+        state.events_path = path
+        state.offset = 0
+        state.runs = {}
+        state.recent = deque(maxlen=RECENT_EVENTS)
+    return state
+
+def _format_time(timestamp) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S") if timestamp else ""
+
+def main():
+    args = _parse_args()
+    st.set_page_config(page_title="AgentSender", layout="wide")
+    st.title("AgentSender progress")
+
+    state = _session(args.events)
+    events, state.offset = read_events(args.events, state.offset, limit=MAX_EVENTS_PER_REFRESH)
+    for event in events:
+        counters = state.runs.get(event.get("run_id"))
+        if counters is None:
+            counters = state.runs[event.get("run_id")] = ProgressCounters()
+        counters.apply(event)
+        state.recent.append(event)
+
+    runs = [(run_id, counters.snapshot()) for run_id, counters in state.runs.items()]
+    if not runs:
+        st.info(f"Waiting for events in {args.events}")
+    else:
+        totals = st.columns(5)
+        totals[0].metric("Runs", len(runs))
+        totals[1].metric("Leads found", sum(progress["leads_found"] for _, progress in runs))
+        totals[2].metric("Emails rendered", sum(progress["emails_rendered"] for _, progress in runs))
+        totals[3].metric("Emails sent", sum(progress["emails_sent"] for _, progress in runs))
+        totals[4].metric("Send failures", sum(progress["emails_failed"] for _, progress in runs))
+
+        st.subheader("Runs")
+        for run_id, progress in sorted(runs, key=lambda run: run[1]["updated_at"] or 0, reverse=True):
+            label = (f"{progress['goal'] or run_id} ({progress['completed_steps']}/{progress['total_steps']} "
+                     f"steps, {progress['failed_steps']} failed)")
+            st.progress(min(progress["progress_percentage"] / 100, 1.0), text=label)
+
+        st.subheader("Latest events")
+        st.dataframe(
+            [
+                {"time": _format_time(event.get("time")), "run": (event.get("run_id") or "")[:8],
+                 "type": event["type"],
+                 "detail": ", ".join(f"{key}={value}" for key, value in event.items()
+                                     if key not in ("seq", "time", "type", "run_id") and value is not None)}
+                for event in reversed(state.recent)
+            ]
+        )
+    st.caption(f"{args.events}: {state.offset} bytes read")
+
+    if args.refresh > 0:
+        time.sleep(args.refresh)
+        st.rerun()
+
+if __name__ == "__main__":
+    main()
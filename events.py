@@ -0,0 +1,230 @@
+"""
+Live progress events.
+
+AgentSender publishes an event on an EventBus for every step transition
+and for leads found, emails rendered and emails sent. The bus keeps
+per-run counters up to date as events arrive (so reading progress never
+scans the plan or the logs), a bounded in-memory event log that
+subscribers can tail by sequence number, and optionally appends every
+event to a JSONL file that another process (see dashboard.py) can follow
+with read_events.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Event types
+RUN_STARTED = "run_started"
+STEP = "step"
+LEADS_FOUND = "leads_found"
+EMAILS_RENDERED = "emails_rendered"
+EMAILS_SENT = "emails_sent"
+
+STEP_STATUSES = ("pending", "in_progress", "completed", "failed")
+
+class ProgressCounters:
+    """
+    Running totals for one run, updated in O(1) per event.
+
+    Step events carry the step's previous and new status, so the count of
+    steps in each status is moved rather than recounted.
+    """
+
+    __slots__ = ("goal", "total_steps", "steps", "leads_found", "emails_rendered",
+                 "emails_sent", "emails_failed", "updated_at")
+
+    def __init__(self):
+        self.goal = None
+        self.total_steps = 0
+        self.steps = dict.fromkeys(STEP_STATUSES, 0)
+        self.leads_found = 0
+        self.emails_rendered = 0
+        self.emails_sent = 0
+        self.emails_failed = 0
+        self.updated_at = None
+
+    def apply(self, event: Dict):
+        kind = event["type"]
+        if kind == STEP:
+            previous = event.get("previous")
+            if previous in self.steps:
+                self.steps[previous] -= 1
+            self.steps[event["status"]] = self.steps.get(event["status"], 0) + 1
+        elif kind == LEADS_FOUND:
+            self.leads_found += event.get("count", 1)
+        elif kind == EMAILS_RENDERED:
+            self.emails_rendered += event.get("count", 1)
+        elif kind == EMAILS_SENT:
+            self.emails_sent += event.get("sent", 0)
+            self.emails_failed += event.get("failed", 0)
+        elif kind == RUN_STARTED:
+            # A resumed run starts with some steps already completed
+            self.goal = event.get("goal")
+            self.total_steps = event.get("total_steps", 0)
+            self.steps = dict.fromkeys(STEP_STATUSES, 0)
+            self.steps.update(event.get("steps") or {"pending": self.total_steps})
+        self.updated_at = event.get("time")
+
+    def snapshot(self) -> Dict:
+        completed = self.steps["completed"]
+        failed = self.steps["failed"]
+        return {
+            "goal": self.goal,
+            "total_steps": self.total_steps,
+            "completed_steps": completed,
+            "failed_steps": failed,
+            "in_progress_steps": self.steps["in_progress"],
+            "pending_steps": self.total_steps - completed - failed,
+            "progress_percentage": (completed / self.total_steps) * 100 if self.total_steps > 0 else 0,
+            "leads_found": self.leads_found,
+            "emails_rendered": self.emails_rendered,
+            "emails_sent": self.emails_sent,
+            "emails_failed": self.emails_failed,
+            "updated_at": self.updated_at
+        }
+
+class EventBus:
+    """
+    Publishes progress events to subscribers and keeps per-run counters.
+
+    Every event gets a sequence number. The last ``max_events`` events are
+    kept in memory; ``since(cursor)`` returns the ones after a cursor and
+    ``wait(cursor)`` blocks until there are some, so a reader only ever
+    handles new events. Subscribers are called on the publishing thread,
+    after the event is recorded.
+    """
+
+    def __init__(self, max_events: int = 10000, path: Optional[str] = None, flush_every: int = 100):
+        """
+        Args:
+            max_events (int): Events kept in memory for since() and wait()
+            path (str): Also append every event as a JSON line to this file
+            flush_every (int): Events buffered before the file is flushed
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self._events = deque(maxlen=max_events)
+        self._seq = 0
+        self._runs: Dict[Optional[str], ProgressCounters] = {}
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._changed = threading.Condition(threading.Lock())
+        self._file = None
+        self._unflushed = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, 'a', encoding="utf-8")
+
+    def publish(self, kind: str, run_id: Optional[str] = None, **fields) -> Dict:
+        """Record an event, update its run's counters and notify subscribers."""
+        with self._changed:
+            self._seq += 1
+            event = {"seq": self._seq, "time": time.time(), "type": kind, "run_id": run_id, **fields}
+            self._events.append(event)
+            counters = self._runs.get(run_id)
+            if counters is None:
+                counters = self._runs[run_id] = ProgressCounters()
+            counters.apply(event)
+            if self._file is not None:
+                self._file.write(json.dumps(event, default=str) + "\n")
+                self._unflushed += 1
+                # Step and run events are rare and what a follower waits
+                # for, so they go out straight away
+                if self._unflushed >= self.flush_every or kind in (STEP, RUN_STARTED):
+                    self._file.flush()
+                    self._unflushed = 0
+            self._changed.notify_all()
+            subscribers = self._subscribers
+        for subscriber in subscribers:
+            subscriber(event)
+        return event
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """Call ``callback(event)`` for every new event; returns a function that unsubscribes."""
+        with self._changed:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._changed:
+                self._subscribers = [existing for existing in self._subscribers if existing is not callback]
+        return unsubscribe
+
+    @property
+    def cursor(self) -> int:
+        """Sequence number of the latest event."""
+        return self._seq
+
+    def since(self, cursor: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """
+        Events published after ``cursor``, oldest first, and the cursor to
+        pass next time. Events that already dropped out of memory are
+        skipped.
+        """
+        with self._changed:
+            if not self._events:
+                return [], cursor
+            first = self._events[0]["seq"]
+            start = max(cursor - first + 1, 0)
+            stop = None if limit is None else start + limit
+            events = list(islice(self._events, start, stop))
+        return events, events[-1]["seq"] if events else cursor
+
+    def wait(self, cursor: int, timeout: Optional[float] = None) -> Tuple[List[Dict], int]:
+        """Like since(), but blocks up to ``timeout`` seconds until there is a new event."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._seq > cursor, timeout)
+        return self.since(cursor)
+
+    def progress(self, run_id: Optional[str] = None) -> Dict:
+        """Counters of one run (empty if it has published nothing)."""
+        with self._changed:
+            counters = self._runs.get(run_id)
+            return counters.snapshot() if counters is not None else ProgressCounters().snapshot()
+
+    def runs(self) -> Dict[Optional[str], Dict]:
+        """Counters of every run seen, keyed by run_id."""
+        with self._changed:
+            return {run_id: counters.snapshot() for run_id, counters in self._runs.items()}
+
+    def flush(self):
+        with self._changed:
+            if self._file is not None:
+                self._file.flush()
+                self._unflushed = 0
+
+    def close(self):
+        with self._changed:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_events(path: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+    """
+    Events appended to a JSONL event file since byte ``offset``, and the
+    offset to read from next time. A line still being written is left for
+    the next call.
+
+    Args:
+        path (str): Event file written by an EventBus
+        offset (int): Where the previous call stopped (0 for the beginning)
+        limit (int): Most events to return
+    """
+    if not os.path.exists(path):
+        return [], offset
+    if os.path.getsize(path) < offset:
+        offset = 0  # The file was truncated or replaced
+    events = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                events.append(json.loads(line))
+            if limit is not None and len(events) >= limit:
+                break
+    return events, offset
@@ -1,10 +1,43 @@
 import os
-from dotenv import load_dotenv
-from agent import AgentSender
+import sys
 import argparse
 
 def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="AgentSender - AI-powered cold email outreach")
+    parser.add_argument("--goal", type=str, help="The goal for the agent to accomplish")
+    parser.add_argument("--storage", choices=["jsonl", "sqlite"], default="jsonl",
+                        help="Storage backend for leads, emails and steps")
+    parser.add_argument("--stream", action="store_true",
+                        help="Run search, writing and sending concurrently as a pipeline")
+    parser.add_argument("--metrics", type=str,
+                        help="Write step and tool timings and counters to this file at the end "
+                             "(JSON if it ends in .json, Prometheus text format otherwise)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each step (CPU and allocations) into logs/profiles/<run_id>; "
+                             "steps run one at a time")
+    parser.add_argument("--goals-file", type=str,
+                        help="Run every goal in this file ('-' for stdin): one goal per line, "
+                             "or JSON lines with \"goal\" and optional \"tone\"")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Goals run at the same time with --goals-file")
+    parser.add_argument("--events", type=str,
+                        help="Append live progress events to this JSONL file (followed by dashboard.py)")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID",
+                        help="Finish an interrupted run, skipping the steps it completed")
+    parser.add_argument("--list-runs", action="store_true",
+                        help="List checkpointed runs and exit")
+    parser.add_argument("--flush-outbox", action="store_true",
+                        help="Send the mail every earlier run left queued in the outbox and exit")
+    # Parse arguments first so --help answers without loading the agent
+    args = parser.parse_args()
+    
+    if args.list_runs:
+        list_runs()
+        return
+    
     # Load environment variables
+    from dotenv import load_dotenv
     load_dotenv()
     
     # Check for OpenAI API key
@@ -13,25 +46,65 @@ def main():
         print("Please create a .env file with your OpenAI API key.")
         return
     
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description="AgentSender - AI-powered cold email outreach")
-    parser.add_argument("--goal", type=str, help="The goal for the agent to accomplish")
-    args = parser.parse_args()
+    if args.profile and (args.stream or args.goals_file):
+        print("Error: --profile can't be combined with --stream or --goals-file.")
+        return
+    
+    if args.resume and (args.goal or args.goals_file):
+        print("Error: --resume can't be combined with --goal or --goals-file.")
+        return
+    
+    if args.flush_outbox:
+        flush_outbox(args)
+        return
+    
+    if args.goals_file:
+        run_batch(args)
+        return
+    
+    from agent import AgentSender
+    
+    events = None
+    if args.events:
+        from events import EventBus
+        events = EventBus(path=args.events)
+    
+    metrics = None
+    if args.metrics:
+        from metrics import Metrics
+        metrics = Metrics()
     
     # Create agent instance
-    agent = AgentSender()
+    if args.storage == "sqlite":
+        from memory.sqlite_storage import SQLiteMemoryStorage
+        agent = AgentSender(memory=SQLiteMemoryStorage(), metrics=metrics, events=events)
+    else:
+        agent = AgentSender(metrics=metrics, events=events)
     
-    # Get goal from command line or prompt
-    goal = args.goal
-    if not goal:
-        goal = input("What should I do?\n> ")
+    if args.profile:
+        from profiling import StepProfiler
+        agent.profiler = StepProfiler(os.path.join(agent.memory.logs_dir, "profiles"))
     
-    # Set and run the goal
-    print(f"\nSetting goal: {goal}")
-    agent.set_goal(goal)
+    if args.resume:
+        try:
+            agent.load_run(args.resume)
+        except KeyError:
+            print(f"Error: no checkpoint for run {args.resume}.")
+            return
+        print(f"\nResuming run {agent.run_id}: {agent.current_goal}")
+    else:
+        # Get goal from command line or prompt
+        goal = args.goal
+        if not goal:
+            goal = input("What should I do?\n> ")
+        
+        # Set and run the goal
+        print(f"\nSetting goal: {goal}")
+        agent.set_goal(goal)
+        print(f"Run ID: {agent.run_id}")
     
     print("\nStarting execution...")
-    results = agent.run()
+    results = agent.run(streaming=args.stream)
     
     # Print final progress
     progress = agent.get_progress()
@@ -41,6 +114,64 @@ def main():
     
     if progress['failed_steps'] > 0:
         print(f"Failed steps: {progress['failed_steps']}")
+    
+    if metrics is not None:
+        metrics.write(args.metrics)
+        print(f"Metrics written to {args.metrics}")
+    
+    if events is not None:
+        events.close()
+    
+    if args.profile:
+        print(f"Step profiles written to {os.path.join(agent.profiler.directory, agent.run_id)}")
+
+def list_runs():
+    """Print checkpointed runs, most recent first."""
+    from memory.runs import RunStore
+    
+    runs = RunStore(os.path.join("logs", "runs")).list_runs()
+    if not runs:
+        print("No checkpointed runs.")
+    for run in runs:
+        print(f"{run['run_id']}  {run['status']:<9}  {run['completed_steps']}/{run['total_steps']} steps  "
+              f"{run['updated_at']}  {run['goal']}")
+
+def flush_outbox(args):
+    """Send whatever earlier runs left queued, recording results under their runs."""
+    from agent import AgentSender
+    
+    if args.storage == "sqlite":
+        from memory.sqlite_storage import SQLiteMemoryStorage
+        agent = AgentSender(memory=SQLiteMemoryStorage())
+    else:
+        agent = AgentSender()
+    results = agent.flush_outbox()
+    agent.memory.flush()
+    sent = sum(1 for res in results if res.get("status") == "sent")
+    print(f"Outbox flushed: {sent} sent, {len(results) - sent} failed.")
+
+def run_batch(args):
+    """Run all goals from --goals-file on a pool of agents and print a summary."""
+    from batch import BatchRunner, format_summary, read_goals
+    
+    if args.goals_file == "-":
+        goals = read_goals(sys.stdin)
+    else:
+        with open(args.goals_file, 'r', encoding="utf-8") as f:
+            goals = read_goals(f)
+    
+    print(f"\nRunning {len(goals)} goals with {args.workers} workers...")
+    events = None
+    if args.events:
+        from events import EventBus
+        events = EventBus(path=args.events)
+    runner = BatchRunner(workers=args.workers, storage=args.storage, streaming=args.stream, events=events)
+    summary = runner.run(goals)
+    if events is not None:
+        events.close()
+    
+    print("\nBatch complete!")
+    print(format_summary(summary))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,194 @@
+import hashlib
+import math
+import mmap
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Optional
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_COMPANY_SUFFIXES = {"inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation",
+                     "co", "company", "gmbh", "plc", "sa", "ag", "bv"}
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_NON_ALNUM.sub(" ", text.lower()).split())
+
+def normalize_email(email: str) -> str:
+    """Lowercase an address and drop any +tag from the local part."""
+    local, _, domain = email.strip().lower().partition("@")
+    return f"{local.split('+', 1)[0]}@{domain}" if domain else local
+
+def lead_keys(lead: Dict) -> List[str]:
+    """
+    Identity keys for a lead: its normalized email and a fuzzy
+    (name, company) key that ignores case, accents, punctuation, word
+    order in the name and common company suffixes.
+    """
+    keys = []
+    email = lead.get("email")
+    if email:
+        keys.append("e:" + normalize_email(email))
+    name = _fold(lead.get("name") or "")
+    company = " ".join(word for word in _fold(lead.get("company") or "").split()
+                       if word not in _COMPANY_SUFFIXES)
+    if name and company:
+        keys.append("f:" + " ".join(sorted(name.split())) + "|" + company)
+    return keys
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter kept in a memory-mapped file.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives. Set bits
+    go straight to the page cache, so persisting it costs nothing extra.
+    """
+
+    HEADER = 16
+
+    def __init__(self, path: str, capacity: int, error_rate: float = 0.001):
+        bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_bits = bits + (-bits % 8)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        size = self.HEADER + self.num_bits // 8
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                header = f.read(self.HEADER)
+            self.num_bits = int.from_bytes(header[:8], "little")
+            self.num_hashes = int.from_bytes(header[8:], "little")
+            size = self.HEADER + self.num_bits // 8
+        else:
+            with open(path, 'wb') as f:
+                f.write(self.num_bits.to_bytes(8, "little") + self.num_hashes.to_bytes(8, "little"))
+                f.truncate(size)
+
+        self._file = open(path, 'r+b')
+        self._bits = mmap.mmap(self._file.fileno(), size)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield self.HEADER * 8 + (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def flush(self):
+        self._bits.flush()
+
+class LeadDedupIndex:
+    """
+    Persistent "seen before?" index for leads across runs.
+
+    By default every key is held in a hash set (exact, O(1) membership) and
+    new keys are appended to ``keys.txt``. For very large histories pass
+    ``bloom_capacity`` to use an on-disk Bloom filter instead: memory stays
+    fixed, at the cost of occasionally treating a new lead as seen.
+    """
+
+    def __init__(self, directory: str, bloom_capacity: Optional[int] = None,
+                 error_rate: float = 0.001):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._keys = None
+        self._bloom = None
+        if bloom_capacity:
+            self._bloom = BloomFilter(os.path.join(directory, "bloom.bin"), bloom_capacity, error_rate)
+        else:
+            self._keys_path = os.path.join(directory, "keys.txt")
+            self._keys = set()
+            if os.path.exists(self._keys_path):
+                with open(self._keys_path, 'r', encoding="utf-8") as f:
+                    self._keys.update(line.rstrip("\n") for line in f)
+            self._keys_file = open(self._keys_path, 'a', encoding="utf-8")
+
+    def _contains(self, key: str) -> bool:
+        return key in self._bloom if self._bloom is not None else key in self._keys
+
+    def seen(self, lead: Dict) -> bool:
+        """True if any identity key of the lead has been added before."""
+        with self._lock:
+            return any(self._contains(key) for key in lead_keys(lead))
+
+    def iter_unseen(self, leads: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Yield the leads not seen before, and not repeated earlier in
+        ``leads``, without remembering them; use add_many once they have
+        been dealt with (e.g. emailed).
+        """
+        batch_keys = set()
+        for lead in leads:
+            keys = lead_keys(lead)
+            if any(key in batch_keys for key in keys):
+                continue
+            with self._lock:
+                if any(self._contains(key) for key in keys):
+                    continue
+            batch_keys.update(keys)
+            yield lead
+
+    def filter_unseen(self, leads: Iterable[Dict]) -> List[Dict]:
+        """List form of iter_unseen."""
+        return list(self.iter_unseen(leads))
+
+    def add_many(self, leads: Iterable[Dict]):
+        """Remember leads as seen."""
+        self.filter_new(leads)
+
+    def add(self, lead: Dict):
+        """Remember a lead as seen."""
+        self.filter_new([lead])
+
+    def filter_new(self, leads: Iterable[Dict]) -> List[Dict]:
+        """
+        Return the leads not seen before (or earlier in ``leads``) and
+        remember them, in one locked pass.
+        """
+        new_leads = []
+        new_keys = []
+        with self._lock:
+            for lead in leads:
+                keys = lead_keys(lead)
+                if any(self._contains(key) for key in keys):
+                    continue
+                new_leads.append(lead)
+                for key in keys:
+                    if self._bloom is not None:
+                        self._bloom.add(key)
+                    else:
+                        self._keys.add(key)
+                    new_keys.append(key)
+            if new_keys:
+                if self._bloom is not None:
+                    self._bloom.flush()
+                else:
+                    self._keys_file.writelines(key + "\n" for key in new_keys)
+                    self._keys_file.flush()
+        return new_leads
+
+_open_indexes: Dict[str, LeadDedupIndex] = {}
+_open_indexes_lock = threading.Lock()
+
+def shared_index(directory: str, bloom_capacity: Optional[int] = None) -> LeadDedupIndex:
+    """
+    The process-wide LeadDedupIndex for a directory, opened on first use.
+
+    An index keeps its keys in memory, so agents (or batch goals) that
+    dedup against the same directory must share one instance to see each
+    other's leads.
+    """
+    key = os.path.abspath(directory)
+    with _open_indexes_lock:
+        index = _open_indexes.get(key)
+        if index is None:
+            index = _open_indexes[key] = LeadDedupIndex(directory, bloom_capacity)
+        return index
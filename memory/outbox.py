@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+from records import email_to_record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    run_id TEXT,
+    segment INTEGER,
+    to_email TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    email TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(state, next_attempt_at);
+"""
+# Created after the segment column exists (older outboxes gain it on open)
+RUN_INDEX = "CREATE INDEX IF NOT EXISTS idx_outbox_run ON outbox(run_id, segment, state)"
+
+QUEUED = "queued"
+IN_FLIGHT = "in_flight"
+SENT = "sent"
+DEAD = "dead"
+# Send result status of a message that was built but, in a dry run, not
+# submitted; it is never recorded as sent
+DRY_RUN = "dry_run"
+
+class OutboxItem(NamedTuple):
+    key: str
+    run_id: Optional[str]
+    email: Dict
+    attempts: int
+
+def idempotency_key(email: Dict) -> str:
+    """Stable key for an email: the same message to the same person maps to one key."""
+    digest = hashlib.sha256()
+    for field in ("to", "subject", "body"):
+        digest.update(str(email.get(field, "")).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _scope(run_id: Optional[str], segment: Optional[int]) -> tuple:
+    """SQL condition and parameters limiting a query to one run (and segment)."""
+    conditions, params = "", ()
+    if run_id is not None:
+        conditions, params = " AND run_id = ?", (run_id,)
+        if segment is not None:
+            conditions, params = conditions + " AND segment = ?", params + (segment,)
+    return conditions, params
+
+class Outbox:
+    """
+    Persistent outbox that makes sending idempotent and resumable.
+
+    Every email is enqueued once under its idempotency key and moves
+    through queued -> in_flight -> sent, or back to queued with
+    exponential backoff after a failure. After ``max_attempts`` failures it
+    is parked as dead (the dead-letter queue). Result updates are buffered
+    and committed together (group commit). A claim is a lease: a message
+    left in flight for ``lease_timeout`` seconds (its sender died before
+    recording it) is requeued by the next claim(), so delivery is
+    at-least-once for the last uncommitted group and exactly-once
+    otherwise. Claims still within their lease are never taken over, so
+    several processes can share one outbox file.
+
+    Messages are tagged with the run (and goal segment) that queued them,
+    and claim() can be limited to one run, so a run only ever sends its
+    own mail; what earlier runs left queued is sent by an explicit,
+    unscoped delivery (AgentSender.flush_outbox).
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 5, base_delay: float = 30,
+                 max_delay: float = 3600, group_size: int = 100, lease_timeout: float = 3600):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.group_size = group_size
+        # Longer than any one claimed batch takes to send and record
+        self.lease_timeout = lease_timeout
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._pending_results: List[tuple] = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "segment" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN segment INTEGER")
+        self._conn.execute(RUN_INDEX)
+
+    def enqueue(self, emails: List[Dict], run_id: Optional[str] = None,
+                segment: Optional[int] = None) -> List[str]:
+        """
+        Add emails to the outbox under a run and goal segment.
+
+        An email already sent, in flight or dead is left untouched. One
+        still queued by another run (the same message to the same person)
+        is handed over to this run, so it goes out once, with this run.
+        """
+        now = time.time()
+        rows = []
+        for email in emails:
+            key = idempotency_key(email)
+            # Sending only needs the message, not the lead it was written for
+            rows.append((key, run_id, segment, email.get("to"), QUEUED,
+                         json.dumps(email_to_record(email), default=str), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO outbox (key, run_id, segment, to_email, state, email, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET run_id = excluded.run_id, segment = excluded.segment, "
+                "updated_at = excluded.updated_at WHERE state = 'queued'", rows
+            )
+        return [row[0] for row in rows]
+
+    def claim(self, limit: int = 500, run_id: Optional[str] = None,
+              segment: Optional[int] = None) -> List[OutboxItem]:
+        """
+        Move up to ``limit`` due messages to in_flight and return them.
+
+        Claims whose lease has run out are requeued first. The claim runs
+        in one write transaction, so two processes never claim the same
+        message.
+
+        Args:
+            limit (int): Most messages to claim
+            run_id (str): Only this run's messages; every run's if omitted
+            segment (int): Only this goal segment's messages of ``run_id``
+        """
+        now = time.time()
+        conditions, params = _scope(run_id, segment)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "UPDATE outbox SET state = ?, updated_at = ? WHERE state = ? AND updated_at < ?",
+                (QUEUED, now, IN_FLIGHT, now - self.lease_timeout)
+            )
+            rows = self._conn.execute(
+                "SELECT key, run_id, email, attempts FROM outbox "
+                f"WHERE state = ? AND next_attempt_at <= ?{conditions} ORDER BY next_attempt_at, rowid LIMIT ?",
+                (QUEUED, now, *params, limit)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET state = ?, updated_at = ? WHERE key = ?",
+                [(IN_FLIGHT, now, row[0]) for row in rows]
+            )
+        return [OutboxItem(key, run_id, json.loads(email), attempts) for key, run_id, email, attempts in rows]
+
+    def pending(self, limit: int = 500, run_id: Optional[str] = None,
+                segment: Optional[int] = None) -> List[OutboxItem]:
+        """Like claim(), but leaves the messages queued (for a dry run)."""
+        conditions, params = _scope(run_id, segment)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, run_id, email, attempts FROM outbox "
+                f"WHERE state = ? AND next_attempt_at <= ?{conditions} ORDER BY next_attempt_at, rowid LIMIT ?",
+                (QUEUED, time.time(), *params, limit)
+            ).fetchall()
+        return [OutboxItem(key, run_id, json.loads(email), attempts) for key, run_id, email, attempts in rows]
+
+    def record(self, item: OutboxItem, result: Dict):
+        """Buffer the send result for a claimed message."""
+        now = time.time()
+        if result.get("status") == DRY_RUN:
+            raise ValueError("Dry-run results must not be recorded in the outbox")
+        if result.get("status") == "sent":
+            update = (SENT, item.attempts + 1, now, None, now, item.key)
+        else:
+            attempts = item.attempts + 1
+            if attempts >= self.max_attempts:
+                update = (DEAD, attempts, now, result.get("error"), now, item.key)
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                update = (QUEUED, attempts, now + delay, result.get("error"), now, item.key)
+        with self._lock:
+            self._pending_results.append(update)
+            if len(self._pending_results) >= self.group_size:
+                self.commit()
+
+    def commit(self):
+        """Write buffered results in one transaction."""
+        with self._lock:
+            if not self._pending_results:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE outbox SET state = ?, attempts = ?, next_attempt_at = ?, "
+                    "last_error = ?, updated_at = ? WHERE key = ?", self._pending_results
+                )
+            self._pending_results = []
+
+    def next_due_at(self, run_id: Optional[str] = None, segment: Optional[int] = None) -> Optional[float]:
+        """Earliest time a queued message (of a run, as in claim) becomes due, or None if nothing is queued."""
+        conditions, params = _scope(run_id, segment)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT MIN(next_attempt_at) FROM outbox WHERE state = ?{conditions}", (QUEUED, *params)
+            ).fetchone()
+        return row[0]
+
+    def counts(self, run_id: Optional[str] = None) -> Dict[str, int]:
+        """Number of messages in each state, of one run or of all of them."""
+        where, params = ("WHERE run_id = ? ", (run_id,)) if run_id is not None else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"SELECT state, COUNT(*) FROM outbox {where}GROUP BY state", params).fetchall()
+        return dict(rows)
+
+    def dead_letters(self) -> List[Dict]:
+        """Messages that exhausted their retries, with the last error."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, run_id, email, attempts, last_error FROM outbox WHERE state = ? ORDER BY rowid",
+                (DEAD,)
+            ).fetchall()
+        return [
+            {"key": key, "run_id": run_id, "email": json.loads(email), "attempts": attempts, "error": error}
+            for key, run_id, email, attempts, error in rows
+        ]
+
+    def requeue_dead(self) -> int:
+        """Give every dead-lettered message a fresh set of attempts."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE state = ?",
+                (QUEUED, time.time(), DEAD)
+            )
+        return cursor.rowcount
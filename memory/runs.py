@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+def _step_snapshot(step: Dict) -> Dict:
+    """
+    A step as it is checkpointed. Lead and email lists in results are
+    already in storage under the run, so only their length is kept.
+    """
+    # copy() is atomic, so a step another thread is updating can't change
+    # size underneath us
+    snapshot = step.copy()
+    result = snapshot.pop("result", None)
+    if isinstance(result, list):
+        snapshot["result"] = {"items": len(result)}
+    elif result is not None:
+        snapshot["result"] = result
+    return snapshot
+
+class RunStore:
+    """
+    Checkpoints of agent runs, one ``<run_id>/state.json`` per run.
+
+    A checkpoint holds the goal, tone, run status and every step with its
+    status, and is replaced atomically (written to a temporary file, then
+    renamed), so a crash leaves either the previous checkpoint or the new
+    one, never a torn file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, run_id, "state.json")
+
+    def save(self, run_id: str, goal: str, tone: str, steps: List[Dict],
+             status: str = RUNNING, **extra: Any):
+        """
+        Checkpoint a run.
+
+        Args:
+            run_id (str): Run to checkpoint
+            goal (str): The run's goal
+            tone (str): Email tone the run uses
+            steps (List[Dict]): The plan, with each step's current status
+            status (str): running, completed or failed
+            **extra: Further fields to keep with the run
+        """
+        path = self._path(run_id)
+        with self._lock:
+            created_at = None
+            if os.path.exists(path):
+                with open(path, 'r', encoding="utf-8") as f:
+                    created_at = json.load(f).get("created_at")
+            now = datetime.now().isoformat()
+            state = {
+                "run_id": run_id,
+                "goal": goal,
+                "tone": tone,
+                "status": status,
+                "created_at": created_at or now,
+                "updated_at": now,
+                "steps": [_step_snapshot(step) for step in steps],
+                **extra
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding="utf-8") as f:
+                json.dump(state, f, indent=2, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+    def load(self, run_id: str) -> Dict:
+        """The last checkpoint of a run; raises KeyError if there is none."""
+        try:
+            with open(self._path(run_id), 'r', encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Unknown run: {run_id}") from None
+
+    def exists(self, run_id: str) -> bool:
+        return os.path.exists(self._path(run_id))
+
+    def list_runs(self, status: Optional[str] = None) -> List[Dict]:
+        """
+        Every checkpointed run, most recently updated first, without the steps.
+
+        Args:
+            status (str): Only runs with this status (e.g. "running" for
+                runs that were interrupted or are still going)
+        """
+        runs = []
+        for run_id in os.listdir(self.directory):
+            try:
+                state = self.load(run_id)
+            except (KeyError, NotADirectoryError, json.JSONDecodeError):
+                continue
+            if status is not None and state["status"] != status:
+                continue
+            steps = state.pop("steps")
+            state["completed_steps"] = sum(1 for step in steps if step["status"] == "completed")
+            state["total_steps"] = len(steps)
+            runs.append(state)
+        return sorted(runs, key=lambda run: run["updated_at"], reverse=True)
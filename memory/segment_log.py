@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+class SegmentedLog:
+    """
+    Append-only JSONL log split into size-bounded segment files.
+
+    Each segment is named after the sequence number of its first record
+    (``00000000000000001000.jsonl``) and has a sparse offset index
+    (``.idx``) mapping every ``index_interval``-th record to its byte
+    offset, so a reader can start from any sequence number without
+    scanning the whole log.
+    """
+
+    SEGMENT_SUFFIX = ".jsonl"
+    INDEX_SUFFIX = ".idx"
+
+    def __init__(self, directory: str, max_segment_bytes: int = 16 * 1024 * 1024,
+                 batch_size: int = 256, index_interval: int = 1000):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.batch_size = batch_size
+        self.index_interval = index_interval
+        self._lock = threading.RLock()
+        self._buffer: List[bytes] = []
+        # Bytes of records written by this instance (for metrics)
+        self.bytes_written = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._recover()
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}{self.SEGMENT_SUFFIX}")
+
+    def _index_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}{self.INDEX_SUFFIX}")
+
+    def _segment_bases(self) -> List[int]:
+        bases = []
+        for filename in os.listdir(self.directory):
+            name, ext = os.path.splitext(filename)
+            if ext == self.SEGMENT_SUFFIX and name.isdigit():
+                bases.append(int(name))
+        return sorted(bases)
+
+    def _recover(self):
+        """Find the active segment and drop a torn trailing record, if any."""
+        bases = self._segment_bases()
+        self._active_base = bases[-1] if bases else 0
+        self._active_count = 0
+        self._active_size = 0
+
+        path = self._segment_path(self._active_base)
+        if os.path.exists(path):
+            valid_size = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_size += len(line)
+                    self._active_count += 1
+            if valid_size != os.path.getsize(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_size)
+            self._active_size = valid_size
+
+        self._next_seq = self._active_base + self._active_count
+
+    @property
+    def next_seq(self) -> int:
+        """Sequence number the next appended record will get."""
+        with self._lock:
+            return self._next_seq + len(self._buffer)
+
+    def append(self, record: Dict):
+        """Buffer a record, flushing once a full batch has accumulated."""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict]):
+        """Buffer several records, flushing whenever a batch fills up."""
+        with self._lock:
+            for record in records:
+                line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                self._buffer.append(line.encode("utf-8"))
+                if len(self._buffer) >= self.batch_size:
+                    self.flush()
+
+    def flush(self):
+        """Write buffered records to disk, rolling segments as they fill."""
+        with self._lock:
+            if not self._buffer:
+                return
+            pending, self._buffer = self._buffer, []
+
+            i = 0
+            while i < len(pending):
+                if self._active_size >= self.max_segment_bytes and self._active_count:
+                    self._active_base = self._next_seq
+                    self._active_count = 0
+                    self._active_size = 0
+
+                # Fill the active segment up to its size limit (always at least one record)
+                chunk = []
+                index_entries = []
+                size = self._active_size
+                while i < len(pending) and (size < self.max_segment_bytes or not (chunk or self._active_count)):
+                    line = pending[i]
+                    position = self._active_count + len(chunk)
+                    if position % self.index_interval == 0:
+                        index_entries.append((self._active_base + position, size))
+                    chunk.append(line)
+                    size += len(line)
+                    i += 1
+
+                with open(self._segment_path(self._active_base), 'ab') as f:
+                    f.write(b"".join(chunk))
+                if index_entries:
+                    with open(self._index_path(self._active_base), 'a') as f:
+                        f.writelines(f"{seq} {offset}\n" for seq, offset in index_entries)
+
+                self._active_count += len(chunk)
+                self.bytes_written += size - self._active_size
+                self._active_size = size
+                self._next_seq += len(chunk)
+
+    def _load_index(self, base: int) -> List[Tuple[int, int]]:
+        path = self._index_path(base)
+        if not os.path.exists(path):
+            return [(base, 0)]
+        entries = []
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    entries.append((int(parts[0]), int(parts[1])))
+        return entries or [(base, 0)]
+
+    def read(self, start: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """
+        Yield ``(seq, record)`` pairs in append order, starting at ``start``.
+
+        Records appended while iterating may or may not be included.
+        """
+        self.flush()
+        bases = self._segment_bases()
+        for i, base in enumerate(bases):
+            next_base = bases[i + 1] if i + 1 < len(bases) else None
+            if next_base is not None and next_base <= start:
+                continue
+
+            seq, offset = base, 0
+            if start > base:
+                for entry_seq, entry_offset in self._load_index(base):
+                    if entry_seq > start:
+                        break
+                    seq, offset = entry_seq, entry_offset
+
+            with open(self._segment_path(base), 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    if seq >= start:
+                        yield seq, json.loads(line)
+                    seq += 1
+
+    def __iter__(self) -> Iterator[Dict]:
+        for _, record in self.read():
+            yield record
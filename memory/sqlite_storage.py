@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from memory.storage import MemoryStorage
+from records import email_to_record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    email TEXT,
+    company TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leads_email ON leads(email);
+CREATE INDEX IF NOT EXISTS idx_leads_company ON leads(company);
+CREATE INDEX IF NOT EXISTS idx_leads_run ON leads(run_id);
+
+CREATE TABLE IF NOT EXISTS emails (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    to_email TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_emails_to ON emails(to_email);
+CREATE INDEX IF NOT EXISTS idx_emails_run_status ON emails(run_id, status);
+CREATE INDEX IF NOT EXISTS idx_emails_status ON emails(status);
+
+CREATE TABLE IF NOT EXISTS steps (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    type TEXT,
+    to_email TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_steps_run ON steps(run_id);
+CREATE INDEX IF NOT EXISTS idx_steps_send_status ON steps(type, status, run_id);
+"""
+
+INSERTS = {
+    "leads": "INSERT INTO leads (run_id, email, company, data) VALUES (?, ?, ?, ?)",
+    "emails": "INSERT INTO emails (run_id, to_email, data) VALUES (?, ?, ?)",
+    "steps": "INSERT INTO steps (run_id, type, to_email, status, data) VALUES (?, ?, ?, ?, ?)",
+}
+
+# Record fields that map onto indexed columns, for pushing filters into SQL
+INDEXED_FIELDS = {
+    "leads": {"run_id": "run_id", "company": "company"},
+    "emails": {"run_id": "run_id", "to": "to_email"},
+    "steps": {"run_id": "run_id", "type": "type"},
+}
+
+PAGE_SIZE = 1000
+
+def _dumps(record: Dict) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+def _flush_store(conn: sqlite3.Connection, lock: threading.RLock, pending: Dict[str, List[Tuple]]):
+    with lock:
+        if not any(pending.values()):
+            return
+        with conn:
+            for table, sql in INSERTS.items():
+                if pending[table]:
+                    conn.executemany(sql, pending[table])
+            # Sent emails are resolved after their rows are inserted
+            # (same transaction) so a result can't race its email.
+            for run_id, to_email in pending.get("_sent", []):
+                conn.execute(
+                    "UPDATE emails SET status = 'sent' "
+                    "WHERE to_email = ? AND run_id IS ? AND status != 'sent'",
+                    (to_email, run_id)
+                )
+        for rows in pending.values():
+            rows.clear()
+
+class SQLiteMemoryStorage(MemoryStorage):
+    """
+    MemoryStorage backend that keeps leads, emails and steps (including
+    send results) in an embedded SQLite database with indexes on lead email, company,
+    run id and send status.
+
+    Writes are buffered and inserted in a single transaction per batch.
+    """
+
+    def __init__(self, logs_dir: str = "logs", db_name: str = "memory.db", batch_size: int = 256):
+        self.logs_dir = logs_dir
+        self.batch_size = batch_size
+        os.makedirs(self.logs_dir, exist_ok=True)
+        self.db_path = os.path.join(self.logs_dir, db_name)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._pending: Dict[str, List[Tuple]] = {table: [] for table in INSERTS}
+        self._pending["_sent"] = []
+        # Size of the record payloads queued for insert (for metrics)
+        self._bytes_written = 0
+        weakref.finalize(self, _flush_store, self._conn, self._lock, self._pending)
+
+    def _queue(self, table: str, row: Tuple):
+        with self._lock:
+            self._pending[table].append(row)
+            self._bytes_written += len(row[-1])
+            if sum(len(rows) for rows in self._pending.values()) >= self.batch_size:
+                self.flush()
+
+    @property
+    def bytes_written(self) -> int:
+        """Approximate bytes of record data written (JSON payload length)."""
+        return self._bytes_written
+
+    def flush(self):
+        """Commit buffered inserts in one transaction."""
+        _flush_store(self._conn, self._lock, self._pending)
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_leads(self, leads: List[Dict], run_id: Optional[str] = None):
+        """Insert discovered leads."""
+        for lead in leads:
+            record = {**lead, "run_id": run_id} if run_id is not None else lead
+            self._queue("leads", (run_id, (lead.get("email") or "").lower(), lead.get("company"), _dumps(record)))
+
+    def save_emails(self, emails: List[Dict], run_id: Optional[str] = None):
+        """Insert several generated emails; embedded leads are stored as a "lead_email" reference."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for email_data in emails:
+            record = {"timestamp": timestamp, **email_to_record(email_data)}
+            if run_id is not None:
+                record["run_id"] = run_id
+            self._queue("emails", (run_id, email_data.get("to"), _dumps(record)))
+
+    def save_step(self, step_data: Dict, run_id: Optional[str] = None):
+        """Insert a step record."""
+        record = {"timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"), **step_data}
+        if run_id is not None:
+            record["run_id"] = run_id
+        self._queue("steps", (run_id, step_data.get("type"), step_data.get("to"),
+                              step_data.get("status"), _dumps(record)))
+
+    def save_send_result(self, result: Dict, run_id: Optional[str] = None):
+        """Record a send result and mark the matching email as sent."""
+        record = {"timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"), "type": "email_send_result", **result}
+        if run_id is not None:
+            record["run_id"] = run_id
+        with self._lock:
+            self._queue("steps", (run_id, "email_send_result", result.get("to"),
+                                  result.get("status"), _dumps(record)))
+            if result.get("status") == "sent":
+                self._pending["_sent"].append((run_id, result.get("to")))
+
+    def _iter(self, table: str, filters: Optional[Dict[str, Any]], cursor: int,
+              with_cursor: bool) -> Iterator:
+        """Page through a table by rowid so only one page is held in memory."""
+        clauses, params, residual = [], [], {}
+        for key, value in (filters or {}).items():
+            column = INDEXED_FIELDS[table].get(key)
+            if column is None or value is None:
+                residual[key] = value
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = "".join(f" AND {clause}" for clause in clauses)
+        sql = f"SELECT id, data FROM {table} WHERE id > ?{where} ORDER BY id LIMIT {PAGE_SIZE}"
+
+        self.flush()
+        last_id = cursor
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, (last_id, *params)).fetchall()
+            for row_id, data in rows:
+                record = json.loads(data)
+                if residual and any(record.get(key) != value for key, value in residual.items()):
+                    continue
+                yield (row_id, record) if with_cursor else record
+            if len(rows) < PAGE_SIZE:
+                return
+            last_id = rows[-1][0]
+
+    def iter_leads(self, filters: Optional[Dict[str, Any]] = None, cursor: int = 0,
+                   with_cursor: bool = False) -> Iterator:
+        """Stream saved leads; see MemoryStorage.iter_leads."""
+        return self._iter("leads", filters, cursor, with_cursor)
+
+    def iter_emails(self, filters: Optional[Dict[str, Any]] = None, cursor: int = 0,
+                    with_cursor: bool = False) -> Iterator:
+        """Stream saved emails; see MemoryStorage.iter_leads."""
+        return self._iter("emails", filters, cursor, with_cursor)
+
+    def iter_steps(self, filters: Optional[Dict[str, Any]] = None, cursor: int = 0,
+                   with_cursor: bool = False) -> Iterator:
+        """Stream saved steps and send results; see MemoryStorage.iter_leads."""
+        return self._iter("steps", filters, cursor, with_cursor)
+
+    def get_leads_for_run(self, run_id: str) -> List[Dict]:
+        """Retrieve the leads saved by a single run."""
+        return self._query("SELECT data FROM leads WHERE run_id = ? ORDER BY id", (run_id,))
+
+    def get_leads_by_email(self, email: str) -> List[Dict]:
+        """Retrieve every stored lead with the given email address."""
+        return self._query("SELECT data FROM leads WHERE email = ? ORDER BY id", (email.lower(),))
+
+    def get_leads_by_company(self, company: str) -> List[Dict]:
+        """Retrieve every stored lead at the given company."""
+        return self._query("SELECT data FROM leads WHERE company = ? ORDER BY id", (company,))
+
+    def get_emails_for_run(self, run_id: str) -> List[Dict]:
+        """Retrieve the emails generated by a single run."""
+        return self._query("SELECT data FROM emails WHERE run_id = ? ORDER BY id", (run_id,))
+
+    def get_send_results(self, status: Optional[str] = None, run_id: Optional[str] = None) -> List[Dict]:
+        """Retrieve send results, optionally filtered by status and run."""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if run_id is not None:
+            clauses.append("run_id = ?")
+            params.append(run_id)
+        where = "".join(f" AND {clause}" for clause in clauses)
+        return self._query(
+            f"SELECT data FROM steps WHERE type = 'email_send_result'{where} ORDER BY id", tuple(params)
+        )
+
+    def get_unsent_emails(self, run_id: Optional[str] = None) -> List[Dict]:
+        """Retrieve emails that have no successful send result yet."""
+        if run_id is None:
+            return self._query("SELECT data FROM emails WHERE status != 'sent' ORDER BY id")
+        return self._query(
+            "SELECT data FROM emails WHERE run_id = ? AND status != 'sent' ORDER BY id", (run_id,)
+        )
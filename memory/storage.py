@@ -1,13 +1,64 @@
 import json
 import os
+import weakref
 from datetime import datetime
-from typing import Dict, List, Any
-import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Any, Optional
+from memory.segment_log import SegmentedLog
+from records import email_to_record
+
+def _flush_logs(logs: Iterable[SegmentedLog]):
+    for log in logs:
+        log.flush()
+
+def _tag_run(record: Dict, run_id: Optional[str]) -> Dict:
+    return {**record, "run_id": run_id} if run_id is not None else record
+
+def _chunked(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+def _parquet_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
 
 class MemoryStorage:
-    def __init__(self, logs_dir: str = "logs"):
+    """
+    Stores leads, emails and steps in append-only segmented JSONL logs
+    (one log per record type under ``logs_dir``).
+    """
+
+    def __init__(self, logs_dir: str = "logs", max_segment_bytes: int = 16 * 1024 * 1024,
+                 batch_size: int = 256):
         self.logs_dir = logs_dir
         self._ensure_directories()
+        self._logs = {
+            name: SegmentedLog(os.path.join(self.logs_dir, name),
+                               max_segment_bytes=max_segment_bytes,
+                               batch_size=batch_size)
+            for name in ("leads", "emails", "steps")
+        }
+        # Make sure buffered records reach disk even if flush() is never called
+        weakref.finalize(self, _flush_logs, list(self._logs.values()))
+    
+    @property
+    def bytes_written(self) -> int:
+        """Bytes of records written to the logs by this instance."""
+        return sum(log.bytes_written for log in self._logs.values())
     
     def _ensure_directories(self):
         """Create necessary directories if they don't exist."""
@@ -16,91 +67,159 @@ class MemoryStorage:
         os.makedirs(os.path.join(self.logs_dir, "emails"), exist_ok=True)
         os.makedirs(os.path.join(self.logs_dir, "steps"), exist_ok=True)
     
-    def save_leads(self, leads: List[Dict]):
-        """Save discovered leads to a JSON file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.logs_dir, "leads", f"leads_{timestamp}.json")
+    def save_leads(self, leads: List[Dict], run_id: Optional[str] = None):
+        """Append discovered leads to the leads log."""
+        self._logs["leads"].append_many(_tag_run(lead, run_id) for lead in leads)
+    
+    def save_email(self, email_data: Dict, run_id: Optional[str] = None):
+        """Append a generated email to the emails log."""
+        self.save_emails([email_data], run_id=run_id)
+    
+    def save_emails(self, emails: List[Dict], run_id: Optional[str] = None):
+        """
+        Append several generated emails to the emails log.
         
-        with open(filename, 'w') as f:
-            json.dump({
-                "timestamp": timestamp,
-                "leads": leads
-            }, f, indent=2)
-    
-    def save_email(self, email_data: Dict):
-        """Save a generated email to a JSON file."""
+        An embedded "lead" dict is stored as a "lead_email" reference; the
+        lead itself is in the leads log.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.logs_dir, "emails", f"email_{timestamp}.json")
-        
-        with open(filename, 'w') as f:
-            json.dump({
-                "timestamp": timestamp,
-                **email_data
-            }, f, indent=2)
-    
-    def save_step(self, step_data: Dict):
-        """Save a completed step to a JSON file."""
+        self._logs["emails"].append_many(
+            _tag_run({"timestamp": timestamp, **email_to_record(email_data)}, run_id) for email_data in emails
+        )
+    
+    def save_step(self, step_data: Dict, run_id: Optional[str] = None):
+        """Append a step record to the steps log."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.logs_dir, "steps", f"step_{timestamp}.json")
+        self._logs["steps"].append(_tag_run({
+            "timestamp": timestamp,
+            **step_data
+        }, run_id))
+    
+    def save_send_result(self, result: Dict, run_id: Optional[str] = None):
+        """Record the outcome of sending one email."""
+        self.save_step({"type": "email_send_result", **result}, run_id=run_id)
+    
+    def flush(self):
+        """Write any buffered records to disk."""
+        _flush_logs(self._logs.values())
+    
+    def _iter(self, name: str, filters: Optional[Dict[str, Any]], cursor: int,
+              with_cursor: bool) -> Iterator:
+        for seq, record in self._logs[name].read(cursor):
+            if filters and any(record.get(key) != value for key, value in filters.items()):
+                continue
+            yield (seq + 1, record) if with_cursor else record
+    
+    def iter_leads(self, filters: Optional[Dict[str, Any]] = None, cursor: int = 0,
+                   with_cursor: bool = False) -> Iterator:
+        """
+        Stream saved leads in the order they were written.
         
-        with open(filename, 'w') as f:
-            json.dump({
-                "timestamp": timestamp,
-                **step_data
-            }, f, indent=2)
+        Args:
+            filters (Dict): Only yield records whose fields equal these values
+            cursor (int): Resume position returned by an earlier iteration
+            with_cursor (bool): Yield (cursor, record) pairs, where cursor
+                resumes just after that record
+        """
+        return self._iter("leads", filters, cursor, with_cursor)
+    
+    def iter_emails(self, filters: Optional[Dict[str, Any]] = None, cursor: int = 0,
+                    with_cursor: bool = False) -> Iterator:
+        """Stream saved emails; see iter_leads for the arguments."""
+        return self._iter("emails", filters, cursor, with_cursor)
+    
+    def iter_steps(self, filters: Optional[Dict[str, Any]] = None, cursor: int = 0,
+                   with_cursor: bool = False) -> Iterator:
+        """Stream saved steps; see iter_leads for the arguments."""
+        return self._iter("steps", filters, cursor, with_cursor)
     
     def get_all_leads(self) -> List[Dict]:
         """Retrieve all saved leads."""
-        leads = []
-        leads_dir = os.path.join(self.logs_dir, "leads")
-        
-        for filename in os.listdir(leads_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(leads_dir, filename), 'r') as f:
-                    data = json.load(f)
-                    leads.extend(data.get("leads", []))
-        
-        return leads
+        return list(self.iter_leads())
     
     def get_all_emails(self) -> List[Dict]:
         """Retrieve all saved emails."""
-        emails = []
-        emails_dir = os.path.join(self.logs_dir, "emails")
-        
-        for filename in os.listdir(emails_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(emails_dir, filename), 'r') as f:
-                    emails.append(json.load(f))
-        
-        return emails
+        return list(self.iter_emails())
     
     def get_all_steps(self) -> List[Dict]:
         """Retrieve all saved steps."""
-        steps = []
-        steps_dir = os.path.join(self.logs_dir, "steps")
+        return list(self.iter_steps())
+    
+    def get_leads_for_run(self, run_id: str) -> List[Dict]:
+        """Retrieve the leads saved by a single run."""
+        return list(self.iter_leads({"run_id": run_id}))
+    
+    def get_emails_for_run(self, run_id: str) -> List[Dict]:
+        """Retrieve the emails generated by a single run."""
+        return list(self.iter_emails({"run_id": run_id}))
+    
+    def get_send_results(self, status: Optional[str] = None, run_id: Optional[str] = None) -> List[Dict]:
+        """Retrieve send results, optionally filtered by status and run."""
+        filters = {"type": "email_send_result"}
+        if status is not None:
+            filters["status"] = status
+        if run_id is not None:
+            filters["run_id"] = run_id
+        return list(self.iter_steps(filters))
+    
+    def get_unsent_emails(self, run_id: Optional[str] = None) -> List[Dict]:
+        """Retrieve emails that have no successful send result yet."""
+        sent = {(res.get("run_id"), res.get("to")) for res in self.get_send_results("sent", run_id)}
+        emails = self.iter_emails({"run_id": run_id} if run_id is not None else None)
+        return [email for email in emails if (email.get("run_id"), email.get("to")) not in sent]
+    
+    def export_to_csv(self, data_type: str = "leads", chunk_size: int = 10000,
+                      file_format: str = "csv") -> str:
+        """
+        Export data to CSV (or Parquet) without loading it all into memory.
         
-        for filename in os.listdir(steps_dir):
-            if filename.endswith('.json'):
-                with open(os.path.join(steps_dir, filename), 'r') as f:
-                    steps.append(json.load(f))
+        Records are streamed twice: once to collect the column names and once
+        to write them out ``chunk_size`` rows at a time. Nested values are
+        written as JSON. Parquet output requires pyarrow and stores every
+        column as a string, since records of one type don't share a schema.
         
-        return steps
-    
-    def export_to_csv(self, data_type: str = "leads"):
-        """Export data to CSV format."""
-        if data_type == "leads":
-            data = self.get_all_leads()
-            df = pd.DataFrame(data)
-        elif data_type == "emails":
-            data = self.get_all_emails()
-            df = pd.DataFrame(data)
-        elif data_type == "steps":
-            data = self.get_all_steps()
-            df = pd.DataFrame(data)
-        else:
+        Args:
+            data_type (str): 'leads', 'emails' or 'steps'
+            chunk_size (int): Number of rows held in memory per write
+            file_format (str): 'csv' or 'parquet'
+        Returns:
+            str: Path of the written file
+        """
+        readers = {"leads": self.iter_leads, "emails": self.iter_emails, "steps": self.iter_steps}
+        if data_type not in readers:
             raise ValueError(f"Unknown data type: {data_type}")
+        if file_format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown file format: {file_format}")
+        read = readers[data_type]
+        
+        columns = {}
+        for record in read():
+            for key in record:
+                columns.setdefault(key, None)
+        columns = list(columns)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.logs_dir, f"{data_type}_{timestamp}.csv")
-        df.to_csv(filename, index=False)
-        return filename 
\ No newline at end of file
+        filename = os.path.join(self.logs_dir, f"{data_type}_{timestamp}.{file_format}")
+        
+        if file_format == "csv":
+            # pandas takes a while to import; only pay for it when exporting
+            import pandas as pd
+            pd.DataFrame(columns=columns).to_csv(filename, index=False)
+            for chunk in _chunked(read(), chunk_size):
+                rows = [[_export_value(record.get(col)) for col in columns] for record in chunk]
+                pd.DataFrame(rows, columns=columns).to_csv(filename, mode='a', header=False, index=False)
+        else:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+            schema = pa.schema([(col, pa.string()) for col in columns])
+            with pq.ParquetWriter(filename, schema) as writer:
+                for chunk in _chunked(read(), chunk_size):
+                    table = pa.Table.from_pydict({
+                        col: [_parquet_value(record.get(col)) for record in chunk]
+                        for col in columns
+                    }, schema=schema)
+                    writer.write_table(table)
+        return filename
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+class _Span:
+    """Times a block and records it when the block exits."""
+
+    __slots__ = ("_metrics", "name", "labels", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict):
+        self._metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics._end_span(self, time.perf_counter() - self._start, exc_type is not None)
+        return False
+
+class Metrics:
+    """
+    In-process counters, latency histograms and timing spans.
+
+    Every ``span(name)`` observes its duration in the ``{name}_seconds``
+    histogram and is kept in a short list of recent spans. Values can be
+    exported as Prometheus text format or as a JSON snapshot. Use
+    NullMetrics when metrics are off; it has the same methods and does
+    nothing.
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, recent_spans: int = 1000):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collectors: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self._help: Dict[str, str] = {}
+        self._spans = deque(maxlen=recent_spans)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one value (e.g. a latency in seconds) in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            self._observe(name, key, value)
+
+    def _observe(self, name: str, key: LabelKey, value: float):
+        histogram = self._histograms.setdefault(name, {}).get(key)
+        if histogram is None:
+            histogram = self._histograms[name][key] = _Histogram(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram.counts[i] += 1
+                break
+        histogram.total += value
+        histogram.count += 1
+
+    def span(self, name: str, **labels) -> _Span:
+        """Context manager timing a block into the ``{name}_seconds`` histogram."""
+        return _Span(self, name, labels)
+
+    def _end_span(self, span: _Span, duration: float, failed: bool):
+        key = _label_key(span.labels)
+        with self._lock:
+            self._observe(f"{span.name}_seconds", key, duration)
+            self._spans.append({
+                "name": span.name,
+                "labels": dict(key),
+                "duration": duration,
+                "ended_at": time.time(),
+                "failed": failed
+            })
+
+    def collect(self, name: str, read: Callable[[], float], kind: str = "gauge", help: str = ""):
+        """
+        Report a value read at export time, e.g. a size kept elsewhere.
+
+        Args:
+            name (str): Metric name
+            read (Callable): Returns the current value
+            kind (str): "counter" or "gauge"
+            help (str): Description for the Prometheus HELP line
+        """
+        with self._lock:
+            self._collectors[name] = (kind, read)
+            if help:
+                self._help[name] = help
+
+    def describe(self, name: str, help: str):
+        """Set the Prometheus HELP text of a metric."""
+        with self._lock:
+            self._help[name] = help
+
+    def snapshot(self) -> Dict:
+        """All current values as a JSON-serializable dict."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": histogram.total,
+                        "buckets": dict(zip((str(bound) for bound in self.buckets), histogram.counts))
+                    }
+                    for key, histogram in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            collectors = dict(self._collectors)
+            spans = list(self._spans)
+        gauges = {}
+        for name, (kind, read) in collectors.items():
+            target = counters if kind == "counter" else gauges
+            target[name] = [{"labels": {}, "value": read()}]
+        return {
+            "timestamp": time.time(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+            "recent_spans": spans
+        }
+
+    def to_prometheus(self) -> str:
+        """All current values in the Prometheus text exposition format."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.total, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            collectors = dict(self._collectors)
+            help_text = dict(self._help)
+
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            if name in help_text:
+                lines.append(f"# HELP {name} {help_text[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name in sorted(counters):
+            header(name, "counter")
+            for key, value in counters[name].items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name in sorted(collectors):
+            kind, read = collectors[name]
+            header(name, kind)
+            lines.append(f"{name} {read()}")
+        for name in sorted(histograms):
+            header(name, "histogram")
+            for key, (counts, total, count) in histograms[name].items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Write all metrics to a file, replacing it atomically.
+
+        A path ending in ``.json`` gets the JSON snapshot; anything else gets
+        Prometheus text format (e.g. for the node_exporter textfile collector).
+        """
+        if path.endswith(".json"):
+            content = json.dumps(self.snapshot(), indent=2, default=str)
+        else:
+            content = self.to_prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class NullMetrics:
+    """Metrics that record nothing; every call is a no-op."""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def span(self, name: str, **labels) -> _NullSpan:
+        return _NULL_SPAN
+
+    def collect(self, name: str, read: Callable[[], float], kind: str = "gauge", help: str = ""):
+        pass
+
+    def describe(self, name: str, help: str):
+        pass
+
+    def snapshot(self) -> Dict:
+        return {}
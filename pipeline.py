@@ -0,0 +1,71 @@
+import queue
+import threading
+from typing import Any, Iterator, List
+
+_END = object()
+
+class Channel:
+    """
+    Bounded queue connecting two pipeline stages.
+
+    ``put`` blocks while the channel is full (backpressure) and readers
+    block while it is empty, but both give up once ``stop`` is set, so a
+    failed stage can't deadlock its neighbours.
+    """
+
+    def __init__(self, maxsize: int, stop: threading.Event, poll_interval: float = 0.1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = stop
+        self._poll_interval = poll_interval
+
+    def put(self, item: Any) -> bool:
+        """Enqueue an item; returns False if the pipeline was stopped first."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=self._poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        """Signal the consumer that no more items will arrive."""
+        self.put(_END)
+
+    def _get(self) -> Any:
+        while True:
+            try:
+                return self._queue.get(timeout=self._poll_interval)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _END
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            item = self._get()
+            if item is _END:
+                return
+            yield item
+
+    def batches(self, max_items: int) -> Iterator[List[Any]]:
+        """
+        Yield lists of up to ``max_items`` items.
+
+        Waits only for the first item of each batch and then takes whatever
+        else is already queued, so a slow producer never delays a batch.
+        """
+        while True:
+            item = self._get()
+            if item is _END:
+                return
+            batch = [item]
+            while len(batch) < max_items:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    yield batch
+                    return
+                batch.append(item)
+            yield batch
@@ -1,93 +1,205 @@
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from functools import lru_cache
+import re
+
+# Step descriptions per tool; "{goal}" is replaced with the goal text
+STEP_DESCRIPTIONS = {
+    "search": "Research and find relevant leads for: {goal}",
+    "summarize": "Generate summaries of the found leads and their companies",
+    "write_email": "Create personalized outreach emails for each lead",
+    "send_email": "Send the prepared emails to the leads"
+}
+
+# Steps used when no keyword matches
+FALLBACK_STEPS = (
+    ("search", "Research and find relevant leads"),
+    ("write_email", "Generate personalized emails for each lead"),
+    ("send_email", "Send the emails")
+)
+
+class KeywordMatcher:
+    """
+    Finds the highest-priority keyword occurring anywhere in a text.
+
+    Keywords are compiled into one trie-shaped regex, so the cost per text
+    position depends on keyword length rather than on how many keywords
+    there are. The regex always takes the longest keyword starting at a
+    position; any shorter keywords starting there are its prefixes, which
+    are precomputed, so every occurrence is considered. Priority is the
+    order of ``keywords`` (first wins), whatever their order in the text.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self._priority = {}
+        for rank, keyword in enumerate(self.keywords):
+            self._priority.setdefault(keyword, rank)
+        # Best rank among the keywords that are prefixes of each keyword,
+        # found by looking up each keyword's own prefixes
+        self._best_prefix = {}
+        priority = self._priority
+        for keyword, rank in priority.items():
+            for end in range(1, len(keyword)):
+                other = priority.get(keyword[:end])
+                if other is not None and other < rank:
+                    rank = other
+            self._best_prefix[keyword] = rank
+        self._regex = None
+        if self._priority:
+            self._regex = re.compile("(?=(" + self._trie_pattern(sorted(self._priority)) + "))")
+
+    @classmethod
+    def _trie_pattern(cls, words: List[str]) -> str:
+        """Regex matching exactly ``words`` (sorted, non-empty), longest first."""
+        ends_here = "" in words
+        branches: Dict[str, List[str]] = {}
+        for word in words:
+            if word:
+                branches.setdefault(word[0], []).append(word[1:])
+        alternatives = [re.escape(char) + cls._trie_pattern(rest) for char, rest in branches.items()]
+        if not alternatives:
+            return ""
+        pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if ends_here:
+            # Greedy optional part: a longer keyword wins over this one
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    def best(self, text: str) -> Optional[str]:
+        """The highest-priority keyword in ``text`` (case-insensitive), or None."""
+        if self._regex is None:
+            return None
+        best_rank = None
+        for match in self._regex.finditer(text.lower()):
+            rank = self._best_prefix[match.group(1)]
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                if rank == 0:
+                    break
+        return self.keywords[best_rank] if best_rank is not None else None
 
 class GoalPlanner:
-    def __init__(self):
+    def __init__(self, patterns: Optional[Dict[str, List[str]]] = None, cache_size: int = 65536):
+        """
+        Args:
+            patterns (Dict[str, List[str]]): Keyword -> tools table to use
+                instead of the built-in one. When several keywords occur in
+                a goal, the one listed first wins.
+            cache_size (int): Goal segments whose plans are memoized
+        """
         # Define common patterns for goal breakdown
-        self.patterns = {
-            "find": ["search", "write_email", "send_email"],
-            "research": ["search", "summarize", "write_email"],
-            "outreach": ["search", "write_email", "send_email"],
-            "contact": ["search", "write_email", "send_email"],
-            "connect": ["search", "write_email", "send_email"]
-        }
-    
+        if patterns is None:
+            patterns = {
+                "find": ["search", "write_email", "send_email"],
+                "research": ["search", "summarize", "write_email"],
+                "outreach": ["search", "write_email", "send_email"],
+                "contact": ["search", "write_email", "send_email"],
+                "connect": ["search", "write_email", "send_email"]
+            }
+        # Keywords match case-insensitively, so they are kept lowercase
+        self.patterns = {keyword.lower(): list(tools) for keyword, tools in patterns.items()}
+        self._plan_template = lru_cache(maxsize=cache_size)(self._build_plan_template)
+        self._matcher = None
+
+    def _invalidate(self):
+        """Drop the matcher and memoized plans; the matcher is rebuilt on the next match."""
+        self._matcher = None
+        self._plan_template.cache_clear()
+
+    def _get_matcher(self) -> KeywordMatcher:
+        matcher = self._matcher
+        if matcher is None:
+            matcher = self._matcher = KeywordMatcher(list(self.patterns))
+        return matcher
+
+    def add_pattern(self, keyword: str, tools: List[str], first: bool = False):
+        """
+        Add (or replace) a keyword in the pattern table. The keyword matcher
+        is rebuilt when the next goal is planned, so adding many keywords
+        in a row compiles it once.
+
+        Args:
+            keyword (str): Keyword to look for in goals (case-insensitive)
+            tools (List[str]): Tools to run, in order, when it matches
+            first (bool): Give the keyword the highest priority instead of
+                the lowest
+        """
+        keyword = keyword.lower()
+        self.patterns.pop(keyword, None)
+        if first:
+            self.patterns = {keyword: list(tools), **self.patterns}
+        else:
+            self.patterns[keyword] = list(tools)
+        self._invalidate()
+
     def break_down_goal(self, goal: str) -> List[Dict]:
         """
         Break down a high-level goal into specific, actionable steps using pattern matching.
-        
+
+        A goal may list several independent segments separated by ';' or
+        newlines (e.g. "Find AI founders; research fintech CTOs"). Each segment
+        gets its own chain of steps; steps only depend on earlier steps of the
+        same segment, so segments can run side by side.
+
         Args:
             goal (str): The high-level goal provided by the user
-            
+
         Returns:
             List[Dict]: A list of steps, each containing:
                 - step_id: Unique identifier
                 - description: What needs to be done
                 - tool: Which tool to use
                 - status: Current status (pending, in_progress, completed)
+                - segment: Index of the goal segment the step belongs to
+                - depends_on: step_ids that must complete before this step
         """
-        # Convert goal to lowercase for pattern matching
-        goal_lower = goal.lower()
-        
-        # Determine the type of goal based on keywords
-        goal_type = None
-        for keyword in self.patterns:
-            if keyword in goal_lower:
-                goal_type = keyword
-                break
-        
-        # If no pattern matches, use default steps
-        if goal_type is None:
-            return self._fallback_breakdown(goal)
-        
-        # Create steps based on the pattern
+        return self._break_down(goal, datetime.now().isoformat())
+
+    def break_down_goals(self, goals: List[str]) -> List[List[Dict]]:
+        """
+        Plan many goals at once.
+
+        Args:
+            goals (List[str]): Goals to plan
+
+        Returns:
+            List[List[Dict]]: The steps of each goal, in the same order
+        """
+        created_at = datetime.now().isoformat()
+        return [self._break_down(goal, created_at) for goal in goals]
+
+    def _break_down(self, goal: str, created_at: str) -> List[Dict]:
+        segments = [part.strip() for part in re.split(r"[;\n]+", goal) if part.strip()] or [goal]
         steps = []
-        for i, tool in enumerate(self.patterns[goal_type], 1):
-            step = {
-                "step_id": i,
-                "description": self._get_step_description(tool, goal),
-                "tool": tool,
-                "status": "pending",
-                "created_at": datetime.now().isoformat()
-            }
-            steps.append(step)
-        
+        for segment, segment_goal in enumerate(segments):
+            previous = None
+            for tool, description in self._plan_template(segment_goal):
+                step_id = len(steps) + 1
+                steps.append({
+                    "step_id": step_id,
+                    "description": description,
+                    "tool": tool,
+                    "status": "pending",
+                    "created_at": created_at,
+                    "segment": segment,
+                    "depends_on": [previous] if previous is not None else []
+                })
+                previous = step_id
         return steps
-    
+
+    def _build_plan_template(self, goal: str) -> Tuple[Tuple[str, str], ...]:
+        """(tool, description) pairs for one goal segment; memoized per segment."""
+        goal_type = self._get_matcher().best(goal)
+
+        # If no pattern matches, use default steps
+        if goal_type is None:
+            return FALLBACK_STEPS
+        return tuple((tool, self._get_step_description(tool, goal)) for tool in self.patterns[goal_type])
+
     def _get_step_description(self, tool: str, goal: str) -> str:
         """Generate a description for a step based on the tool and goal."""
-        descriptions = {
-            "search": f"Research and find relevant leads for: {goal}",
-            "summarize": "Generate summaries of the found leads and their companies",
-            "write_email": "Create personalized outreach emails for each lead",
-            "send_email": "Send the prepared emails to the leads"
-        }
-        return descriptions.get(tool, f"Execute {tool} step for: {goal}")
-    
-    def _fallback_breakdown(self, goal: str) -> List[Dict]:
-        """
-        A simpler fallback method for breaking down goals if no pattern matches.
-        """
-        return [
-            {
-                "step_id": 1,
-                "description": "Research and find relevant leads",
-                "tool": "search",
-                "status": "pending",
-                "created_at": datetime.now().isoformat()
-            },
-            {
-                "step_id": 2,
-                "description": "Generate personalized emails for each lead",
-                "tool": "write_email",
-                "status": "pending",
-                "created_at": datetime.now().isoformat()
-            },
-            {
-                "step_id": 3,
-                "description": "Send the emails",
-                "tool": "send_email",
-                "status": "pending",
-                "created_at": datetime.now().isoformat()
-            }
-        ] 
\ No newline at end of file
+        template = STEP_DESCRIPTIONS.get(tool)
+        if template is None:
+            return f"Execute {tool} step for: {goal}"
+        return template.replace("{goal}", goal)
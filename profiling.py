@@ -0,0 +1,183 @@
+"""
+Per-step CPU and allocation profiling.
+
+StepProfiler wraps each step of AgentSender.run in cProfile and
+tracemalloc and writes, per step, a pstats dump (``.prof``), a readable
+report (``.txt``) and an entry in ``summary.json``: top functions by
+cumulative time, top allocation sites and peak traced memory.
+
+Compare two profiled runs with:
+
+    python profiling.py logs/profiles/<run_a> logs/profiles/<run_b>
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+def _function_name(key) -> str:
+    filename, line, function = key
+    if filename == "~":
+        return function
+    return f"{os.path.basename(filename)}:{line}({function})"
+
+class StepProfiler:
+    """
+    Profiles steps one at a time into ``directory/<run_id>/``.
+
+    cProfile only sees the thread that runs the step and tracemalloc
+    traces the whole process, so steps must not overlap: AgentSender runs
+    steps one at a time while a profiler is set. Work handed to other
+    threads or processes (the SMTP pool, sharded rendering) shows up only
+    as time spent waiting for it.
+    """
+
+    def __init__(self, directory: str, top: int = 25):
+        self.directory = directory
+        self.top = top
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, step: Dict, run_id: str) -> Iterator[None]:
+        """Profile the block as ``step`` and write its reports."""
+        with self._lock:
+            run_dir = os.path.join(self.directory, run_id)
+            os.makedirs(run_dir, exist_ok=True)
+
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(10)
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                self._write(run_dir, step, profiler, seconds, peak, before, after)
+
+    def _write(self, run_dir: str, step: Dict, profiler: cProfile.Profile, seconds: float,
+               peak: int, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot):
+        name = f"step_{step['step_id']:03d}_{step['tool']}"
+        profiler.dump_stats(os.path.join(run_dir, name + ".prof"))
+
+        stats = pstats.Stats(profiler)
+        by_cumulative = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        functions = [
+            {"function": _function_name(key), "calls": calls, "tottime": tottime, "cumtime": cumtime}
+            for key, (_, calls, tottime, cumtime, _) in by_cumulative[:self.top]
+        ]
+        # Ignore the profiler's own bookkeeping when ranking allocation sites
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, cProfile.__file__)]
+        differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        allocations = [
+            {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_bytes": stat.size_diff, "count": stat.count_diff}
+            for stat in sorted(differences, key=lambda stat: stat.size_diff, reverse=True)[:self.top]
+            if stat.size_diff > 0
+        ]
+        entry = {
+            "step_id": step["step_id"],
+            "tool": step["tool"],
+            "description": step.get("description"),
+            "status": step.get("status"),
+            "seconds": seconds,
+            "peak_bytes": peak,
+            "top_functions": functions,
+            "top_allocations": allocations
+        }
+
+        report = io.StringIO()
+        report.write(f"Step {step['step_id']} ({step['tool']}): {step.get('description', '')}\n")
+        report.write(f"Wall time: {seconds:.3f}s   Peak traced memory: {peak / 2**20:.2f} MiB\n\n")
+        report.write("Top functions by cumulative time:\n")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(self.top)
+        report.write("Top allocation sites (net growth during the step):\n")
+        for allocation in allocations:
+            report.write(f"  {allocation['size_bytes'] / 1024:10.1f} KiB  {allocation['count']:8d} blocks  "
+                         f"{allocation['site']}\n")
+        with open(os.path.join(run_dir, name + ".txt"), 'w', encoding="utf-8") as f:
+            f.write(report.getvalue())
+
+        summary_path = os.path.join(run_dir, "summary.json")
+        steps = []
+        if os.path.exists(summary_path):
+            with open(summary_path, 'r', encoding="utf-8") as f:
+                steps = json.load(f)["steps"]
+        steps = [existing for existing in steps if existing["step_id"] != step["step_id"]] + [entry]
+        tmp_path = summary_path + ".tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            json.dump({"steps": sorted(steps, key=lambda s: s["step_id"])}, f, indent=2)
+        os.replace(tmp_path, summary_path)
+
+def load_summary(run_dir: str) -> List[Dict]:
+    """Per-step entries of a profiled run."""
+    with open(os.path.join(run_dir, "summary.json"), 'r', encoding="utf-8") as f:
+        return json.load(f)["steps"]
+
+def diff_profiles(before_dir: str, after_dir: str, top: int = 10) -> str:
+    """
+    Summarize how a profiled run differs from an earlier one.
+
+    Steps are matched by step_id and tool. For each step this reports the
+    change in wall time and peak memory, and the functions whose cumulative
+    time changed the most.
+
+    Args:
+        before_dir (str): Profile directory of the earlier run
+        after_dir (str): Profile directory of the later run
+        top (int): Functions listed per step
+
+    Returns:
+        str: The report
+    """
+    before = {(step["step_id"], step["tool"]): step for step in load_summary(before_dir)}
+    lines = []
+    for step in load_summary(after_dir):
+        old = before.get((step["step_id"], step["tool"]))
+        if old is None:
+            lines.append(f"Step {step['step_id']} ({step['tool']}): not in {before_dir}")
+            continue
+        time_change = step["seconds"] - old["seconds"]
+        ratio = step["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        lines.append(
+            f"Step {step['step_id']} ({step['tool']}): {old['seconds']:.3f}s -> {step['seconds']:.3f}s "
+            f"({time_change:+.3f}s, x{ratio:.2f}), peak {old['peak_bytes'] / 2**20:.2f} -> "
+            f"{step['peak_bytes'] / 2**20:.2f} MiB"
+        )
+        old_functions = {entry["function"]: entry["cumtime"] for entry in old["top_functions"]}
+        new_functions = {entry["function"]: entry["cumtime"] for entry in step["top_functions"]}
+        changes = sorted(
+            ((name, new_functions.get(name, 0.0) - old_functions.get(name, 0.0))
+             for name in set(old_functions) | set(new_functions)),
+            key=lambda change: abs(change[1]), reverse=True
+        )
+        for name, change in changes[:top]:
+            if change:
+                lines.append(f"    {change:+9.4f}s  {name}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two profiled AgentSender runs")
+    parser.add_argument("before", help="Profile directory of the earlier run")
+    parser.add_argument("after", help="Profile directory of the later run")
+    parser.add_argument("--top", type=int, default=10, help="Functions listed per step")
+    args = parser.parse_args()
+    print(diff_profiles(args.before, args.after, top=args.top))
+
+if __name__ == "__main__":
+    main()
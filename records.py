@@ -0,0 +1,20 @@
+import sys
+from typing import Dict, Optional
+
+def email_domain(email: Optional[str]) -> str:
+    """Lowercased (interned) domain of an address, or "" if there is none."""
+    if not email or "@" not in email:
+        return ""
+    return sys.intern(email.rpartition("@")[2].lower())
+
+def email_to_record(email: Dict) -> Dict:
+    """
+    Storage form of an email: the embedded lead dict is replaced by a
+    ``lead_email`` reference, since the lead is already stored on its own.
+    """
+    lead = email.get("lead")
+    if not isinstance(lead, dict):
+        return email
+    record = {key: value for key, value in email.items() if key != "lead"}
+    record["lead_email"] = lead.get("email")
+    return record
@@ -0,0 +1,119 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+def step_dependencies(steps: List[Dict]) -> Dict[int, List[int]]:
+    """
+    Dependencies of each step.
+
+    Steps without a ``depends_on`` list (plans made before dependencies
+    existed) depend on the step right before them, i.e. run in order.
+    """
+    dependencies = {}
+    previous = None
+    for step in steps:
+        if "depends_on" in step:
+            dependencies[step["step_id"]] = list(step["depends_on"])
+        else:
+            dependencies[step["step_id"]] = [previous] if previous is not None else []
+        previous = step["step_id"]
+    return dependencies
+
+class StepScheduler:
+    """
+    Runs the pending steps of a plan as a dependency graph on a worker pool.
+
+    Each step keeps a count of unfinished dependencies; when a step
+    completes, its dependents' counts are decremented and any that reach
+    zero become ready, so readiness is tracked in O(1) per edge. When a
+    step fails, every step downstream of it is failed immediately without
+    running.
+    """
+
+    def __init__(self, steps: List[Dict], execute: Callable[[Dict], Any],
+                 fail: Callable[[Dict, str], Any], max_workers: int = 4):
+        """
+        Args:
+            steps (List[Dict]): The full plan; only pending steps are run
+            execute (Callable): Runs one step and sets its status
+            fail (Callable): Marks a step failed with an error message
+            max_workers (int): Most steps run at the same time
+        """
+        self.steps = {step["step_id"]: step for step in steps}
+        self.execute = execute
+        self.fail = fail
+        self.max_workers = max_workers
+
+        dependencies = step_dependencies(steps)
+        self._waiting: Dict[int, int] = {}
+        self._dependents: Dict[int, List[int]] = {step_id: [] for step_id in self.steps}
+        self._failed_dependency: Dict[int, int] = {}
+        for step_id, step in self.steps.items():
+            if step["status"] != "pending":
+                continue
+            self._waiting[step_id] = 0
+            for dep in dependencies[step_id]:
+                if dep not in self.steps:
+                    raise ValueError(f"Step {step_id} depends on unknown step {dep}")
+                dep_status = self.steps[dep]["status"]
+                if dep_status == "completed":
+                    continue
+                if dep_status == "failed":
+                    self._failed_dependency.setdefault(step_id, dep)
+                self._waiting[step_id] += 1
+                self._dependents[dep].append(step_id)
+
+    def _fail_downstream(self, step_id: int, results: Dict[int, Any]):
+        """Fail every pending step that (transitively) depends on ``step_id``."""
+        queue = deque([step_id])
+        while queue:
+            failed = queue.popleft()
+            for dependent in self._dependents[failed]:
+                if dependent in results:
+                    continue
+                error = f"Dependency step {failed} failed"
+                self.fail(self.steps[dependent], error)
+                results[dependent] = {"error": error}
+                queue.append(dependent)
+
+    def run(self) -> Dict[int, Any]:
+        """Run every pending step; returns results keyed by step_id."""
+        results: Dict[int, Any] = {}
+        for step_id, dep in self._failed_dependency.items():
+            if step_id not in results:
+                error = f"Dependency step {dep} failed"
+                self.fail(self.steps[step_id], error)
+                results[step_id] = {"error": error}
+                self._fail_downstream(step_id, results)
+
+        ready = deque(step_id for step_id, count in self._waiting.items()
+                      if count == 0 and step_id not in results)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while ready or running:
+                while ready and len(running) < self.max_workers:
+                    step_id = ready.popleft()
+                    running[executor.submit(self.execute, self.steps[step_id])] = step_id
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    try:
+                        results[step_id] = future.result()
+                    except Exception as e:
+                        self.fail(self.steps[step_id], str(e))
+                        results[step_id] = {"error": str(e)}
+                    if self.steps[step_id]["status"] == "failed":
+                        self._fail_downstream(step_id, results)
+                        continue
+                    for dependent in self._dependents[step_id]:
+                        self._waiting[dependent] -= 1
+                        if self._waiting[dependent] == 0 and dependent not in results:
+                            ready.append(dependent)
+
+        # Anything left never became ready (a dependency cycle)
+        for step_id in self._waiting:
+            if step_id not in results:
+                error = "Step is part of a dependency cycle"
+                self.fail(self.steps[step_id], error)
+                results[step_id] = {"error": error}
+        return results
@@ -0,0 +1,37 @@
+import io
+from batch import BatchRunner, format_summary, read_goals
+from tools.rate_limiter import SendScheduler
+
+def test_read_goals_plain_and_jsonl():
+    goals = read_goals(io.StringIO(
+        "Find AI founders\n\n# comment\n"
+        '{"goal": "Contact fintech CTOs", "tone": "casual"}\n'
+    ))
+    assert goals == [{"goal": "Find AI founders", "tone": None},
+                     {"goal": "Contact fintech CTOs", "tone": "casual"}]
+
+def test_batch_keeps_goal_logs_apart_but_emails_each_lead_once(tmp_path, monkeypatch, smtp_sink):
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("EMAIL_USE_TLS", "0")
+    monkeypatch.setenv("EMAIL_DRY_RUN", "0")
+    monkeypatch.setenv("EMAIL_SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("EMAIL_SMTP_PORT", str(smtp_sink.port))
+    shared_dir = str(tmp_path / "shared")
+    scheduler = SendScheduler(rate=1000, burst=1000, domain_rate=1000, domain_burst=1000)
+    runner = BatchRunner(workers=3, logs_dir=str(tmp_path / "night1"), scheduler=scheduler,
+                         shared_dir=shared_dir)
+    summary = runner.run([{"goal": "Find AI founders", "tone": None}] * 4)
+    # The next night's batch finds the same leads again
+    next_night = BatchRunner(workers=3, logs_dir=str(tmp_path / "night2"), scheduler=scheduler,
+                             shared_dir=shared_dir)
+    next_summary = next_night.run([{"goal": "Find AI founders", "tone": None}] * 2)
+
+    assert summary["goals"] == 4 and summary["completed"] == 4
+    assert next_summary["completed"] == 2
+    # Same leads in every goal and batch: dedup is shared, so each lead is emailed once
+    assert len(smtp_sink.handler.messages) == 3
+    assert sorted(rcpt for rcpts, _ in smtp_sink.handler.messages for rcpt in rcpts) == \
+        ["emma@robolearn.ai", "michael@nlpinnovations.com", "sarah@aivisionlabs.com"]
+    assert scheduler.stats()["dispatched"] == 3
+    assert len({result["logs_dir"] for result in summary["results"]}) == 4
+    assert "4 completed" in format_summary(summary)
@@ -0,0 +1,23 @@
+from benchmarks.bench_pipeline import compare, main
+from benchmarks.synthetic import generate_leads
+
+def test_synthetic_leads_are_deterministic():
+    assert generate_leads(50, seed=3) == generate_leads(50, seed=3)
+    assert generate_leads(50, seed=3) != generate_leads(50, seed=4)
+    assert len({lead["email"] for lead in generate_leads(1000)}) == 1000
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"results": [{"stage": "writer", "size": 10, "seconds": 1.0, "peak_bytes": 100},
+                            {"stage": "planner", "size": 10, "seconds": 1.0, "peak_bytes": 100}]}
+    results = [{"stage": "writer", "size": 10, "seconds": 1.1, "peak_bytes": 100},
+               {"stage": "planner", "size": 10, "seconds": 1.0, "peak_bytes": 200},
+               {"stage": "storage_read", "size": 10, "seconds": 1.0, "peak_bytes": 100}]
+    comparison = compare(results, baseline, tolerance=0.25)
+    assert [(entry["stage"], entry["regression"]) for entry in comparison] == [("writer", False), ("planner", True)]
+
+def test_benchmark_writes_json_report(tmp_path):
+    output = tmp_path / "bench.json"
+    assert main(["--sizes", "200", "--stages", "planner", "writer", "storage_read",
+                 "--output", str(output)]) == 0
+    assert main(["--sizes", "200", "--stages", "writer", "--baseline", str(output),
+                 "--tolerance", "1000", "--fail-on-regression", "--output", str(tmp_path / "next.json")]) == 0
@@ -0,0 +1,62 @@
+import threading
+from agent import AgentSender
+from events import EMAILS_SENT, LEADS_FOUND, STEP, EventBus, ProgressCounters, read_events
+from memory.storage import MemoryStorage
+
+def test_bus_counts_tails_and_notifies():
+    bus = EventBus(max_events=3)
+    seen = []
+    unsubscribe = bus.subscribe(seen.append)
+    bus.publish("run_started", "r1", goal="g", total_steps=2)
+    bus.publish(STEP, "r1", step_id=1, status="in_progress", previous="pending")
+    bus.publish(STEP, "r1", step_id=1, status="completed", previous="in_progress")
+    bus.publish(LEADS_FOUND, "r1", count=5)
+    unsubscribe()
+    bus.publish(EMAILS_SENT, "r2", sent=2, failed=1)
+
+    assert len(seen) == 4
+    progress = bus.progress("r1")
+    assert (progress["completed_steps"], progress["pending_steps"], progress["leads_found"]) == (1, 1, 5)
+    assert bus.progress("r2")["emails_failed"] == 1
+    # Only the last three events are kept; older ones are skipped, not repeated
+    events, cursor = bus.since(0)
+    assert [event["seq"] for event in events] == [3, 4, 5] and cursor == 5
+    assert bus.since(cursor) == ([], 5)
+
+    threading.Timer(0.05, lambda: bus.publish(LEADS_FOUND, "r1", count=1)).start()
+    events, cursor = bus.wait(5, timeout=5)
+    assert [event["seq"] for event in events] == [6] and cursor == 6
+
+def test_read_events_follows_file_and_skips_partial_lines(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    bus = EventBus(path=path, flush_every=1)
+    bus.publish(LEADS_FOUND, "r1", count=2)
+    events, offset = read_events(path)
+    assert [event["count"] for event in events] == [2]
+
+    with open(path, 'a', encoding="utf-8") as f:
+        f.write('{"seq": 99, "type": "leads_fo')
+    assert read_events(path, offset) == ([], offset)
+    bus.close()
+
+    counters = ProgressCounters()
+    for event in read_events(path)[0]:
+        counters.apply(event)
+    assert counters.snapshot()["leads_found"] == 2
+
+def test_agent_progress_comes_from_events(tmp_path, monkeypatch):
+    bus = EventBus()
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path)), dedup=False, events=bus)
+    agent.sender = type("NoSend", (), {"deliver_outbox": lambda self, outbox, **scope: []})()
+    agent.set_goal("Find AI founders; research robotics CEOs")
+    agent.run()
+
+    progress = agent.get_progress()
+    assert (progress["completed_steps"], progress["total_steps"]) == (6, 6)
+    assert progress["leads_found"] == 6 and progress["emails_rendered"] == 6
+    steps = [event for event in bus.since(0)[0] if event["type"] == STEP]
+    assert len(steps) == 12 and all(event["run_id"] == agent.run_id for event in steps)
+
+    resumed = AgentSender(memory=MemoryStorage(str(tmp_path)), dedup=False, events=bus)
+    resumed.load_run(agent.run_id)
+    assert resumed.get_progress()["completed_steps"] == 6
@@ -0,0 +1,76 @@
+import time
+from tools.llm_writer import ChatCompletionsClient, DraftCache, LLMPersonalizer, draft_key
+from tools.write_email import EmailWriter
+
+def _draft_emails(request):
+    return {"emails": [{"id": lead["id"], "subject": f"Idea for {lead['company']}",
+                        "body": f"Hi {lead['name']}, written for {lead['company']}."}
+                       for lead in request["leads"]]}
+
+def _leads(n):
+    return [{"name": f"Lead {i}", "company": f"Company {i}", "email": f"lead{i}@example.com"} for i in range(n)]
+
+def test_personalizer_batches_dedupes_and_caches(tmp_path, completions_stub):
+    stub = completions_stub(_draft_emails)
+    cache_path = str(tmp_path / "drafts.db")
+    # Five leads repeat the prompt fields of others (same person, other address)
+    leads = _leads(40) + [{**lead, "email": f"alt{i}@example.com"} for i, lead in enumerate(_leads(5))]
+    client = ChatCompletionsClient(api_key="test", base_url=stub["base_url"], backoff=0)
+    personalizer = LLMPersonalizer(client, batch_size=10, max_in_flight=2, cache_path=cache_path)
+    emails = EmailWriter(personalizer=personalizer).write_emails(leads)
+
+    assert len(stub["requests"]) == 4 and stub["max_in_flight"] <= 2
+    assert emails[3] == {"to": "lead3@example.com", "subject": "Idea for Company 3",
+                         "body": "Hi Lead 3, written for Company 3.", "lead": leads[3]}
+    assert emails[41]["to"] == "alt1@example.com" and emails[41]["body"] == emails[1]["body"]
+    assert personalizer.stats()["drafted"] == 45
+    personalizer.close()
+
+    # A new process with the same cache file asks for nothing
+    again = LLMPersonalizer(ChatCompletionsClient(api_key="test", base_url=stub["base_url"]),
+                            cache_path=cache_path)
+    streamed = list(EmailWriter(personalizer=again).stream_emails(iter(leads)))
+    assert streamed == emails and len(stub["requests"]) == 4
+    assert again.stats()["cache_hits"] == 45
+    again.close()
+
+def test_personalizer_retries_rate_limits_and_falls_back_on_timeout(completions_stub):
+    stub = completions_stub(
+        _draft_emails, rate_limited=2, slow_when=lambda request: any(lead["company"] == "Company 7" for lead in request["leads"])
+    )
+    client = ChatCompletionsClient(api_key="test", base_url=stub["base_url"], timeout=0.3, backoff=0)
+    personalizer = LLMPersonalizer(client, batch_size=5, max_in_flight=2)
+    writer = EmailWriter(personalizer=personalizer)
+    leads = _leads(10)
+    emails = writer.write_emails(leads)
+
+    static = EmailWriter().write_emails(leads)
+    # Leads 5-9 shared a request with the slow lead: template emails
+    assert emails[5:] == static[5:]
+    assert emails[0]["subject"] == "Idea for Company 0"
+    stats = personalizer.stats()
+    assert stats["retries"] == 2 and stats["fallbacks"] == 5 and stats["failures"] == 1
+    personalizer.close()
+
+def test_close_caches_late_replies_or_drops_them_cleanly(tmp_path, completions_stub):
+    stub = completions_stub(_draft_emails, slow_when=lambda request: True, delay=0.4)
+    cache_path = str(tmp_path / "drafts.db")
+    client = ChatCompletionsClient(api_key="test", base_url=stub["base_url"])
+    personalizer = LLMPersonalizer(client, batch_size=5, cache_path=cache_path, deadline=0.05)
+    assert personalizer.personalize(_leads(5), "template", "professional") == [None] * 5
+    # close() waits for the open request, whose reply is cached
+    personalizer.close()
+    again = LLMPersonalizer(client, cache_path=cache_path)
+    assert None not in again.personalize(_leads(5), "template", "professional")
+    assert again.stats()["cache_hits"] == 5
+    again.close()
+
+    hurried = LLMPersonalizer(client, batch_size=5, cache_path=cache_path, deadline=0.05)
+    late_leads = _leads(10)[5:]
+    hurried.personalize(late_leads, "template", "professional")
+    hurried.close(wait=False)
+    # The reply arrives after the cache is closed and is skipped, not written
+    time.sleep(0.6)
+    assert len(stub["requests"]) == 2
+    keys = [draft_key("template", "professional", client.model, lead) for lead in late_leads]
+    assert DraftCache(cache_path).get_many(keys) == {}
@@ -0,0 +1,46 @@
+import json
+from agent import AgentSender
+from memory.storage import MemoryStorage
+from metrics import Metrics, NullMetrics
+
+def test_metrics_counters_histograms_and_exports(tmp_path):
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.inc("emails_sent_total", status="sent")
+    metrics.inc("emails_sent_total", 2, status="sent")
+    metrics.observe("step_seconds", 0.5, tool="search")
+    metrics.observe("step_seconds", 5, tool="search")
+    with metrics.span("tool", tool="write_email"):
+        pass
+    metrics.collect("storage_bytes_written_total", lambda: 42, kind="counter")
+
+    text = metrics.to_prometheus()
+    assert 'emails_sent_total{status="sent"} 3' in text
+    assert 'step_seconds_bucket{tool="search",le="1"} 1' in text
+    assert 'step_seconds_bucket{tool="search",le="+Inf"} 2' in text
+    assert "storage_bytes_written_total 42" in text
+    assert 'tool_seconds_count{tool="write_email"} 1' in text
+
+    metrics.write(str(tmp_path / "metrics.json"))
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    assert snapshot["counters"]["storage_bytes_written_total"][0]["value"] == 42
+    assert snapshot["recent_spans"][0]["name"] == "tool"
+
+    null = NullMetrics()
+    with null.span("step", tool="search"):
+        null.inc("leads_found_total")
+    assert null.snapshot() == {}
+
+def test_agent_records_step_and_tool_metrics(tmp_path):
+    metrics = Metrics()
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path)), metrics=metrics, dedup=False)
+    agent.set_goal("Find AI founders")
+    agent.run()
+    snapshot = agent.get_progress()["metrics"]
+    counters = {name: sum(entry["value"] for entry in series) for name, series in snapshot["counters"].items()}
+    assert counters["leads_found_total"] == 3
+    assert counters["emails_rendered_total"] == 3
+    assert counters["emails_sent_total"] == 3
+    assert counters["steps_total"] == 3
+    assert counters["storage_bytes_written_total"] > 0
+    tools = {entry["labels"]["tool"] for entry in snapshot["histograms"]["tool_seconds"]}
+    assert tools == {"search", "write_email", "send_email"}
@@ -0,0 +1,37 @@
+import threading
+from agent import AgentSender
+from memory.storage import MemoryStorage
+from pipeline import Channel
+
+def test_channel_batches_take_what_is_queued():
+    channel = Channel(10, threading.Event())
+    for i in range(5):
+        channel.put(i)
+    channel.close()
+    assert list(channel.batches(3)) == [[0, 1, 2], [3, 4]]
+
+def test_streaming_run_reports_per_stage_progress(tmp_path, monkeypatch):
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path)))
+    agent.set_goal("Find 3 AI startup founders and prepare personalized outreach")
+    results = agent.run(streaming=True, queue_size=1)
+
+    assert [result["processed"] for result in results] == [3, 3, 3]
+    progress = agent.get_progress()
+    assert progress["completed_steps"] == 3
+    assert [stage["status"] for stage in progress["stages"].values()] == ["completed"] * 3
+    assert len(agent.memory.get_emails_for_run(agent.run_id)) == 3
+    assert len(agent.memory.get_send_results(run_id=agent.run_id)) == 3
+
+def test_streaming_run_stops_downstream_when_a_stage_fails(tmp_path):
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path)))
+    agent.set_goal("Find AI founders")
+
+    def broken_writer(leads, tone):
+        raise ValueError("template exploded")
+        yield
+
+    agent.writer.stream_emails = broken_writer
+    agent.run(streaming=True)
+    statuses = [step["status"] for step in agent.current_steps]
+    assert statuses[1:] == ["failed", "failed"]
+    assert agent.current_steps[1]["error"] == "template exploded"
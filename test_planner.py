@@ -0,0 +1,36 @@
+from planner import GoalPlanner, KeywordMatcher
+
+def test_keyword_matcher_uses_table_priority_not_text_order():
+    matcher = KeywordMatcher(["research", "search", "con", "contact"])
+    assert matcher.best("Contact and research fintech CTOs") == "research"
+    assert matcher.best("contact fintech CTOs") == "con"
+    assert matcher.best("SEARCHING") == "search"
+    assert matcher.best("nothing here") is None
+
+def test_batch_planning_and_user_defined_patterns():
+    planner = GoalPlanner()
+    plans = planner.break_down_goals(["Contact and research VCs", "Say hi", "Contact VCs; find CTOs"])
+    assert [step["tool"] for step in plans[0]] == ["search", "summarize", "write_email"]
+    assert plans[0][0]["description"] == "Research and find relevant leads for: Contact and research VCs"
+    assert [step["description"] for step in plans[1]][0] == "Research and find relevant leads"
+    assert [step["segment"] for step in plans[2]] == [0, 0, 0, 1, 1, 1]
+    assert plans[2][3]["depends_on"] == []
+
+    # Plans are memoized, but callers get fresh step dicts every time
+    plans[0][0]["status"] = "completed"
+    assert planner.break_down_goal("Contact and research VCs")[0]["status"] == "pending"
+
+    planner.add_pattern("Nurture", ["search", "summarize"], first=True)
+    assert [step["tool"] for step in planner.break_down_goal("Find and nurture VCs")] == ["search", "summarize"]
+
+def test_pattern_keywords_are_case_insensitive_and_scale():
+    planner = GoalPlanner({"Find": ["search", "write_email"]})
+    assert [step["tool"] for step in planner.break_down_goal("find people")] == ["search", "write_email"]
+
+    keywords = [f"kw{i:05d}x" for i in range(4000)]
+    matcher = KeywordMatcher(keywords + ["kw0"])
+    assert matcher.best("about KW01234X and kw00007x") == "kw00007x"
+    assert matcher.best("kw0") == "kw0"
+    for keyword in keywords:
+        planner.add_pattern(keyword, ["search"])
+    assert [step["tool"] for step in planner.break_down_goal("Reach KW03999X")] == ["search"]
@@ -0,0 +1,27 @@
+import json
+import os
+from agent import AgentSender
+from memory.storage import MemoryStorage
+from profiling import StepProfiler, diff_profiles
+
+def _profiled_run(tmp_path, name):
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path / name)), dedup=False,
+                        profiler=StepProfiler(str(tmp_path / "profiles")))
+    agent.set_goal("Find AI founders")
+    agent.run(max_workers=4)
+    return os.path.join(str(tmp_path / "profiles"), agent.run_id)
+
+def test_profiled_run_writes_per_step_reports_and_diffs(tmp_path):
+    first = _profiled_run(tmp_path, "a")
+    second = _profiled_run(tmp_path, "b")
+
+    with open(os.path.join(first, "summary.json")) as f:
+        steps = json.load(f)["steps"]
+    assert [step["tool"] for step in steps] == ["search", "write_email", "send_email"]
+    assert all(step["top_functions"] and step["peak_bytes"] > 0 for step in steps)
+    assert os.path.exists(os.path.join(first, "step_002_write_email.prof"))
+    with open(os.path.join(first, "step_001_search.txt")) as f:
+        assert "Top functions by cumulative time" in f.read()
+
+    report = diff_profiles(first, second)
+    assert report.count("Step ") == 3 and "(write_email)" in report
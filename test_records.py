@@ -0,0 +1,25 @@
+from benchmarks.synthetic import iter_leads
+from memory.outbox import Outbox
+from memory.storage import MemoryStorage
+from records import email_domain, email_to_record
+from tools.write_email import EmailWriter
+
+def test_email_record_references_its_lead():
+    email = EmailWriter().write_emails([{"name": "Sarah Chen", "company": "HealthAI", "email": "sarah@healthai.com"}])[0]
+    record = email_to_record(email)
+    assert "lead" not in record and record["lead_email"] == "sarah@healthai.com"
+    assert record["subject"] == email["subject"] and "lead" in email
+    assert email_to_record(record) is record
+    assert email_domain("Sarah@HealthAI.com") == "healthai.com" and email_domain(None) == ""
+
+def test_emails_are_stored_and_queued_without_their_lead(tmp_path):
+    leads = list(iter_leads(2))
+    memory = MemoryStorage(str(tmp_path))
+    memory.save_leads(leads, run_id="r1")
+    memory.save_emails(EmailWriter().write_emails(leads), run_id="r1")
+    stored = memory.get_emails_for_run("r1")
+    assert "lead" not in stored[0] and stored[0]["lead_email"] == leads[0]["email"]
+
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    outbox.enqueue(EmailWriter().write_emails(leads))
+    assert "lead" not in outbox.claim()[0].email
@@ -0,0 +1,85 @@
+from agent import AgentSender
+from memory.runs import RunStore
+from memory.storage import MemoryStorage
+from tools.send_email import EmailSender
+
+class _Broken:
+    """Stands in for a tool that must (or must no longer) be used."""
+
+    def __getattr__(self, name):
+        raise RuntimeError("worker crashed")
+
+class _Unreachable:
+    """A sender whose server is down: mail is queued, then sending fails."""
+
+    dry_run = False
+
+    def deliver_outbox(self, outbox, **scope):
+        raise RuntimeError("SMTP server unreachable")
+
+def test_resume_skips_completed_steps_and_uses_only_this_runs_records(tmp_path, monkeypatch, smtp_sink):
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    memory = MemoryStorage(str(tmp_path))
+    # An earlier, unrelated run leaves its own leads and emails behind, in
+    # another tone so its messages (and idempotency keys) differ from this run's
+    earlier = AgentSender(tone="friendly", memory=memory, dedup=False, sender=_Unreachable())
+    earlier.set_goal("Find robotics CEOs")
+    earlier.run()
+
+    agent = AgentSender(memory=memory, dedup=False, sender=_Unreachable())
+    agent.set_goal("Find AI founders")
+    agent.run()
+    run_id = agent.run_id
+    state = RunStore(str(tmp_path / "runs")).load(run_id)
+    assert state["status"] == "failed"
+    assert [step["status"] for step in state["steps"]] == ["completed", "completed", "failed"]
+    assert agent.outbox.counts(earlier.run_id) == {"queued": 3}
+    assert agent.outbox.counts(run_id) == {"queued": 3}
+    sender = EmailSender(smtp_server="127.0.0.1", smtp_port=smtp_sink.port, use_tls=False, dry_run=False)
+    resumed = AgentSender(memory=memory, dedup=False, sender=sender)
+    resumed.searcher = _Broken()
+    resumed.writer = _Broken()
+    results = resumed.resume(run_id)
+    sent_by_resume = len(smtp_sink.handler.messages)
+
+    assert resumed.current_goal == "Find AI founders"
+    assert len(resumed.leads) == 3 and len(resumed.emails) == 3
+    assert [res["status"] for res in results[0]] == ["sent"] * 3
+    # Only this run's three emails were sent; the earlier run's stay queued
+    assert sent_by_resume == 3
+    assert resumed.outbox.counts(run_id) == {"sent": 3}
+    assert resumed.outbox.counts(earlier.run_id) == {"queued": 3}
+    assert len(memory.get_send_results(run_id=run_id)) == 3
+    assert memory.get_send_results(run_id=earlier.run_id) == []
+    assert resumed.runs.load(run_id)["status"] == "completed"
+    assert [run["status"] for run in resumed.runs.list_runs()] == ["completed", "failed"]
+
+    # Flushing the outbox is what sends the earlier run's mail, under that run
+    flushed = resumed.flush_outbox()
+    memory.flush()
+    assert [res["status"] for res in flushed] == ["sent"] * 3
+    assert len(smtp_sink.handler.messages) == 6
+    assert resumed.outbox.counts(earlier.run_id) == {"sent": 3}
+    assert len(memory.get_send_results(run_id=earlier.run_id)) == 3
+    assert len(memory.get_send_results(run_id=run_id)) == 3
+
+def test_streaming_resume_passes_on_leads_saved_before_the_failure(tmp_path, monkeypatch):
+    memory = MemoryStorage(str(tmp_path))
+    agent = AgentSender(memory=memory, dedup=False, sender=_Broken())
+    agent.writer = _Broken()
+    agent.set_goal("Find AI founders")
+    agent.run(streaming=True)
+    assert agent.runs.load(agent.run_id)["status"] == "failed"
+
+    resumed = AgentSender(memory=memory, dedup=False, sender=_Broken())
+    resumed.load_run(agent.run_id)
+    assert [step["status"] for step in resumed.current_steps] == ["pending"] * 3
+    results = resumed.run(streaming=True)
+
+    # Leads saved before the failure are passed on once, not found twice
+    assert results[0] == {"tool": "search", "processed": 3}
+    assert results[1] == {"tool": "write_email", "processed": 3}
+    assert len(memory.get_leads_for_run(agent.run_id)) == 3
+    assert len(memory.get_emails_for_run(agent.run_id)) == 3
+    assert [step["status"] for step in resumed.runs.load(agent.run_id)["steps"]] == \
+        ["completed", "completed", "failed"]
@@ -0,0 +1,57 @@
+import threading
+import time
+from agent import AgentSender
+from memory.storage import MemoryStorage
+from planner import GoalPlanner
+from scheduler import StepScheduler
+
+def _execute(delay, failing=()):
+    ran = []
+    lock = threading.Lock()
+
+    def execute(step):
+        time.sleep(delay)
+        with lock:
+            ran.append(step["step_id"])
+        step["status"] = "failed" if step["step_id"] in failing else "completed"
+        return step["step_id"]
+
+    return execute, ran
+
+def _fail(step, error):
+    step["status"] = "failed"
+    step["error"] = error
+
+def test_independent_segments_run_side_by_side():
+    steps = GoalPlanner().break_down_goal("Find AI founders; research fintech CTOs; contact VCs")
+    execute, ran = _execute(0.1)
+    start = time.time()
+    results = StepScheduler(steps, execute, _fail, max_workers=3).run()
+    elapsed = time.time() - start
+
+    assert sorted(results) == [step["step_id"] for step in steps]
+    # Three chains of three steps: the critical path is three steps long, not nine
+    assert elapsed < 0.6
+    for step in steps:
+        for dep in step["depends_on"]:
+            assert ran.index(dep) < ran.index(step["step_id"])
+
+def test_failed_step_fails_its_dependents_without_running_them():
+    steps = GoalPlanner().break_down_goal("Find AI founders; contact VCs")
+    execute, ran = _execute(0, failing={1})
+    results = StepScheduler(steps, execute, _fail).run()
+
+    assert sorted(ran) == [1, 4, 5, 6]
+    assert [steps[i]["status"] for i in range(3)] == ["failed"] * 3
+    assert results[3] == {"error": "Dependency step 2 failed"}
+    assert all(step["status"] == "completed" for step in steps[3:])
+
+def test_agent_runs_multi_segment_goal(tmp_path, monkeypatch):
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path)))
+    agent.set_goal("Find AI founders; research robotics CEOs")
+    results = agent.run()
+
+    assert len(results) == 6
+    assert agent.get_progress()["completed_steps"] == 6
+    assert set(agent.segment_emails) == {0, 1}
+    assert len(agent.emails) == 6
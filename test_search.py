@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.lead_sources import LeadSourceError, WebLeadSource
+from tools.search import LeadSearcher
+from tools.search_cache import SearchCache
+
+def test_search_cache_hits_expires_and_evicts(tmp_path):
+    now = [0.0]
+    cache = SearchCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    calls = []
+
+    def search():
+        calls.append(1)
+        return [{"email": "a@example.com"}]
+
+    first = cache.get_or_search("AI  Startups", 1, search)
+    first[0]["status"] = "changed"
+    assert cache.get_or_search("ai startups", 1, search) == [{"email": "a@example.com"}]
+    assert len(calls) == 1
+
+    cache.get_or_search("b", 1, search)
+    cache.get_or_search("c", 1, search)
+    assert cache.stats()["evictions"] == 1
+
+    now[0] = 11
+    cache.get_or_search("c", 1, search)
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 4
+
+def test_search_cache_disk_tier_and_single_flight(tmp_path):
+    path = str(tmp_path / "search.db")
+    release = threading.Event()
+    calls = []
+
+    def slow_search():
+        calls.append(1)
+        release.wait(5)
+        return [{"email": "a@example.com"}]
+
+    cache = SearchCache(disk_path=path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_search("q", 1, slow_search)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and len(results) == 4
+    assert cache.stats()["coalesced"] == 3
+
+    restarted = SearchCache(disk_path=path)
+    assert restarted.get_or_search("q", 1, slow_search) == [{"email": "a@example.com"}]
+    assert restarted.stats()["disk_hits"] == 1 and len(calls) == 1
+
+def test_searcher_does_not_modify_mock_leads():
+    searcher = LeadSearcher(cache=SearchCache())
+    leads = searcher.search_leads("startups", 2)
+    assert leads[0]["source"] == "mock_data"
+    assert "found_at" not in searcher.mock_leads[0]
+
+def _serve_fixtures(pages):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            time.sleep(0.05)
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _lead_card(i):
+    return (f'<div class="lead"><span class="name">Lead {i}</span>'
+            f'<span class="company">Company {i}</span><span class="role">CTO</span>'
+            f'<a href="mailto:lead{i}@example.com">Email</a>'
+            f'<p class="company_description">Builds thing {i}</p></div>')
+
+def test_web_lead_source_streams_leads_from_fixture_pages():
+    pages = {f"/page{n}": "".join(_lead_card(n * 10 + i) for i in range(3)) for n in range(4)}
+    pages["/search?q=ai+founders"] = _lead_card(99) + _lead_card(0)
+    server = _serve_fixtures(pages)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        urls = [f"{base}/page{n}" for n in range(4)] + [f"{base}/search?q={{query}}", f"{base}/missing"]
+        source = WebLeadSource(urls, fetch_workers=4, per_host=2)
+        leads = list(source.search("ai founders", 100))
+        emails = {lead["email"] for lead in leads}
+        assert len(leads) == 13 and "lead99@example.com" in emails
+        assert leads[0]["source"] == "web" and leads[0]["source_url"].startswith(base)
+        assert leads[0]["company_description"].startswith("Builds thing")
+        assert [url for url, _ in source.errors] == [f"{base}/missing"]
+        assert source.stats() == {"pages_loaded": 5, "pages_failed": 1}
+
+        searcher = LeadSearcher(source=WebLeadSource(urls), cache=SearchCache())
+        assert len(list(searcher.stream_leads("ai founders", 5))) == 5
+        assert len(searcher.search_leads("ai founders", 5)) == 5
+        assert searcher.cache.stats()["hits"] == 1
+    finally:
+        server.shutdown()
+
+def test_failed_web_search_is_not_cached(tmp_path):
+    pages = {}
+    server = _serve_fixtures(pages)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        urls = [f"{base}/page0", f"{base}/page1"]
+        cache = SearchCache(disk_path=str(tmp_path / "search.db"))
+        source = WebLeadSource(urls, max_errors=3)
+        searcher = LeadSearcher(source=source, cache=cache)
+        with pytest.raises(LeadSourceError):
+            searcher.search_leads("ai founders", 5)
+        with pytest.raises(LeadSourceError):
+            list(searcher.stream_leads("ai founders", 5))
+        assert cache.get("ai founders", 5) is None
+        assert cache.stats()["entries"] == 0
+        # Four failed fetches, but only the latest three are kept
+        assert len(source.errors) == 3 and source.stats()["pages_failed"] == 4
+
+        # Once the pages load again the search goes back to the source
+        pages["/page0"] = _lead_card(1)
+        assert [lead["email"] for lead in searcher.search_leads("ai founders", 5)] == ["lead1@example.com"]
+    finally:
+        server.shutdown()
@@ -0,0 +1,251 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from tools.send_email import EmailSender
+from tools.rate_limiter import SendScheduler, TokenBucket
+from memory.outbox import Outbox
+
+def _emails(n):
+    return [{"to": f"lead{i}@example{i % 3}.com", "subject": f"Hi {i}", "body": "Hello"} for i in range(n)]
+
+def test_send_emails_over_connection_pool(monkeypatch, smtp_sink):
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("EMAIL_RATE_PER_SEC", "0")
+    sender = EmailSender(smtp_server="127.0.0.1", smtp_port=smtp_sink.port,
+                         max_connections=4, use_tls=False, dry_run=False)
+    results = sender.send_emails(_emails(40))
+    assert [res["to"] for res in results] == [email["to"] for email in _emails(40)]
+    assert all(res["status"] == "sent" for res in results)
+    assert len(smtp_sink.handler.messages) == 40
+
+    # Kill every pooled connection; the next batch must reconnect transparently
+    for server in list(sender._pool._idle.queue):
+        server.sock.close()
+    results = sender.send_emails(_emails(10))
+    assert all(res["status"] == "sent" for res in results)
+    assert len(smtp_sink.handler.messages) == 50
+    sender.close()
+
+def test_send_emails_unreachable_server_fails_batch(free_port):
+    sender = EmailSender(smtp_server="127.0.0.1", smtp_port=free_port, use_tls=False, dry_run=False)
+    results = sender.send_emails(_emails(3))
+    assert [res["status"] for res in results] == ["failed"] * 3
+
+def test_token_bucket_refills_at_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == 0.5
+    now[0] = 0.5
+    assert bucket.try_acquire()
+
+def test_zero_domain_rate_means_unlimited(monkeypatch):
+    from tools.send_email import scheduler_from_env
+    monkeypatch.setenv("EMAIL_RATE_PER_SEC", "1000")
+    monkeypatch.setenv("EMAIL_DOMAIN_RATE_PER_SEC", "0")
+    scheduler = scheduler_from_env()
+    emails = [{"to": f"a{i}@big.com"} for i in range(20)]
+    assert [i for i, _ in scheduler.schedule(emails)] == list(range(20))
+    assert TokenBucket(rate=0, capacity=1).wait_time(5) == 0
+
+def test_fractional_rate_still_releases_every_send(monkeypatch):
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr("tools.rate_limiter.time.sleep", sleep)
+    scheduler = SendScheduler(rate=0.5, burst=0.5, domain_rate=0.25, domain_burst=0.5,
+                              clock=lambda: now[0])
+    emails = [{"to": "a@big.com"}, {"to": "b@big.com"}, {"to": "c@small.com"}]
+    assert [i for i, _ in scheduler.schedule(emails)] == [0, 2, 1]
+    # One send every 2s globally, and every 4s to big.com
+    assert now[0] == 4.0
+
+def test_scheduler_interleaves_domains_and_respects_domain_burst():
+    scheduler = SendScheduler(rate=1000, burst=1000, domain_rate=50, domain_burst=2)
+    emails = [{"to": f"a{i}@big.com"} for i in range(6)] + [{"to": "b@small.com"}, {"to": "c@other.com"}]
+    released = []
+    for i, email in scheduler.schedule(emails):
+        if not released:
+            assert scheduler.stats()["queue_depth"] == len(emails) - 1
+        released.append(email["to"].split("@")[1])
+
+    assert sorted(released) == sorted(email["to"].split("@")[1] for email in emails)
+    # The small domains are not starved behind the big one
+    assert released.index("small.com") < 3 and released.index("other.com") < 3
+    stats = scheduler.stats()
+    assert stats["queue_depth"] == 0 and stats["dispatched"] == len(emails)
+
+def test_outbox_delivery_is_idempotent_and_resumable(tmp_path, monkeypatch, smtp_sink):
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("EMAIL_RATE_PER_SEC", "0")
+    db_path = str(tmp_path / "outbox.db")
+    outbox = Outbox(db_path)
+    outbox.enqueue(_emails(5) + _emails(2), run_id="r1")
+    assert outbox.counts() == {"queued": 5}
+
+    # Simulate a crash after two messages were claimed but never recorded;
+    # they are only taken back once their lease runs out
+    outbox.claim(limit=2)
+    outbox = Outbox(db_path, lease_timeout=0.05)
+    assert outbox.counts() == {"queued": 3, "in_flight": 2}
+    time.sleep(0.1)
+
+    sender = EmailSender(smtp_server="127.0.0.1", smtp_port=smtp_sink.port,
+                         use_tls=False, dry_run=False)
+    delivered = sender.deliver_outbox(outbox)
+    assert [res["status"] for _, res in delivered] == ["sent"] * 5
+    outbox.enqueue(_emails(5), run_id="r2")
+    assert sender.deliver_outbox(outbox) == []
+    assert len(smtp_sink.handler.messages) == 5
+
+def test_live_claims_survive_another_process_opening_the_outbox(tmp_path):
+    db_path = str(tmp_path / "outbox.db")
+    outbox = Outbox(db_path)
+    outbox.enqueue(_emails(5))
+    claimed = outbox.claim(limit=2)
+    script = ("import json, sys; from memory.outbox import Outbox; "
+              "outbox = Outbox(sys.argv[1], lease_timeout=float(sys.argv[2])); "
+              "print(json.dumps([item.key for item in outbox.claim()]))")
+
+    def claim_elsewhere(lease_timeout):
+        done = subprocess.run([sys.executable, "-c", script, db_path, str(lease_timeout)],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        return json.loads(done.stdout)
+
+    # The other process takes only what is still queued, then dies mid-send
+    others = claim_elsewhere(3600)
+    assert len(others) == 3 and not set(others) & {item.key for item in claimed}
+    for item in claimed:
+        outbox.record(item, {"to": item.email["to"], "status": "sent"})
+    outbox.commit()
+    assert outbox.counts() == {"sent": 2, "in_flight": 3}
+    # Once their lease has run out, the dead process's claims are taken over
+    time.sleep(0.1)
+    assert sorted(claim_elsewhere(0.05)) == sorted(others)
+
+def test_outbox_claims_only_the_requested_run_and_segment(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    emails = _emails(6)
+    outbox.enqueue(emails[:2], run_id="old")
+    outbox.enqueue(emails[2:4], run_id="new", segment=0)
+    outbox.enqueue(emails[4:], run_id="new", segment=1)
+
+    assert [item.email["to"] for item in outbox.claim(run_id="new", segment=0)] == \
+        [email["to"] for email in emails[2:4]]
+    assert [item.email["to"] for item in outbox.claim(run_id="new")] == [email["to"] for email in emails[4:]]
+    assert outbox.next_due_at("new") is None
+    # The same message queued again by a later run is handed over to it
+    outbox.enqueue(emails[:1], run_id="newer")
+    assert [item.run_id for item in outbox.claim(run_id="newer")] == ["newer"]
+    assert [(item.run_id, item.email["to"]) for item in outbox.claim()] == [("old", emails[1]["to"])]
+
+def test_dry_run_leaves_no_sent_state_behind(tmp_path, monkeypatch, smtp_sink):
+    from agent import AgentSender
+    from memory.storage import MemoryStorage
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("EMAIL_RATE_PER_SEC", "0")
+    def sender(dry_run):
+        return EmailSender(smtp_server="127.0.0.1", smtp_port=smtp_sink.port, use_tls=False, dry_run=dry_run)
+
+    rehearsal = AgentSender(memory=MemoryStorage(str(tmp_path)), sender=sender(True))
+    rehearsal.set_goal("Find AI founders")
+    results = rehearsal.run()
+    assert [res["status"] for res in results[2]] == ["dry_run"] * 3
+    assert smtp_sink.handler.messages == [] and rehearsal.outbox.counts() == {}
+
+    # Switching to real sending still reaches every lead of the dry run
+    real = AgentSender(memory=MemoryStorage(str(tmp_path)), sender=sender(False))
+    real.set_goal("Find AI founders")
+    results = real.run()
+    assert [res["status"] for res in results[2]] == ["sent"] * 3
+    assert len(smtp_sink.handler.messages) == 3
+    assert real.outbox.counts() == {"sent": 3}
+
+def test_dry_run_is_not_paced(monkeypatch, smtp_sink):
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    # Default pacing would hold one domain to 1 send/s after a burst of 5
+    sender = EmailSender(smtp_server="127.0.0.1", smtp_port=smtp_sink.port, use_tls=False, dry_run=True)
+    assert sender.scheduler is None
+    shared = SendScheduler(rate=1, burst=1, domain_rate=1, domain_burst=1)
+    paced = EmailSender(smtp_server="127.0.0.1", smtp_port=smtp_sink.port, use_tls=False,
+                        dry_run=True, scheduler=shared)
+    emails = [{"to": f"a{i}@big.com", "subject": "Hi", "body": "Hello"} for i in range(20)]
+    start = time.time()
+    assert [res["status"] for res in sender.send_emails(emails)] == ["dry_run"] * 20
+    assert [res["status"] for res in paced.send_emails(emails)] == ["dry_run"] * 20
+    assert time.time() - start < 1
+    assert shared.stats()["dispatched"] == 0
+
+def test_outbox_retries_with_backoff_then_dead_letters(tmp_path, free_port):
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, base_delay=0.01)
+    outbox.enqueue(_emails(2))
+    sender = EmailSender(smtp_server="127.0.0.1", smtp_port=free_port, use_tls=False, dry_run=False)
+
+    first = sender.deliver_outbox(outbox)
+    assert [item.attempts for item, _ in first] == [0, 0]
+    assert outbox.counts() == {"queued": 2} and outbox.next_due_at() is not None
+
+    sender.deliver_outbox(outbox, wait=True)
+    assert outbox.counts() == {"dead": 2}
+    assert all(letter["attempts"] == 3 for letter in outbox.dead_letters())
+    assert outbox.requeue_dead() == 2
+
+def test_message_builder_matches_mime_structure():
+    from email import message_from_bytes
+    from tools.mime_fast import MessageBuilder
+    builder = MessageBuilder("me@example.com")
+    emails = [
+        {"to": "a@example.com", "subject": "Hi", "body": "Hello\n.\nBye"},
+        {"to": "b@example.com", "subject": "Grüße an HealthAI " * 6, "body": "Héllo\nthere"},
+        {"to": "c@example.com", "subject": "Bcc: x\r\nInjected", "body": "x" * 2000}
+    ]
+    for email in emails:
+        raw = builder.build(email)
+        assert b"\n" not in raw.replace(b"\r\n", b"")
+        msg = message_from_bytes(raw)
+        assert msg["From"] == "me@example.com" and msg["To"] == email["to"]
+        assert msg.get_content_type() == "multipart/mixed"
+        (part,) = msg.get_payload()
+        text = part.get_payload(decode=True).decode(part.get_content_charset())
+        assert text.replace("\r\n", "\n") == email["body"]
+    assert "Bcc" not in message_from_bytes(builder.build(emails[2])).keys()
+
+def test_pipelined_submission_reports_rejections_per_message(monkeypatch):
+    from benchmarks.bench_mime import PipeliningSink
+    monkeypatch.setenv("EMAIL_ADDRESS", "me@example.com")
+    monkeypatch.setenv("EMAIL_RATE_PER_SEC", "0")
+    sink = PipeliningSink(pipelining=True)
+    received = []
+
+    async def handle_RCPT(server, session, envelope, address, rcpt_options):
+        if address.startswith("bad"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(server, session, envelope):
+        received.append(envelope.content)
+        return "250 Message accepted for delivery"
+
+    sink.controller.handler.handle_RCPT = handle_RCPT
+    sink.controller.handler.handle_DATA = handle_DATA
+    try:
+        emails = _emails(12)
+        emails[4]["to"] = "bad@example.com"
+        emails[7]["body"] = "line\n.\n..dots"
+        sender = EmailSender(smtp_server="127.0.0.1", smtp_port=sink.port, max_connections=2,
+                             use_tls=False, dry_run=False, pipeline_batch=5)
+        results = sender.send_emails(emails)
+        assert [res["status"] for res in results] == ["sent"] * 4 + ["failed"] + ["sent"] * 7
+        assert "550" in results[4]["error"]
+        assert len(received) == 11
+        assert any(b"line\r\n.\r\n..dots" in content for content in received)
+        sender.close()
+    finally:
+        sink.stop()
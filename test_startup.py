@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Startup budget for our own imports (interpreter and site setup excluded)
+IMPORT_BUDGET_SECONDS = 0.3
+HEAVY_MODULES = ("pandas", "numpy", "requests", "bs4", "openai", "langchain")
+
+def _importtime(*args):
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = (int(cumulative), not name[1:].startswith(" "))
+    return result, modules
+
+def _top_level_seconds(modules):
+    return sum(us for name, (us, top_level) in modules.items() if top_level and name != "site") / 1e6
+
+def test_help_is_fast_and_skips_heavy_imports():
+    result, modules = _importtime("main.py", "--help")
+    assert result.returncode == 0 and "--goals-file" in result.stdout
+    assert not [name for name in HEAVY_MODULES if name in modules]
+    assert "agent" not in modules
+    assert _top_level_seconds(modules) < IMPORT_BUDGET_SECONDS
+
+def test_agent_import_defers_tools_and_pandas():
+    _, modules = _importtime("-c", "import agent")
+    assert not [name for name in HEAVY_MODULES + ("smtplib", "dotenv", "tools.send_email") if name in modules]
+    assert _top_level_seconds(modules) < IMPORT_BUDGET_SECONDS
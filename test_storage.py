@@ -0,0 +1,120 @@
+import os
+from memory.segment_log import SegmentedLog
+from memory.storage import MemoryStorage
+from memory.sqlite_storage import SQLiteMemoryStorage
+from memory.dedup import LeadDedupIndex
+
+def test_segmented_log_rollover_and_resume(tmp_path):
+    log = SegmentedLog(str(tmp_path), max_segment_bytes=2000, batch_size=7, index_interval=10)
+    for i in range(500):
+        log.append({"i": i, "pad": "x" * 20})
+    log.flush()
+
+    segments = [f for f in os.listdir(tmp_path) if f.endswith(".jsonl")]
+    assert len(segments) > 1
+    assert [record["i"] for record in log] == list(range(500))
+    assert [record["i"] for _, record in log.read(337)] == list(range(337, 500))
+
+    # A torn trailing record is dropped when the log is reopened
+    with open(os.path.join(tmp_path, sorted(segments)[-1]), 'ab') as f:
+        f.write(b'{"i": 5')
+    reopened = SegmentedLog(str(tmp_path), max_segment_bytes=2000)
+    assert reopened.next_seq == 500
+    reopened.append({"i": 500})
+    assert [record["i"] for _, record in reopened.read(498)] == [498, 499, 500]
+
+def test_memory_storage_keeps_records_written_in_same_second(tmp_path):
+    memory = MemoryStorage(str(tmp_path))
+    for i in range(20):
+        memory.save_email({"to": f"lead{i}@example.com"})
+        memory.save_step({"type": "test", "n": i})
+    memory.save_leads([{"email": "a@example.com"}, {"email": "b@example.com"}])
+
+    assert len(memory.get_all_emails()) == 20
+    assert [step["n"] for step in memory.get_all_steps()] == list(range(20))
+    assert [lead["email"] for lead in memory.get_all_leads()] == ["a@example.com", "b@example.com"]
+
+def test_sqlite_storage_run_and_status_queries(tmp_path):
+    memory = SQLiteMemoryStorage(str(tmp_path))
+    memory.save_leads([{"email": "A@x.com", "company": "X"}, {"email": "b@y.com", "company": "Y"}], run_id="r1")
+    memory.save_leads([{"email": "c@x.com", "company": "X"}], run_id="r2")
+    memory.save_emails([{"to": "A@x.com"}, {"to": "b@y.com"}], run_id="r1")
+    memory.save_send_result({"to": "A@x.com", "status": "sent"}, run_id="r1")
+    memory.save_send_result({"to": "b@y.com", "status": "failed", "error": "boom"}, run_id="r1")
+
+    assert [lead["email"] for lead in memory.get_leads_for_run("r1")] == ["A@x.com", "b@y.com"]
+    assert len(memory.get_leads_by_company("X")) == 2
+    assert memory.get_leads_by_email("a@x.com")[0]["run_id"] == "r1"
+    assert [email["to"] for email in memory.get_unsent_emails("r1")] == ["b@y.com"]
+    assert [res["to"] for res in memory.get_send_results("failed")] == ["b@y.com"]
+
+    reopened = SQLiteMemoryStorage(str(tmp_path))
+    assert len(reopened.get_all_leads()) == 3
+    assert len(reopened.get_all_steps()) == 2
+
+def test_iterators_resume_and_chunked_export(tmp_path):
+    import pandas as pd
+    for memory in (MemoryStorage(str(tmp_path / "jsonl")), SQLiteMemoryStorage(str(tmp_path / "sqlite"))):
+        for i in range(25):
+            memory.save_step({"type": "test", "n": i, "result": {"ok": i % 2 == 0}}, run_id=f"r{i % 2}")
+
+        first = list(memory.iter_steps({"run_id": "r0"}, with_cursor=True))
+        cursor = first[4][0]
+        resumed = [step["n"] for step in memory.iter_steps({"run_id": "r0"}, cursor=cursor)]
+        assert resumed == [n for n in range(10, 25, 2)]
+
+        filename = memory.export_to_csv("steps", chunk_size=7)
+        exported = pd.read_csv(filename)
+        assert list(exported["n"]) == list(range(25))
+        assert set(exported.columns) >= {"timestamp", "type", "n", "result", "run_id"}
+
+        parquet = memory.export_to_csv("steps", chunk_size=7, file_format="parquet")
+        assert len(pd.read_parquet(parquet)) == 25
+
+def test_dedup_index_matches_email_and_fuzzy_name_company(tmp_path):
+    for bloom_capacity in (None, 1000):
+        directory = str(tmp_path / f"dedup-{bloom_capacity}")
+        index = LeadDedupIndex(directory, bloom_capacity=bloom_capacity)
+        leads = [
+            {"name": "Sarah Chen", "company": "AI Vision Labs, Inc.", "email": "Sarah@AIVisionLabs.com"},
+            {"name": "Chen Sarah", "company": "ai vision labs", "email": "s.chen@gmail.com"},
+            {"name": "Someone Else", "company": "Other", "email": "sarah+news@aivisionlabs.com"},
+            {"name": "José Núñez", "company": "Robo LLC", "email": "jose@robo.ai"},
+        ]
+        assert [lead["email"] for lead in index.filter_new(leads)] == ["Sarah@AIVisionLabs.com", "jose@robo.ai"]
+
+        reopened = LeadDedupIndex(directory, bloom_capacity=bloom_capacity)
+        assert reopened.seen({"name": "Jose Nunez", "company": "Robo", "email": "new@robo.ai"})
+        assert not reopened.seen({"name": "New Person", "company": "Robo", "email": "new@robo.ai"})
+
+class _Delivered:
+    """Sender that reports every message of the requested run as sent."""
+
+    dry_run = False
+
+    def deliver_outbox(self, outbox, run_id=None, segment=None):
+        return [(item, {"to": item.email["to"], "status": "sent"})
+                for item in outbox.claim(run_id=run_id, segment=segment)]
+
+class _Failing:
+    def __getattr__(self, name):
+        raise RuntimeError("writer crashed")
+
+def test_agent_skips_leads_emailed_by_earlier_runs(tmp_path, monkeypatch):
+    from agent import AgentSender
+    # A run that fails before sending leaves its leads for the next run
+    failed = AgentSender(memory=MemoryStorage(str(tmp_path)), sender=_Delivered())
+    failed.writer = _Failing()
+    failed.set_goal("Find AI founders")
+    failed.run()
+    assert len(failed.leads) == 3 and failed.emails == []
+
+    first = AgentSender(memory=MemoryStorage(str(tmp_path)), sender=_Delivered())
+    first.set_goal("Find AI founders")
+    first.run()
+    assert len(first.leads) == 3 and len(first.emails) == 3
+
+    second = AgentSender(memory=MemoryStorage(str(tmp_path)), sender=_Delivered())
+    second.set_goal("Find AI founders")
+    second.run()
+    assert second.leads == [] and second.emails == []
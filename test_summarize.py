@@ -0,0 +1,57 @@
+from agent import AgentSender
+from memory.storage import MemoryStorage
+from tools.llm_writer import ChatCompletionsClient
+from tools.summarize import CompanySummarizer, company_key
+
+def _summaries(request):
+    return {"summaries": [{"id": company["id"], "summary": f"{company['company']} ({company['contacts']} contacts)"}
+                          for company in request["companies"]]}
+
+def _team_leads():
+    companies = ["HealthAI", "healthai ", "DataFlow", "Robotix", "Quantum Labs"]
+    return [{"name": f"Person {i}", "company": companies[i % 5], "role": "CTO" if i % 2 else "CEO",
+             "email": f"p{i}@example.com", "company_description": "builds things"} for i in range(30)]
+
+def test_summarizer_summarizes_each_company_once_and_caches_with_ttl(tmp_path, completions_stub):
+    stub = completions_stub(_summaries)
+    cache_path = str(tmp_path / "summaries.db")
+    now = [1000.0]
+    client = ChatCompletionsClient(api_key="test", base_url=stub["base_url"], backoff=0)
+    summarizer = CompanySummarizer(client, batch_size=2, workers=2, ttl=60,
+                                   cache_path=cache_path, clock=lambda: now[0])
+    leads = summarizer.summarize_leads(_team_leads())
+
+    # "HealthAI" and "healthai " are one company: 4 companies in 2 requests
+    assert len(stub["requests"]) == 2 and stub["max_in_flight"] <= 2
+    assert company_key(leads[1]) == company_key(leads[0]) == "healthai"
+    assert leads[0]["company_summary"] == "HealthAI (12 contacts)"
+    assert leads[1]["company_summary"] == leads[0]["company_summary"]
+    assert "company_summary" not in _team_leads()[0]
+    summarizer.close()
+
+    again = CompanySummarizer(client, batch_size=2, ttl=60, cache_path=cache_path, clock=lambda: now[0])
+    again.summarize(_team_leads())
+    assert len(stub["requests"]) == 2 and again.stats()["cache_hits"] == 4
+    now[0] += 61
+    again.summarize(_team_leads())
+    assert len(stub["requests"]) == 4
+    again.close()
+
+def test_agent_runs_summarize_step_in_batch_and_streaming_modes(tmp_path, monkeypatch):
+    no_send = type("NoSend", (), {"deliver_outbox": lambda self, outbox, **scope: []})()
+    agent = AgentSender(memory=MemoryStorage(str(tmp_path / "batch")), dedup=False, sender=no_send)
+    agent.set_goal("Research fintech CTOs")
+    results = agent.run()
+
+    assert [step["tool"] for step in agent.current_steps] == ["search", "summarize", "write_email"]
+    assert all(step["status"] == "completed" for step in agent.current_steps)
+    assert results[1]["companies"] == 3 and results[1]["leads"] == 3
+    # Without an LLM client the summary comes from the lead data
+    assert agent.leads[0]["company_summary"].startswith(agent.leads[0]["company"])
+    assert agent.emails[0]["lead"]["company_summary"] == agent.leads[0]["company_summary"]
+
+    streaming = AgentSender(memory=MemoryStorage(str(tmp_path / "stream")), dedup=False, sender=no_send)
+    streaming.set_goal("Research fintech CTOs")
+    results = streaming.run(streaming=True)
+    assert results[1] == {"tool": "summarize", "processed": 3}
+    assert results[2] == {"tool": "write_email", "processed": 3}
@@ -0,0 +1,49 @@
+import pickle
+import pytest
+from tools.templates import TemplateSyntaxError, compile_template
+from tools.write_email import EmailWriter
+
+def test_compiled_template_fields_defaults_and_sections():
+    template = compile_template(
+        "Subject: Hi {name}\n\nHello {name},{?title} fellow {title},{/title}{^title} friend,{/title}"
+        " about {topic|your work} {{literally}}"
+    )
+    subject, body = template.render({"name": "Ada", "title": "CTO"})
+    assert subject == "Hi Ada"
+    assert body == "\nHello Ada, fellow CTO, about your work {literally}"
+    assert template.render({"name": "Bo", "topic": "robots"})[1] == "\nHello Bo, friend, about robots {literally}"
+    assert template.fields == ["name", "title", "topic"]
+    with pytest.raises(KeyError):
+        template.render({})
+    assert pickle.loads(pickle.dumps(template)).render({"name": "Ada"}) == template.render({"name": "Ada"})
+
+def test_unbalanced_sections_are_rejected():
+    with pytest.raises(TemplateSyntaxError):
+        compile_template("Subject: x\n{?a}never closed")
+    with pytest.raises(TemplateSyntaxError):
+        compile_template("Subject: x\n{?a}{/b}")
+
+def test_user_templates_and_batch_rendering(tmp_path):
+    (tmp_path / "short.txt").write_text("Subject: Hey {name}\nSee you at {company}.")
+    writer = EmailWriter(template_dir=str(tmp_path))
+    columns = {"name": ["Ada", "Bo"], "company": ["X", "Y"], "email": ["a@x.com", "b@y.com"]}
+
+    emails = writer.write_batch(columns, tone="short")
+    assert [(e["to"], e["subject"], e["body"]) for e in emails] == [
+        ("a@x.com", "Hey Ada", "See you at X."),
+        ("b@y.com", "Hey Bo", "See you at Y."),
+    ]
+    # Built-in tones are still there, and unknown tones fall back to professional
+    assert writer.write_batch(columns, tone="nope") == writer.write_emails(
+        [{"name": "Ada", "company": "X", "email": "a@x.com"}, {"name": "Bo", "company": "Y", "email": "b@y.com"}]
+    )
+
+def test_sharded_generation_matches_serial_order():
+    writer = EmailWriter()
+    leads = [{"name": f"Lead {i}", "company": f"C{i}", "email": f"l{i}@c.com"} for i in range(257)]
+    chunks = []
+    written = writer.write_emails_sharded(leads, chunks.append, tone="friendly", chunk_size=20, workers=2)
+
+    assert written == 257
+    assert max(len(chunk) for chunk in chunks) == 20
+    assert [email for chunk in chunks for email in chunk] == writer.write_emails(leads, tone="friendly")
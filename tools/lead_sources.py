@@ -0,0 +1,203 @@
+import abc
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote_plus, urlsplit
+
+# requests and BeautifulSoup are imported when first needed, so the
+# default mock source doesn't pay for them at startup
+if TYPE_CHECKING:
+    import requests
+
+LEAD_FIELDS = ("name", "company", "role", "email", "company_description")
+
+class LeadSourceError(Exception):
+    """A search failed outright (e.g. every candidate page failed to load)."""
+
+class LeadSource(abc.ABC):
+    """Where LeadSearcher gets its leads from."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def search(self, query: str, num_leads: int) -> Iterator[Dict]:
+        """
+        Yield up to ``num_leads`` leads for a query as they are found.
+
+        Args:
+            query (str): Search query (e.g., "AI startup founders")
+            num_leads (int): Most leads to yield
+        """
+
+class MockLeadSource(LeadSource):
+    """Serves a fixed list of leads; used for testing and as the default."""
+
+    name = "mock_data"
+
+    def __init__(self, leads: List[Dict]):
+        self.leads = leads
+
+    def search(self, query: str, num_leads: int) -> Iterator[Dict]:
+        # Metadata goes on copies so the fixed leads are never modified
+        for lead in self.leads[:min(num_leads, len(self.leads))]:
+            yield {**lead, "found_at": datetime.now().isoformat(), "source": self.name}
+
+def _text(node) -> str:
+    return " ".join(node.get_text(" ").split()) if node is not None else ""
+
+def parse_lead_cards(html: str, url: str) -> List[Dict]:
+    """
+    Extract leads from a page.
+
+    Each lead is an element with class ``lead`` whose children carry the
+    lead fields as class names (``name``, ``company``, ``role``, ``email``,
+    ``company_description``). The email may also come from a ``mailto:``
+    link. Cards without an email are skipped.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    leads = []
+    for card in soup.select(".lead"):
+        lead = {field: _text(card.select_one("." + field)) for field in LEAD_FIELDS}
+        if not lead["email"]:
+            mailto = card.select_one("a[href^='mailto:']")
+            if mailto is not None:
+                lead["email"] = mailto["href"][len("mailto:"):].split("?", 1)[0]
+        if lead["email"]:
+            leads.append(lead)
+    return leads
+
+class WebLeadSource(LeadSource):
+    """
+    Scrapes leads from a list of candidate pages.
+
+    Pages are fetched concurrently through one pooled ``requests.Session``
+    with at most ``per_host`` requests in flight to any one host. Fetched
+    HTML is handed to a separate parse pool, so slow parsing never holds up
+    a fetch thread, and leads are yielded as soon as their page is parsed.
+    If every page fails, search() raises LeadSourceError rather than
+    finishing empty, so the failure is not cached as "no leads".
+    """
+
+    name = "web"
+
+    def __init__(self, urls: List[str], fetch_workers: int = 8, parse_workers: int = 2,
+                 per_host: int = 2, timeout: float = 10,
+                 parser: Callable[[str, str], List[Dict]] = parse_lead_cards,
+                 session: Optional["requests.Session"] = None, max_errors: int = 100):
+        """
+        Args:
+            urls (List[str]): Candidate page URLs; ``{query}`` is replaced
+                with the URL-encoded search query
+            fetch_workers (int): Pages fetched at the same time
+            parse_workers (int): Pages parsed at the same time
+            per_host (int): Most concurrent requests to a single host
+            timeout (float): Per-request timeout in seconds
+            parser (Callable): Turns ``(html, url)`` into a list of leads
+            session (requests.Session): Session to reuse; one is created
+                with a connection pool sized to ``fetch_workers`` if omitted
+            max_errors (int): Most recent (url, error) pairs kept in ``errors``
+        """
+        self.urls = urls
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.parser = parser
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=fetch_workers, pool_maxsize=fetch_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        # Only the latest failures are kept; stats() counts all of them
+        self.errors: Deque[Tuple[str, str]] = deque(maxlen=max_errors)
+        self._stats = {"pages_loaded": 0, "pages_failed": 0}
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Pages loaded and failed since the source was created."""
+        with self._lock:
+            return dict(self._stats)
+
+    def candidate_urls(self, query: str) -> List[str]:
+        return [url.replace("{query}", quote_plus(query)) for url in self.urls]
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def fetch(self, url: str) -> str:
+        with self._host_slot(url):
+            response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def search(self, query: str, num_leads: int) -> Iterator[Dict]:
+        urls = self.candidate_urls(query)
+        if not urls or num_leads <= 0:
+            return
+        # Every page ends in exactly one (url, leads, error) message
+        pages: "queue.Queue[Tuple[str, Optional[List[Dict]], Optional[str]]]" = queue.Queue()
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        parse_pool = ThreadPoolExecutor(max_workers=self.parse_workers)
+
+        def parse(url: str, html: str):
+            try:
+                pages.put((url, self.parser(html, url), None))
+            except Exception as e:
+                pages.put((url, None, f"parse failed: {e}"))
+
+        def fetch(url: str):
+            try:
+                html = self.fetch(url)
+            except Exception as e:
+                pages.put((url, None, str(e)))
+                return
+            try:
+                parse_pool.submit(parse, url, html)
+            except RuntimeError:
+                pass  # The consumer already stopped
+
+        try:
+            for url in urls:
+                fetch_pool.submit(fetch, url)
+            found = 0
+            loaded = 0
+            seen = set()
+            for _ in urls:
+                url, leads, error = pages.get()
+                self._count("pages_failed" if error is not None else "pages_loaded")
+                if error is not None:
+                    self.errors.append((url, error))
+                    continue
+                loaded += 1
+                for lead in leads:
+                    email = lead["email"].lower()
+                    if email in seen:
+                        continue
+                    seen.add(email)
+                    yield {**lead, "found_at": datetime.now().isoformat(),
+                           "source": self.name, "source_url": url}
+                    found += 1
+                    if found >= num_leads:
+                        return
+            if not loaded:
+                raise LeadSourceError(f"All {len(urls)} candidate pages failed; last error: {error}")
+        finally:
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,371 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+# requests is imported when the first client is built, so runs that never
+# personalize don't pay for it at startup
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+# HTTP statuses worth retrying: rate limits and transient server errors
+RETRY_STATUSES = frozenset((408, 409, 429, 500, 502, 503, 504))
+# Lead fields sent to the model, and so the fields a cached draft depends on
+PROMPT_FIELDS = ("name", "company", "role", "company_description", "company_summary")
+
+SYSTEM_PROMPT = (
+    "You write short, personal cold outreach emails. For every lead in the request, "
+    "write one email in the requested tone, using the reference email as a guide to "
+    "length, structure and sign-off, and mentioning something specific about the "
+    "lead's company. Reply with a JSON object: "
+    '{"emails": [{"id": "<lead id>", "subject": "...", "body": "..."}]}.'
+)
+
+class LLMError(Exception):
+    """A completions request failed for good (after any retries)."""
+
+class ChatCompletionsClient:
+    """
+    Minimal client for an OpenAI-compatible ``/chat/completions`` endpoint.
+
+    Requests share one pooled ``requests.Session``. Rate limits (429) and
+    transient server errors are retried with exponential backoff and
+    jitter, honouring ``Retry-After``; a timeout is not retried, so a slow
+    backend costs at most one ``timeout`` per request.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 model: Optional[str] = None, timeout: float = 30, max_retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 30,
+                 session: Optional["requests.Session"] = None):
+        """
+        Args:
+            api_key (str): API key; defaults to OPENAI_API_KEY
+            base_url (str): API root, e.g. http://localhost:8000/v1; defaults
+                to OPENAI_BASE_URL or the OpenAI API
+            model (str): Model name; defaults to LLM_MODEL
+            timeout (float): Per-request timeout in seconds
+            max_retries (int): Retries after the first attempt
+            backoff (float): First retry delay in seconds, doubled per retry
+            max_backoff (float): Longest delay between attempts
+            session (requests.Session): Session to reuse
+        """
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.model = model or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def complete_json(self, messages: List[Dict]) -> Dict:
+        """
+        Send a chat completion that must answer with a JSON object, and
+        return the parsed object.
+
+        Raises:
+            LLMError: The request timed out, kept failing, or the reply
+                was not a JSON object
+        """
+        import requests
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "response_format": {"type": "json_object"},
+            "temperature": 0.7
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        url = self.base_url + "/chat/completions"
+        for attempt in range(self.max_retries + 1):
+            self._count("requests")
+            retry_after = None
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+            except requests.Timeout as e:
+                self._count("failures")
+                raise LLMError(f"timed out: {e}") from e
+            except requests.ConnectionError as e:
+                error = f"connection failed: {e}"
+            else:
+                if response.status_code == 200:
+                    try:
+                        content = response.json()["choices"][0]["message"]["content"]
+                        result = json.loads(content)
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        self._count("failures")
+                        raise LLMError(f"unexpected reply: {e}") from e
+                    if not isinstance(result, dict):
+                        self._count("failures")
+                        raise LLMError("reply is not a JSON object")
+                    return result
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRY_STATUSES:
+                    self._count("failures")
+                    raise LLMError(error)
+                retry_after = response.headers.get("Retry-After")
+            if attempt < self.max_retries:
+                self._count("retries")
+                time.sleep(self._delay(attempt, retry_after))
+        self._count("failures")
+        raise LLMError(error)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+class DraftCache:
+    """
+    Persistent (SQLite) map from prompt key to a drafted (subject, body).
+    Once closed, lookups find nothing and writes are skipped.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS drafts "
+            "(key TEXT PRIMARY KEY, subject TEXT NOT NULL, body TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Tuple[str, str]]:
+        found = {}
+        with self._lock:
+            if self._conn is None:
+                return found
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, subject, body FROM drafts WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, (subject, body)) for key, subject, body in rows)
+        return found
+
+    def put_many(self, drafts: Dict[str, Tuple[str, str]]):
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO drafts (key, subject, body, created_at) VALUES (?, ?, ?, ?)",
+                [(key, subject, body, now) for key, (subject, body) in drafts.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def draft_key(template: str, tone: str, model: str, lead: Dict) -> str:
+    """Cache key of a draft: the template, tone, model and the lead fields the model sees."""
+    digest = hashlib.sha256()
+    for part in (template, tone, model, *(str(lead.get(field) or "") for field in PROMPT_FIELDS)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class LLMPersonalizer:
+    """
+    Drafts personalized emails with an LLM, many leads per request.
+
+    Leads whose prompt (template, tone, model and lead fields) was drafted
+    before are answered from a persistent cache, and identical prompts in
+    one call are asked for once. The rest are split into requests of
+    ``batch_size`` leads, sent concurrently with at most ``max_in_flight``
+    requests open at a time across all callers. Leads whose request fails
+    or times out, or that are still waiting when ``deadline`` runs out,
+    get no draft, and EmailWriter falls back to the static template for
+    them; late replies are still cached for next time, as long as the
+    personalizer is open (close() waits for them by default).
+    """
+
+    def __init__(self, client: Optional[ChatCompletionsClient] = None, batch_size: int = 20,
+                 max_in_flight: int = 4, cache_path: Optional[str] = None,
+                 deadline: Optional[float] = None):
+        """
+        Args:
+            client (ChatCompletionsClient): Completions client; one is built
+                from the environment if omitted
+            batch_size (int): Leads per request
+            max_in_flight (int): Most requests open at the same time
+            cache_path (str): SQLite file for the draft cache (in-memory
+                cache only if omitted)
+            deadline (float): Most seconds one personalize() call waits
+        """
+        self.client = client if client is not None else ChatCompletionsClient()
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.cache = DraftCache(cache_path) if cache_path else None
+        # Without a cache file, drafts are only kept for this process
+        self._memory: Dict[str, Tuple[str, str]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"cache_hits": 0, "drafted": 0, "fallbacks": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                    thread_name_prefix="llm")
+            return self._executor
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Tuple[str, str]]:
+        if self.cache is not None:
+            return self.cache.get_many(keys)
+        with self._lock:
+            return {key: self._memory[key] for key in keys if key in self._memory}
+
+    def _store(self, drafts: Dict[str, Tuple[str, str]]):
+        cache = self.cache
+        if cache is not None:
+            # Skipped if close() got to the cache first
+            cache.put_many(drafts)
+        else:
+            with self._lock:
+                self._memory.update(drafts)
+
+    def _messages(self, template: str, tone: str, batch: List[Tuple[str, Dict]]) -> List[Dict]:
+        request = {
+            "tone": tone,
+            "reference_email": template,
+            "leads": [
+                {"id": str(index), **{field: lead[field] for field in PROMPT_FIELDS if lead.get(field)}}
+                for index, (_, lead) in enumerate(batch)
+            ]
+        }
+        return [{"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps(request, ensure_ascii=False)}]
+
+    def _draft_batch(self, template: str, tone: str, batch: List[Tuple[str, Dict]]) -> Dict[str, Tuple[str, str]]:
+        """One request; returns drafts by key for the leads the model answered."""
+        reply = self.client.complete_json(self._messages(template, tone, batch))
+        drafts = {}
+        for email in reply.get("emails") or []:
+            try:
+                key = batch[int(email["id"])][0]
+                subject, body = str(email["subject"]).strip(), str(email["body"]).strip()
+            except (KeyError, ValueError, IndexError, TypeError):
+                continue
+            if subject and body:
+                drafts[key] = (subject, body)
+        if drafts:
+            self._store(drafts)
+        return drafts
+
+    def personalize(self, leads: Sequence[Dict], template: str, tone: str) -> List[Optional[Tuple[str, str]]]:
+        """
+        Draft ``(subject, body)`` for each lead.
+
+        Args:
+            leads: Leads to write to
+            template (str): Template source of the tone, shown to the model
+                as the reference email and part of the cache key
+            tone (str): Email tone
+        Returns:
+            One draft per lead, in order; None where the static template
+            should be used instead
+        """
+        keys = [draft_key(template, tone, self.client.model, lead) for lead in leads]
+        drafts = self._lookup(list(dict.fromkeys(keys)))
+        hits = sum(1 for key in keys if key in drafts)
+
+        # Each distinct prompt is asked for once, however many leads share it
+        missing = {}
+        for key, lead in zip(keys, leads):
+            if key not in drafts and key not in missing:
+                missing[key] = lead
+        todo = list(missing.items())
+        batches = [todo[start:start + self.batch_size] for start in range(0, len(todo), self.batch_size)]
+        if batches:
+            pool = self._pool()
+            futures = [pool.submit(self._draft_batch, template, tone, batch) for batch in batches]
+            done, _ = wait(futures, timeout=self.deadline)
+            for future in done:
+                try:
+                    drafts.update(future.result())
+                except Exception:
+                    pass  # These leads fall back to the static template
+
+        results = [drafts.get(key) for key in keys]
+        fallbacks = sum(1 for draft in results if draft is None)
+        with self._lock:
+            self._stats["cache_hits"] += hits
+            self._stats["drafted"] += len(results) - hits - fallbacks
+            self._stats["fallbacks"] += fallbacks
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(self.client.stats())
+        return stats
+
+    def close(self, wait: bool = True):
+        """
+        Stop the request threads and close the cache. Requests not yet
+        started are cancelled.
+
+        Args:
+            wait (bool): Wait for open requests, so their late replies are
+                cached; otherwise they are dropped when they arrive
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+def personalizer_from_env(cache_path: Optional[str] = None) -> Optional[LLMPersonalizer]:
+    """
+    Build the personalizer from LLM_* settings, or None unless
+    EMAIL_PERSONALIZE is on and an API key is set.
+    """
+    if os.getenv("EMAIL_PERSONALIZE", "").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    if not os.getenv("OPENAI_API_KEY"):
+        return None
+    client = ChatCompletionsClient(
+        timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", 3))
+    )
+    deadline = float(os.getenv("LLM_DEADLINE", 0)) or None
+    return LLMPersonalizer(
+        client,
+        batch_size=int(os.getenv("LLM_BATCH_SIZE", 20)),
+        max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", 4)),
+        cache_path=cache_path,
+        deadline=deadline
+    )
@@ -0,0 +1,166 @@
+import base64
+import re
+import smtplib
+import uuid
+from email.header import Header
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CRLF = b"\r\n"
+# SMTP caps a line at 1000 octets including CRLF
+MAX_LINE = 998
+
+_DOT_LINE = re.compile(rb"(?m)^\.")
+_NEWLINES = re.compile(r"\r\n|\r|\n")
+
+def _one_line(value: str) -> str:
+    """Header values must not smuggle in extra header lines."""
+    return " ".join(_NEWLINES.split(value)).strip() if "\n" in value or "\r" in value else value
+
+@lru_cache(maxsize=4096)
+def encode_header(name: str, value: str) -> bytes:
+    """
+    One header line, RFC 2047-encoded and folded when the value is not
+    plain ASCII or is long. Cached, since subjects repeat across a campaign.
+    """
+    value = _one_line(value)
+    if value.isascii() and len(name) + len(value) < 78:
+        return f"{name}: {value}".encode("ascii") + CRLF
+    charset = "us-ascii" if value.isascii() else "utf-8"
+    encoded = Header(value, charset, header_name=name).encode(linesep="\r\n")
+    return f"{name}: {encoded}".encode("ascii") + CRLF
+
+def _body_lines_fit(body: bytes) -> bool:
+    return all(len(line) <= MAX_LINE for line in body.split(CRLF))
+
+class MessageBuilder:
+    """
+    Builds wire-ready message bytes for one sender.
+
+    Produces the same structure EmailSender used to build with
+    ``MIMEMultipart`` + ``MIMEText``: a multipart/mixed message with one
+    text/plain part. Everything that does not depend on the recipient
+    (From and MIME headers, the boundary, part headers, the envelope
+    ``MAIL FROM`` command) is encoded once, so building a message is a
+    handful of byte joins instead of an email.message object tree.
+    """
+
+    def __init__(self, sender: str, boundary: Optional[str] = None):
+        self.sender = sender or ""
+        self.boundary = boundary or "=" * 15 + uuid.uuid4().hex + "=="
+        marker = self.boundary.encode("ascii")
+        self._head = (
+            b'Content-Type: multipart/mixed; boundary="' + marker + b'"' + CRLF
+            + b"MIME-Version: 1.0" + CRLF
+            + encode_header("From", self.sender)
+        )
+        part_head = CRLF + b"--" + marker + CRLF
+        self._ascii_part = (part_head + b'Content-Type: text/plain; charset="us-ascii"' + CRLF
+                            + b"MIME-Version: 1.0" + CRLF
+                            + b"Content-Transfer-Encoding: 7bit" + CRLF + CRLF)
+        self._base64_part = (part_head + b'Content-Type: text/plain; charset="utf-8"' + CRLF
+                             + b"MIME-Version: 1.0" + CRLF
+                             + b"Content-Transfer-Encoding: base64" + CRLF + CRLF)
+        self._tail = CRLF + b"--" + marker + b"--" + CRLF
+        self._marker = b"--" + marker
+        self.mail_from = b"MAIL FROM:<" + self.sender.encode("utf-8") + b">" + CRLF
+
+    def build(self, email: Dict) -> bytes:
+        """
+        Message bytes for an email with 'to', 'subject' and 'body', with
+        CRLF line endings and ready for ``smtplib.SMTP.sendmail``.
+        """
+        body = email["body"]
+        part = self._ascii_part
+        if body.isascii():
+            encoded = "\r\n".join(_NEWLINES.split(body)).encode("ascii")
+            if not _body_lines_fit(encoded) or self._marker in encoded:
+                part, encoded = self._base64_part, base64.encodebytes(body.encode("utf-8")).replace(b"\n", CRLF)
+        else:
+            part, encoded = self._base64_part, base64.encodebytes(body.encode("utf-8")).replace(b"\n", CRLF)
+        if encoded.endswith(CRLF):
+            encoded = encoded[:-2]
+        return b"".join((
+            self._head,
+            encode_header("To", email["to"]),
+            encode_header("Subject", email["subject"]),
+            part,
+            encoded,
+            self._tail
+        ))
+
+def envelope_commands(mail_from: bytes, recipient: str) -> bytes:
+    """MAIL, RCPT and DATA for one message, sent to the server in one write."""
+    return mail_from + b"RCPT TO:<" + recipient.encode("utf-8") + b">" + CRLF + b"DATA" + CRLF
+
+def _reply(server: smtplib.SMTP) -> Tuple[int, str]:
+    code, message = server.getreply()
+    if code == 421:
+        # The server is shutting the connection down
+        server.close()
+        raise smtplib.SMTPServerDisconnected(message.decode("utf-8", "replace"))
+    return code, message.decode("utf-8", "replace")
+
+def submit_messages(server: smtplib.SMTP, builder: MessageBuilder,
+                    messages: List[Tuple[str, bytes]]) -> Iterator[Tuple[int, Optional[str]]]:
+    """
+    Submit messages on one connection, yielding ``(position, error)`` as the
+    server confirms each one; ``error`` is None once a message is accepted.
+
+    If the server supports ESMTP PIPELINING (RFC 2920), the ``MAIL``/``RCPT``
+    /``DATA`` commands of a message go out in one write together with the
+    content of the previous message, so each message costs one round trip
+    instead of four. Otherwise messages go through ``sendmail`` one by one.
+
+    Rejections are yielded as errors and the transaction is reset. A dropped
+    connection raises (``SMTPServerDisconnected`` or ``OSError``); messages
+    not yet yielded were not confirmed.
+
+    Args:
+        server (smtplib.SMTP): Connected (and authenticated) server
+        builder (MessageBuilder): Supplies the encoded envelope sender
+        messages: (recipient, message bytes from MessageBuilder.build) pairs
+    """
+    server.ehlo_or_helo_if_needed()
+    if not server.has_extn("pipelining"):
+        for position, (recipient, data) in enumerate(messages):
+            try:
+                server.sendmail(builder.sender, recipient, data)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                yield position, str(e)
+                continue
+            yield position, None
+        return
+
+    pending = b""
+    # Replies owed for ``pending``: ("data", position) for a message's
+    # content, ("reset", None) for RSET
+    owed: List[Tuple[str, Optional[int]]] = []
+    for position, (recipient, data) in enumerate(messages):
+        server.send(pending + envelope_commands(builder.mail_from, recipient))
+        for kind, owner in owed:
+            code, message = _reply(server)
+            if kind == "data":
+                yield owner, None if code == 250 else f"({code}, {message!r})"
+        replies = [_reply(server) for _ in range(3)]
+        (mail_code, _), (rcpt_code, _), (data_code, _) = replies
+        if mail_code == 250 and rcpt_code in (250, 251) and data_code == 354:
+            pending = _DOT_LINE.sub(b"..", data) + CRLF + b"." + CRLF
+            owed = [("data", position)]
+            continue
+        code, message = next(
+            (reply for reply, expected in zip(replies, ((250,), (250, 251), (354,)))
+             if reply[0] not in expected)
+        )
+        yield position, f"({code}, {message!r})"
+        if data_code == 354:
+            # Should not happen after a refused recipient, but end the data cleanly
+            pending, owed = b"." + CRLF + b"RSET" + CRLF, [("dot", None), ("reset", None)]
+        else:
+            pending, owed = b"RSET" + CRLF, [("reset", None)]
+    if pending:
+        server.send(pending)
+        for kind, owner in owed:
+            code, message = _reply(server)
+            if kind == "data":
+                yield owner, None if code == 250 else f"({code}, {message!r})"
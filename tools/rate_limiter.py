@@ -0,0 +1,150 @@
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Tuple
+
+class TokenBucket:
+    """
+    Classic token bucket: ``rate`` tokens per second, holding at most
+    ``capacity``. A rate of 0 or less means unlimited.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        if self.rate <= 0:
+            self._tokens = float("inf")
+            return
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until ``tokens`` can be taken (0 if available now)."""
+        self._refill()
+        if self._tokens >= tokens:
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take ``tokens`` if available right now."""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+def recipient_domain(email: Dict) -> str:
+    return email["to"].rsplit("@", 1)[-1].strip().lower()
+
+class SendScheduler:
+    """
+    Paces sends under a global provider quota and per-recipient-domain limits.
+
+    ``schedule`` releases a batch of emails one at a time as tokens become
+    available. Each batch keeps a priority queue of its domains ordered by
+    when their bucket next has a token, so a throttled domain never blocks
+    the others and consecutive sends are interleaved across domains.
+    Buckets are shared, so one scheduler can pace several concurrent
+    batches (e.g. several agents) against the same quota. A domain rate of
+    0 leaves domains unlimited, so only the global quota applies. Bursts
+    are at least one send: a bucket holding less than one token could
+    never release a message.
+    """
+
+    def __init__(self, rate: float = 10, burst: float = 10,
+                 domain_rate: float = 1, domain_burst: float = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.domain_rate = domain_rate
+        self.domain_burst = max(1.0, domain_burst)
+        self._clock = clock
+        self.global_bucket = TokenBucket(rate, max(1.0, burst), clock)
+        self._domain_buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._dispatched = 0
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        bucket = self._domain_buckets.get(domain)
+        if bucket is None:
+            bucket = TokenBucket(self.domain_rate, self.domain_burst, self._clock)
+            self._domain_buckets[domain] = bucket
+        return bucket
+
+    def schedule(self, emails: List[Dict]) -> Iterator[Tuple[int, Dict]]:
+        """
+        Yield ``(index, email)`` pairs, blocking until each may be sent.
+
+        Args:
+            emails (List[Dict]): Emails with a 'to' address
+        Returns:
+            Iterator of (position in ``emails``, email)
+        """
+        queues: Dict[str, deque] = {}
+        for i, email in enumerate(emails):
+            queues.setdefault(recipient_domain(email), deque()).append((i, email))
+        # (time the domain may send next, round-robin order, domain)
+        heap = [(0.0, order, domain) for order, domain in enumerate(queues)]
+        order = len(heap)
+
+        with self._lock:
+            self._queued += len(emails)
+        remaining = len(emails)
+        try:
+            while heap:
+                delay = 0.0
+                item = None
+                with self._lock:
+                    ready_at, _, domain = heap[0]
+                    now = self._clock()
+                    if ready_at > now:
+                        delay = ready_at - now
+                    else:
+                        bucket = self._bucket(domain)
+                        domain_wait = bucket.wait_time()
+                        if domain_wait > 0:
+                            # Another batch used this domain's tokens; requeue it
+                            heapq.heapreplace(heap, (now + domain_wait, order, domain))
+                            order += 1
+                            continue
+                        delay = self.global_bucket.wait_time()
+                        if delay == 0:
+                            self.global_bucket.try_acquire()
+                            bucket.try_acquire()
+                            item = queues[domain].popleft()
+                            if queues[domain]:
+                                heapq.heapreplace(heap, (now + bucket.wait_time(), order, domain))
+                                order += 1
+                            else:
+                                heapq.heappop(heap)
+                            self._queued -= 1
+                            self._dispatched += 1
+                            remaining -= 1
+                if item is not None:
+                    yield item
+                else:
+                    time.sleep(delay)
+        finally:
+            with self._lock:
+                self._queued -= remaining
+
+    def stats(self) -> Dict:
+        """Live counters: queue depth, tokens available and sends released."""
+        with self._lock:
+            return {
+                "queue_depth": self._queued,
+                "tokens_available": self.global_bucket.tokens,
+                "dispatched": self._dispatched,
+                "domain_tokens": {domain: bucket.tokens for domain, bucket in self._domain_buckets.items()},
+            }
@@ -0,0 +1,51 @@
+import threading
+from typing import Any, Callable, Dict, List
+
+class ToolRegistry:
+    """
+    Tools by name, each built by its factory the first time it is asked for.
+
+    Factories import their modules when called, so a tool that a run never
+    uses costs neither import time nor construction.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._tools: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Add a tool factory, replacing any tool already built under ``name``."""
+        with self._lock:
+            self._factories[name] = factory
+            self._tools.pop(name, None)
+
+    def set(self, name: str, tool: Any):
+        """Use an already built tool."""
+        with self._lock:
+            self._tools[name] = tool
+
+    def get(self, name: str) -> Any:
+        """The tool called ``name``, building it on first use."""
+        tool = self._tools.get(name)
+        if tool is not None:
+            return tool
+        with self._lock:
+            tool = self._tools.get(name)
+            if tool is None:
+                factory = self._factories.get(name)
+                if factory is None:
+                    raise KeyError(f"Unknown tool: {name}")
+                tool = self._tools[name] = factory()
+            return tool
+
+    def loaded(self, name: str) -> bool:
+        """True if the tool has been built (or set)."""
+        return name in self._tools
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(set(self._factories) | set(self._tools))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories or name in self._tools
@@ -1,8 +1,15 @@
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
+from memory.dedup import LeadDedupIndex
+from tools.lead_sources import LeadSource, MockLeadSource
+from tools.search_cache import SearchCache
 
 class LeadSearcher:
-    def __init__(self):
+    def __init__(self, dedup_index: Optional[LeadDedupIndex] = None,
+                 cache: Optional[SearchCache] = None, source: Optional[LeadSource] = None):
+        # Leads already in the index (emailed by an earlier run) are skipped
+        self.dedup_index = dedup_index
+        self.cache = cache
         self.mock_leads = [
             {
                 "name": "Sarah Chen",
@@ -26,10 +33,14 @@ class LeadSearcher:
                 "company_description": "Creating AI-powered educational robots for children"
             }
         ]
+        # Where leads come from; the mock data unless another source is given
+        self.source = source if source is not None else MockLeadSource(self.mock_leads)
     
     def search_leads(self, query: str, num_leads: int = 5) -> List[Dict]:
         """
-        Search for leads based on a query. Uses mock data for testing.
+        Search for leads based on a query using the configured lead source.
+        A search that fails outright raises (LeadSourceError for the web
+        source) and is not cached.
         
         Args:
             query (str): Search query (e.g., "AI startup founders")
@@ -43,16 +54,46 @@ class LeadSearcher:
                 - email: Email address
                 - company_description: Brief company description
         """
-        # Return a subset of mock leads based on num_leads
-        leads = self.mock_leads[:min(num_leads, len(self.mock_leads))]
-        
-        # Add metadata to each lead
-        for lead in leads:
-            lead["found_at"] = datetime.now().isoformat()
-            lead["source"] = "mock_data"
+        if self.cache is not None:
+            leads = self.cache.get_or_search(query, num_leads, lambda: self._search_backend(query, num_leads))
+        else:
+            leads = self._search_backend(query, num_leads)
         
+        if self.dedup_index is not None:
+            leads = self.dedup_index.filter_unseen(leads)
         return leads
     
+    def _search_backend(self, query: str, num_leads: int) -> List[Dict]:
+        """Run the actual (uncached) search."""
+        return list(self.source.search(query, num_leads))
+    
+    def stream_leads(self, query: str, num_leads: int = 5) -> Iterator[Dict]:
+        """
+        Yield leads for a query one at a time, as the source finds them.
+        
+        Cached results are replayed; otherwise the leads are cached once the
+        source is exhausted without error.
+        """
+        leads = self.cache.get(query, num_leads) if self.cache is not None else None
+        if leads is None:
+            leads = []
+            
+            def found():
+                for lead in self.source.search(query, num_leads):
+                    leads.append(lead)
+                    yield lead
+            
+            new_leads = found() if self.dedup_index is None else self.dedup_index.iter_unseen(found())
+            for lead in new_leads:
+                yield dict(lead)
+            if self.cache is not None:
+                self.cache.put(query, num_leads, leads)
+            return
+        
+        if self.dedup_index is not None:
+            leads = self.dedup_index.filter_unseen(leads)
+        yield from leads
+    
     def _generate_fallback_leads(self, query: str, num_leads: int) -> List[Dict]:
         """
         Generate fallback leads if the main search fails.
@@ -0,0 +1,154 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(query.lower().split())
+
+def _copy_leads(leads: List[Dict]) -> List[Dict]:
+    # Callers annotate the leads they get back; never hand out cached dicts
+    return [dict(lead) for lead in leads]
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[List[Dict]] = None
+        self.error: Optional[BaseException] = None
+
+class SearchCache:
+    """
+    Two-tier TTL cache for lead search results.
+
+    Results are keyed by normalized query plus ``num_leads``. The first
+    tier is an in-process LRU of ``max_entries`` results; the optional
+    second tier is a SQLite file that survives restarts. Concurrent
+    lookups of the same missing key are coalesced so only one of them
+    calls the backend (single flight).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600,
+                 disk_path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0,
+                       "expirations": 0, "coalesced": 0}
+        self._conn = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, leads TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(query: str, num_leads: int) -> str:
+        return f"{normalize_query(query)}|{num_leads}"
+
+    def _lookup(self, key: str) -> Optional[List[Dict]]:
+        """Find a fresh entry in either tier; caller holds the lock."""
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+            self._stats["expirations"] += 1
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT expires_at, leads FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] > now:
+                leads = json.loads(row[1])
+                self._store_memory(key, row[0], leads)
+                self._stats["disk_hits"] += 1
+                return leads
+        return None
+
+    def _store_memory(self, key: str, expires_at: float, leads: List[Dict]):
+        self._entries[key] = (expires_at, leads)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _store(self, key: str, leads: List[Dict]):
+        expires_at = self._clock() + self.ttl
+        self._store_memory(key, expires_at, leads)
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, expires_at, leads) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(leads, default=str))
+                )
+
+    def get(self, query: str, num_leads: int) -> Optional[List[Dict]]:
+        """Cached leads for a query, or None on a miss."""
+        with self._lock:
+            leads = self._lookup(self.make_key(query, num_leads))
+            if leads is None:
+                self._stats["misses"] += 1
+                return None
+            return _copy_leads(leads)
+
+    def put(self, query: str, num_leads: int, leads: List[Dict]):
+        """Cache leads gathered outside ``get_or_search`` (e.g. streamed)."""
+        with self._lock:
+            self._store(self.make_key(query, num_leads), _copy_leads(leads))
+
+    def get_or_search(self, query: str, num_leads: int,
+                      search: Callable[[], List[Dict]]) -> List[Dict]:
+        """
+        Return cached leads for a query, calling ``search`` on a miss.
+
+        Returns a fresh copy each time, so callers may modify the leads.
+        """
+        key = self.make_key(query, num_leads)
+        with self._lock:
+            leads = self._lookup(key)
+            if leads is not None:
+                return _copy_leads(leads)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy_leads(flight.result)
+
+        try:
+            flight.result = _copy_leads(search())
+            with self._lock:
+                self._store(key, flight.result)
+            return _copy_leads(flight.result)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, eviction, expiration and coalescing counters."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
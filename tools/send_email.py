@@ -1,43 +1,224 @@
 import smtplib
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import List, Dict
-from dotenv import load_dotenv
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from tools.mime_fast import MessageBuilder, submit_messages
+from tools.smtp_pool import SMTPConnectionPool
+from tools.rate_limiter import SendScheduler
+from memory.outbox import DRY_RUN, Outbox, OutboxItem
 
 class EmailSender:
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, smtp_server: Optional[str] = None, smtp_port: Optional[int] = None,
+                 max_connections: Optional[int] = None, use_tls: Optional[bool] = None,
+                 dry_run: Optional[bool] = None, scheduler: Optional[SendScheduler] = None,
+                 pipeline_batch: Optional[int] = None):
+        _load_env()
         self.email_address = os.getenv("EMAIL_ADDRESS")
         self.email_password = os.getenv("EMAIL_PASSWORD")
-        self.smtp_server = os.getenv("EMAIL_SMTP_SERVER", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("EMAIL_SMTP_PORT", 587))
+        self.smtp_server = smtp_server or os.getenv("EMAIL_SMTP_SERVER", "smtp.gmail.com")
+        self.smtp_port = smtp_port or int(os.getenv("EMAIL_SMTP_PORT", 587))
+        self.max_connections = max_connections or int(os.getenv("EMAIL_MAX_CONNECTIONS", 4))
+        self.use_tls = use_tls if use_tls is not None else _env_flag("EMAIL_USE_TLS", True)
+        # Messages are built but not submitted unless dry run is switched
+        # off; their results have status "dry_run", never "sent"
+        self.dry_run = dry_run if dry_run is not None else _env_flag("EMAIL_DRY_RUN", True)
+        # Dry runs submit nothing, so they are never paced
+        if scheduler is None and not self.dry_run:
+            scheduler = scheduler_from_env()
+        self.scheduler = scheduler
+        # Most messages a worker submits per connection checkout
+        self.pipeline_batch = pipeline_batch or int(os.getenv("EMAIL_PIPELINE_BATCH", 50))
+        self._pool = None
+
+    def _get_pool(self) -> SMTPConnectionPool:
+        if self._pool is None:
+            self._pool = SMTPConnectionPool(
+                self.smtp_server, self.smtp_port,
+                username=self.email_address, password=self.email_password,
+                use_tls=self.use_tls, max_connections=self.max_connections
+            )
+        return self._pool
+
+    def _send_batch(self, pool: SMTPConnectionPool, builder: MessageBuilder,
+                    batch: List[Tuple[int, Dict]], results: List[Optional[Dict]]):
+        """
+        Send a batch of emails on one pooled connection (pipelined where the
+        server allows it), reconnecting once for whatever the server had not
+        confirmed when a connection died.
+        """
+        pending = [(i, email, builder.build(email)) for i, email in batch]
+        error = None
+        for _ in range(2):
+            try:
+                server = pool.acquire()
+            except Exception as e:
+                error = e
+                break
+            confirmed = set()
+            try:
+                if self.dry_run:
+                    confirmed.update(i for i, _, _ in pending)
+                    for i, email, _ in pending:
+                        results[i] = {"to": email["to"], "status": DRY_RUN}
+                else:
+                    messages = [(email["to"], data) for _, email, data in pending]
+                    for position, failure in submit_messages(server, builder, messages):
+                        i, email, _ = pending[position]
+                        confirmed.add(i)
+                        if failure is None:
+                            results[i] = {"to": email["to"], "status": "sent"}
+                        else:
+                            results[i] = {"to": email["to"], "status": "failed", "error": failure}
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                pool.release(server, broken=True)
+                pending = [entry for entry in pending if entry[0] not in confirmed]
+                error = e
+                continue
+            except Exception as e:
+                pool.release(server, broken=True)
+                pending = [entry for entry in pending if entry[0] not in confirmed]
+                error = e
+                break
+            pool.release(server)
+            return
+        for i, email, _ in pending:
+            results[i] = {"to": email["to"], "status": "failed", "error": str(error)}
 
     def send_emails(self, emails: List[Dict]) -> List[Dict]:
         """
         Send a list of emails using SMTP.
+
+        Messages are fanned out over a bounded pool of SMTP connections
+        (``max_connections``). Each worker takes up to ``pipeline_batch``
+        waiting messages at a time and submits them on one connection, with
+        ESMTP PIPELINING when the server supports it; a connection that dies
+        is replaced and the unconfirmed messages retried once. When a
+        scheduler is configured, messages are released to the workers at
+        the pace its token buckets allow; a dry run skips it.
         Args:
             emails (List[Dict]): List of emails with 'to', 'subject', 'body'
         Returns:
-            List[Dict]: List of results with status for each email
+            List[Dict]: List of results with status ("sent", "failed", or
+                "dry_run" in a dry run) for each email, in input order
         """
-        results = []
+        if not emails:
+            return []
+        pool = self._get_pool()
+        # Open one connection up front so an unreachable server fails the batch once
         try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_address, self.email_password)
-                for email in emails:
-                    msg = MIMEMultipart()
-                    msg["From"] = self.email_address
-                    msg["To"] = email["to"]
-                    msg["Subject"] = email["subject"]
-                    msg.attach(MIMEText(email["body"], "plain"))
-                    try:
-                        #server.sendmail(self.email_address, email["to"], msg.as_string())
-                        results.append({"to": email["to"], "status": "sent"})
-                    except Exception as e:
-                        results.append({"to": email["to"], "status": "failed", "error": str(e)})
+            pool.release(pool.acquire())
         except Exception as e:
-            for email in emails:
-                results.append({"to": email["to"], "status": "failed", "error": str(e)})
-        return results 
\ No newline at end of file
+            return [{"to": email["to"], "status": "failed", "error": str(e)} for email in emails]
+
+        builder = MessageBuilder(self.email_address)
+        results: List[Optional[Dict]] = [None] * len(emails)
+        work: "queue.Queue[Optional[Tuple[int, Dict]]]" = queue.Queue()
+        workers = min(self.max_connections, len(emails))
+
+        def drain():
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                batch = [item]
+                while len(batch) < self.pipeline_batch:
+                    try:
+                        item = work.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        work.put(None)  # Leave the stop signal for the next round
+                        break
+                    batch.append(item)
+                self._send_batch(pool, builder, batch, results)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(drain) for _ in range(workers)]
+            try:
+                paced = self.scheduler is not None and not self.dry_run
+                released = self.scheduler.schedule(emails) if paced else enumerate(emails)
+                for item in released:
+                    work.put(item)
+            finally:
+                for _ in range(workers):
+                    work.put(None)
+            for future in futures:
+                future.result()
+        return results
+
+    def deliver_outbox(self, outbox: Outbox, batch_size: int = 500, wait: bool = False,
+                       run_id: Optional[str] = None, segment: Optional[int] = None) -> List[Tuple[OutboxItem, Dict]]:
+        """
+        Send every due message in a durable outbox and record the outcomes.
+
+        Args:
+            outbox (Outbox): Outbox to drain
+            batch_size (int): Messages claimed and sent per round
+            wait (bool): Keep running until nothing is queued, sleeping
+                until failed messages are due for their retry
+            run_id (str): Only send this run's messages; every run's if omitted
+            segment (int): Only send this goal segment's messages of ``run_id``
+        Returns:
+            List of (outbox item, send result) pairs
+
+        In a dry run the first ``batch_size`` due messages are built and
+        reported but stay queued, so nothing is recorded as sent.
+        """
+        if self.dry_run:
+            items = outbox.pending(batch_size, run_id=run_id, segment=segment)
+            return list(zip(items, self.send_emails([item.email for item in items])))
+        delivered = []
+        while True:
+            items = outbox.claim(batch_size, run_id=run_id, segment=segment)
+            if not items:
+                due_at = outbox.next_due_at(run_id, segment) if wait else None
+                if due_at is None:
+                    break
+                time.sleep(max(0.0, due_at - time.time()))
+                continue
+            results = self.send_emails([item.email for item in items])
+            for item, result in zip(items, results):
+                outbox.record(item, result)
+                delivered.append((item, result))
+            outbox.commit()
+        return delivered
+
+    def close(self):
+        """Close pooled SMTP connections."""
+        if self._pool is not None:
+            self._pool.close()
+
+_env_loaded = False
+
+def _load_env():
+    """Read .env once per process rather than once per sender."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def scheduler_from_env() -> Optional[SendScheduler]:
+    """
+    Build the send scheduler from the EMAIL_RATE_* and EMAIL_*BURST
+    settings (by default 10 sends/s with bursts of 10, and 1 send/s per
+    recipient domain with bursts of 5). A rate of 0 disables it, and a
+    domain rate of 0 leaves domains unlimited.
+    """
+    rate = float(os.getenv("EMAIL_RATE_PER_SEC", 10))
+    if rate <= 0:
+        return None
+    return SendScheduler(
+        rate=rate,
+        burst=float(os.getenv("EMAIL_BURST", rate)),
+        domain_rate=float(os.getenv("EMAIL_DOMAIN_RATE_PER_SEC", 1)),
+        domain_burst=float(os.getenv("EMAIL_DOMAIN_BURST", 5))
+    )
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
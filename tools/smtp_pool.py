@@ -0,0 +1,76 @@
+import queue
+import smtplib
+import threading
+from typing import List, Optional
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of authenticated SMTP connections shared between threads.
+
+    Connections are opened lazily, handed out one caller at a time and
+    returned for reuse. A connection released as broken is closed, and
+    the next caller gets a fresh one.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, use_tls: bool = True,
+                 max_connections: int = 4, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        """Take a connection from the pool, opening one if none is idle."""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server: smtplib.SMTP, broken: bool = False):
+        """Return a connection to the pool, closing it if it is broken."""
+        if broken:
+            try:
+                server.close()
+            except Exception:
+                pass
+        else:
+            self._idle.put(server)
+        self._slots.release()
+
+    def close(self):
+        """Politely close every idle connection."""
+        closing: List[smtplib.SMTP] = []
+        while True:
+            try:
+                closing.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for server in closing:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
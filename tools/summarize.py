@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from records import email_domain
+from tools.llm_writer import ChatCompletionsClient, LLMError
+
+SYSTEM_PROMPT = (
+    "You research companies for sales outreach. For every company in the request, "
+    "write a one or two sentence summary of what the company does and why it might "
+    "care about developer tools, based only on the information given. Reply with a "
+    'JSON object: {"summaries": [{"id": "<company id>", "summary": "..."}]}.'
+)
+
+def company_key(lead: Dict) -> str:
+    """Case- and whitespace-insensitive company name, or the email domain if there is none."""
+    company = " ".join(str(lead.get("company") or "").lower().split())
+    return company or email_domain(lead.get("email"))
+
+def describe_company(leads: List[Dict]) -> Dict:
+    """What is known about one company, pooled from all of its leads."""
+    first = leads[0]
+    return {
+        "company": first.get("company") or company_key(first),
+        "descriptions": list(dict.fromkeys(lead["company_description"] for lead in leads
+                                           if lead.get("company_description"))),
+        "roles": list(dict.fromkeys(lead["role"] for lead in leads if lead.get("role"))),
+        "domain": email_domain(first.get("email")),
+        "contacts": len(leads)
+    }
+
+def fallback_summary(company: Dict) -> str:
+    """A summary built from the lead data alone, used without (or instead of) an LLM."""
+    summary = company["company"]
+    if company["descriptions"]:
+        summary += f" is {company['descriptions'][0].rstrip('.')}"
+    summary += "."
+    if company["roles"]:
+        summary += f" Contacts: {', '.join(company['roles'][:3])}."
+    return summary
+
+def apply_summaries(leads: Iterable[Dict], summaries: Dict[str, str]) -> List[Dict]:
+    """Copies of the leads with ``company_summary`` set from summaries keyed by company_key."""
+    result = []
+    for lead in leads:
+        summary = summaries.get(company_key(lead))
+        result.append({**lead, "company_summary": summary} if summary else lead)
+    return result
+
+class CompanySummarizer:
+    """
+    Summarizes the companies of a set of leads, once per company.
+
+    Leads are grouped by company (company_key), so a company with many
+    contacts costs one summary. Fresh summaries come from the in-process
+    table or the SQLite cache (``ttl`` seconds); the rest are summarized
+    ``batch_size`` companies per LLM request with up to ``workers``
+    requests at once. Without an LLM client, or when a request fails,
+    companies get a summary built from the lead data (fallback_summary),
+    which is not cached so the LLM is asked again next time.
+    """
+
+    def __init__(self, client: Optional[ChatCompletionsClient] = None, batch_size: int = 10,
+                 workers: int = 4, ttl: float = 7 * 24 * 3600, cache_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            client (ChatCompletionsClient): LLM client; summaries are built
+                from the lead data alone if omitted
+            batch_size (int): Companies per request
+            workers (int): Requests running at the same time
+            ttl (float): Seconds a cached summary stays fresh
+            cache_path (str): SQLite file for the summary cache
+            clock (Callable): Time source, for tests
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.workers = workers
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # company_key -> (expires_at, summary)
+        self._fresh: Dict[str, tuple] = {}
+        self._stats = {"leads": 0, "companies": 0, "cache_hits": 0, "summarized": 0, "fallbacks": 0}
+        self._conn = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS company_summaries "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, summary TEXT NOT NULL)"
+            )
+
+    def _cached(self, keys: List[str]) -> Dict[str, str]:
+        now = self._clock()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._fresh.get(key)
+                if entry is not None and entry[0] > now:
+                    found[key] = entry[1]
+            missing = [key for key in keys if key not in found]
+            if self._conn is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._conn.execute(
+                        "SELECT key, expires_at, summary FROM company_summaries "
+                        f"WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?", (*chunk, now)
+                    ).fetchall()
+                    for key, expires_at, summary in rows:
+                        self._fresh[key] = (expires_at, summary)
+                        found[key] = summary
+        return found
+
+    def _store(self, summaries: Dict[str, str]):
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            for key, summary in summaries.items():
+                self._fresh[key] = (expires_at, summary)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO company_summaries (key, expires_at, summary) VALUES (?, ?, ?)",
+                    [(key, expires_at, summary) for key, summary in summaries.items()]
+                )
+                self._conn.commit()
+
+    def _summarize_batch(self, batch: List[tuple]) -> Tuple[Dict[str, str], int]:
+        """
+        Summaries by company_key for one batch of (key, company) pairs, and
+        how many of them are fallbacks.
+        """
+        summaries = {}
+        if self.client is not None:
+            request = {"companies": [{"id": str(index), **company} for index, (_, company) in enumerate(batch)]}
+            try:
+                reply = self.client.complete_json([
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": json.dumps(request, ensure_ascii=False)}
+                ])
+            except LLMError:
+                reply = {}
+            for entry in reply.get("summaries") or []:
+                try:
+                    key = batch[int(entry["id"])][0]
+                    summary = str(entry["summary"]).strip()
+                except (KeyError, ValueError, IndexError, TypeError):
+                    continue
+                if summary:
+                    summaries[key] = summary
+            if summaries:
+                self._store(summaries)
+        fallbacks = 0
+        for key, company in batch:
+            if key not in summaries:
+                summaries[key] = fallback_summary(company)
+                fallbacks += 1
+        return summaries, fallbacks
+
+    def summarize(self, leads: List[Dict]) -> Dict[str, str]:
+        """
+        Summaries of the leads' companies.
+
+        Args:
+            leads (List[Dict]): Leads; any number may share a company
+        Returns:
+            Dict[str, str]: Summary per company_key
+        """
+        groups: Dict[str, List[Dict]] = {}
+        for lead in leads:
+            groups.setdefault(company_key(lead), []).append(lead)
+        groups.pop("", None)
+        summaries = self._cached(list(groups))
+        hits = len(summaries)
+
+        todo = [(key, describe_company(group)) for key, group in groups.items() if key not in summaries]
+        batches = [todo[start:start + self.batch_size] for start in range(0, len(todo), self.batch_size)]
+        fallbacks = 0
+        if batches:
+            if len(batches) == 1 or self.workers <= 1:
+                results = [self._summarize_batch(batch) for batch in batches]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+                    results = list(executor.map(self._summarize_batch, batches))
+            for result, batch_fallbacks in results:
+                summaries.update(result)
+                fallbacks += batch_fallbacks
+
+        with self._lock:
+            self._stats["leads"] += len(leads)
+            self._stats["companies"] += len(groups)
+            self._stats["cache_hits"] += hits
+            self._stats["summarized"] += len(todo) - fallbacks
+            self._stats["fallbacks"] += fallbacks
+        return summaries
+
+    def summarize_leads(self, leads: List[Dict]) -> List[Dict]:
+        """Copies of the leads with ``company_summary`` set, for EmailWriter's templates and prompts."""
+        return apply_summaries(leads, self.summarize(leads))
+
+    def stream(self, leads: Iterable[Dict], chunk_size: int = 100) -> Iterator[Dict]:
+        """
+        Summarize leads as they arrive, ``chunk_size`` at a time. A company
+        seen in an earlier chunk is served from the in-process table.
+        """
+        leads = iter(leads)
+        while True:
+            chunk = list(islice(leads, chunk_size))
+            if not chunk:
+                return
+            yield from self.summarize_leads(chunk)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def summarizer_from_env(cache_path: Optional[str] = None) -> CompanySummarizer:
+    """
+    Build the summarizer from SUMMARY_* settings. It uses the LLM only if
+    SUMMARIZE_WITH_LLM is on and an API key is set, and otherwise
+    summarizes from the lead data.
+    """
+    client = None
+    if os.getenv("SUMMARIZE_WITH_LLM", "").strip().lower() in ("1", "true", "yes", "on") \
+            and os.getenv("OPENAI_API_KEY"):
+        client = ChatCompletionsClient(timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+                                       max_retries=int(os.getenv("LLM_MAX_RETRIES", 3)))
+    return CompanySummarizer(
+        client,
+        batch_size=int(os.getenv("SUMMARY_BATCH_SIZE", 10)),
+        workers=int(os.getenv("SUMMARY_WORKERS", 4)),
+        ttl=float(os.getenv("SUMMARY_TTL", 7 * 24 * 3600)),
+        cache_path=cache_path
+    )
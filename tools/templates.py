@@ -0,0 +1,168 @@
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Template syntax:
+#   {field}              value of a lead field (missing -> KeyError)
+#   {field|default}      value, or ``default`` when missing or empty
+#   {?field}...{/field}  section rendered only when the field is set
+#   {^field}...{/field}  section rendered only when the field is not set
+#   {{ and }}            literal braces
+# The first line of a template is "Subject: ..."; the rest is the body.
+
+_TOKEN = re.compile(r"\{\{|\}\}|\{([?^/]?)([A-Za-z_][A-Za-z0-9_]*)(?:\|([^{}]*))?\}")
+
+LITERAL = 0
+FIELD = 1
+SECTION = 2
+
+class TemplateSyntaxError(ValueError):
+    pass
+
+def _parse(text: str, name: str) -> Tuple:
+    """Parse template text into a tuple of ops, validating section nesting."""
+    stack: List[Tuple[Optional[str], bool, List]] = [(None, False, [])]
+    position = 0
+    for match in _TOKEN.finditer(text):
+        ops = stack[-1][2]
+        if match.start() > position:
+            ops.append((LITERAL, text[position:match.start()]))
+        position = match.end()
+
+        token = match.group(0)
+        if token in ("{{", "}}"):
+            ops.append((LITERAL, token[0]))
+            continue
+        sigil, field, default = match.groups()
+        if sigil in ("?", "^"):
+            stack.append((field, sigil == "^", []))
+        elif sigil == "/":
+            open_field, negate, section_ops = stack.pop() if len(stack) > 1 else (None, False, None)
+            if open_field != field:
+                raise TemplateSyntaxError(f"{name}: unexpected {{/{field}}}")
+            stack[-1][2].append((SECTION, field, negate, _merge(section_ops)))
+        else:
+            ops.append((FIELD, field, default))
+
+    if len(stack) > 1:
+        raise TemplateSyntaxError(f"{name}: section {{?{stack[-1][0]}}} is never closed")
+    if position < len(text):
+        stack[0][2].append((LITERAL, text[position:]))
+    return _merge(stack[0][2])
+
+def _merge(ops: List[Tuple]) -> Tuple:
+    """Join adjacent literals so rendering touches as few ops as possible."""
+    merged: List[Tuple] = []
+    for op in ops:
+        if op[0] == LITERAL and merged and merged[-1][0] == LITERAL:
+            merged[-1] = (LITERAL, merged[-1][1] + op[1])
+        else:
+            merged.append(op)
+    return tuple(merged)
+
+def _render(ops: Tuple, lead: Dict) -> str:
+    out = []
+    for op in ops:
+        kind = op[0]
+        if kind == LITERAL:
+            out.append(op[1])
+        elif kind == FIELD:
+            value = lead.get(op[1])
+            if value is None or value == "":
+                if op[2] is None:
+                    if value is None:
+                        raise KeyError(op[1])
+                else:
+                    value = op[2]
+            out.append(value if isinstance(value, str) else str(value))
+        elif bool(lead.get(op[1])) != op[2]:
+            out.append(_render(op[3], lead))
+    return "".join(out)
+
+def _fields(ops: Tuple) -> List[str]:
+    names = []
+    for op in ops:
+        if op[0] == FIELD:
+            names.append(op[1])
+        elif op[0] == SECTION:
+            names.append(op[1])
+            names.extend(_fields(op[3]))
+    return names
+
+class CompiledTemplate:
+    """
+    An email template parsed once into subject and body op lists.
+
+    Compiled templates are plain data (tuples of ops), so they are cheap
+    to pickle and send to worker processes.
+    """
+
+    __slots__ = ("name", "subject_ops", "body_ops")
+
+    def __init__(self, name: str, subject_ops: Tuple, body_ops: Tuple):
+        self.name = name
+        self.subject_ops = subject_ops
+        self.body_ops = body_ops
+
+    def __getstate__(self):
+        return (self.name, self.subject_ops, self.body_ops)
+
+    def __setstate__(self, state):
+        self.name, self.subject_ops, self.body_ops = state
+
+    @property
+    def fields(self) -> List[str]:
+        """Lead fields the template refers to, in order of first use."""
+        return list(dict.fromkeys(_fields(self.subject_ops) + _fields(self.body_ops)))
+
+    def render(self, lead: Dict) -> Tuple[str, str]:
+        """Render ``(subject, body)`` for one lead."""
+        return _render(self.subject_ops, lead), _render(self.body_ops, lead)
+
+    def render_email(self, lead: Dict) -> Dict:
+        """Render the email dict EmailWriter produces for one lead."""
+        subject, body = self.render(lead)
+        return {"to": lead["email"], "subject": subject, "body": body, "lead": lead}
+
+    def render_batch(self, leads: Any) -> List[Dict]:
+        """
+        Render emails for a whole lead table in one call.
+
+        Args:
+            leads: A list of lead dicts, a columnar dict of equal-length
+                lists ({"name": [...], "email": [...]}), or a pandas DataFrame
+        Returns:
+            List[Dict]: One email per lead, in order
+        """
+        render_email = self.render_email
+        return [render_email(lead) for lead in iter_rows(leads)]
+
+def iter_rows(leads: Any) -> Iterator[Dict]:
+    """Iterate lead rows from a list of dicts, a dict of columns or a DataFrame."""
+    if isinstance(leads, dict):
+        columns = list(leads)
+        for values in zip(*(leads[column] for column in columns)):
+            yield dict(zip(columns, values))
+    elif hasattr(leads, "itertuples") and hasattr(leads, "columns"):
+        columns = [str(column) for column in leads.columns]
+        for values in leads.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+    else:
+        yield from leads
+
+def compile_template(source: str, name: str = "<template>") -> CompiledTemplate:
+    """Compile template source ("Subject: ...\\n<body>")."""
+    first_line, _, body = source.partition("\n")
+    subject = first_line.replace("Subject: ", "")
+    return CompiledTemplate(name, _parse(subject, name), _parse(body, name))
+
+def load_templates(directory: str, extension: str = ".txt") -> Dict[str, CompiledTemplate]:
+    """Compile every ``*.txt`` template in a directory, keyed by file name (the tone)."""
+    templates = {}
+    for filename in sorted(os.listdir(directory)):
+        tone, ext = os.path.splitext(filename)
+        if ext != extension:
+            continue
+        with open(os.path.join(directory, filename), 'r', encoding="utf-8") as f:
+            templates[tone] = compile_template(f.read(), name=filename)
+    return templates
@@ -1,14 +1,29 @@
-from typing import List, Dict
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from tools.templates import CompiledTemplate, compile_template, iter_rows, load_templates
+from memory.dedup import LeadDedupIndex
+
+if TYPE_CHECKING:
+    from tools.llm_writer import LLMPersonalizer
+
+def _render_shard(template: CompiledTemplate, leads: List[Dict]) -> List[Tuple[str, str]]:
+    """Render (subject, body) pairs for one shard of leads in a worker process."""
+    render = template.render
+    return [render(lead) for lead in leads]
 
 class EmailWriter:
-    def __init__(self):
+    def __init__(self, template_dir: Optional[str] = None, dedup_index: Optional[LeadDedupIndex] = None,
+                 personalizer: Optional["LLMPersonalizer"] = None):
         # Define templates for different tones
         self.templates = {
             "professional": (
                 "Subject: Unlock New Possibilities with Our Dev Tool\n\n"
                 "Hi {name},\n\n"
                 "I came across your work at {company} and was impressed by your impact in the AI space. "
-                "We're building a new developer tool that could help {company_description}. "
+                "We're building a new developer tool that could help {company_description|their work}. "
                 "Would you be open to a quick chat about how it might benefit your team?\n\n"
                 "Best regards,\nYour Name"
             ),
@@ -16,7 +31,7 @@ class EmailWriter:
                 "Subject: Quick Hello from a Fellow AI Enthusiast!\n\n"
                 "Hey {name},\n\n"
                 "Saw what you're doing at {company}—super cool! "
-                "I've been working on a dev tool that could be a great fit for {company_description}. "
+                "I've been working on a dev tool that could be a great fit for {company_description|their work}. "
                 "Want to connect and swap ideas?\n\n"
                 "Cheers,\nYour Name"
             ),
@@ -25,11 +40,41 @@ class EmailWriter:
                 "Hi {name},\n\n"
                 "Promise this isn't a robot (well, maybe a little). "
                 "Loved what you're doing at {company}. "
-                "I've got a dev tool that could make {company_description} even cooler. "
+                "I've got a dev tool that could make {company_description|their work} even cooler. "
                 "Up for a quick chat? I promise no more puns.\n\n"
                 "To infinity and beyond,\nYour Name"
             )
         }
+        # Templates are compiled on first use; sources are kept so edits to
+        # self.templates are picked up
+        self._compiled: Dict[str, tuple] = {}
+        
+        # Leads already in the index (emailed before) get no new email; the
+        # index is only read here, leads are added once they are emailed
+        self.dedup_index = dedup_index
+        
+        # When set, write_emails and stream_emails ask an LLM for each
+        # email and use the template for any lead it doesn't answer
+        self.personalizer = personalizer
+        
+        # User-supplied templates (<tone>.txt) add to or override the built-in tones
+        template_dir = template_dir or os.getenv("EMAIL_TEMPLATE_DIR")
+        if template_dir:
+            for tone, template in load_templates(template_dir).items():
+                self.templates[tone] = template
+    
+    def get_template(self, tone: str = "professional") -> CompiledTemplate:
+        """Return the compiled template for a tone, falling back to professional."""
+        if tone not in self.templates:
+            tone = "professional"
+        source = self.templates[tone]
+        if isinstance(source, CompiledTemplate):
+            return source
+        cached = self._compiled.get(tone)
+        if cached is None or cached[0] != source:
+            cached = (source, compile_template(source, name=tone))
+            self._compiled[tone] = cached
+        return cached[1]
     
     def write_emails(self, leads: List[Dict], tone: str = "professional") -> List[Dict]:
         """
@@ -40,18 +85,104 @@ class EmailWriter:
         Returns:
             List[Dict]: List of emails with subject and body
         """
-        template = self.templates.get(tone, self.templates["professional"])
-        emails = []
+        if self.dedup_index is not None:
+            leads = self.dedup_index.filter_unseen(leads)
+        if self.personalizer is not None:
+            return self._personalize(list(leads), tone)
+        render_email = self.get_template(tone).render_email
+        return [render_email(lead) for lead in leads]
+    
+    def stream_emails(self, leads: Iterable[Dict], tone: str = "professional") -> Iterator[Dict]:
+        """Generate emails one lead at a time, as leads arrive."""
+        if self.dedup_index is not None:
+            leads = self.dedup_index.iter_unseen(leads)
+        if self.personalizer is not None:
+            # One request per batch of leads rather than per lead
+            leads = iter(leads)
+            while True:
+                batch = list(islice(leads, self.personalizer.batch_size))
+                if not batch:
+                    return
+                yield from self._personalize(batch, tone)
+        render_email = self.get_template(tone).render_email
         for lead in leads:
-            email_body = template.format(
-                name=lead["name"],
-                company=lead["company"],
-                company_description=lead.get("company_description", "their work")
-            )
-            emails.append({
-                "to": lead["email"],
-                "subject": email_body.split("\n")[0].replace("Subject: ", ""),
-                "body": "\n".join(email_body.split("\n")[1:]),
-                "lead": lead
-            })
-        return emails 
\ No newline at end of file
+            yield render_email(lead)
+    
+    def _personalize(self, leads: List[Dict], tone: str) -> List[Dict]:
+        """LLM-drafted emails, with the static template for leads that got no draft."""
+        template = self.get_template(tone)
+        source = self.templates.get(tone, self.templates["professional"])
+        if isinstance(source, CompiledTemplate):
+            source = repr((source.subject_ops, source.body_ops))
+        drafts = self.personalizer.personalize(leads, source, tone)
+        emails = []
+        for lead, draft in zip(leads, drafts):
+            if draft is None:
+                emails.append(template.render_email(lead))
+            else:
+                emails.append({"to": lead["email"], "subject": draft[0], "body": draft[1], "lead": lead})
+        return emails
+    
+    def write_batch(self, leads: Any, tone: str = "professional") -> List[Dict]:
+        """
+        Render emails for a whole lead table in one call.
+        Args:
+            leads: List of lead dicts, a dict of columns, or a pandas DataFrame
+            tone (str): Email tone
+        Returns:
+            List[Dict]: List of emails with subject and body
+        """
+        if self.dedup_index is not None:
+            leads = self.dedup_index.filter_unseen(iter_rows(leads))
+        return self.get_template(tone).render_batch(leads)
+    
+    def write_emails_sharded(self, leads: List[Dict], sink: Callable[[List[Dict]], Any],
+                             tone: str = "professional", chunk_size: int = 10000,
+                             workers: Optional[int] = None) -> int:
+        """
+        Render emails for a very large lead list on a process pool.
+        
+        Leads are split into chunks of ``chunk_size`` and rendered in worker
+        processes. Each chunk's emails are passed to ``sink`` (e.g. a bulk
+        storage write) as soon as it is ready, in lead order. At most two
+        chunks per worker are in flight, so memory is bounded by the chunk
+        size rather than the number of leads.
+        Args:
+            leads (List[Dict]): List of leads
+            sink (Callable): Called with each chunk of emails, in order
+            tone (str): Email tone
+            chunk_size (int): Leads per shard
+            workers (int): Worker processes (defaults to the CPU count)
+        Returns:
+            int: Number of emails written
+        """
+        if self.dedup_index is not None:
+            leads = self.dedup_index.filter_unseen(leads)
+        template = self.get_template(tone)
+        workers = workers or os.cpu_count() or 1
+        window = 2 * workers
+        written = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            starts = iter(range(0, len(leads), chunk_size))
+            
+            def submit_next() -> bool:
+                start = next(starts, None)
+                if start is None:
+                    return False
+                chunk = leads[start:start + chunk_size]
+                in_flight.append((chunk, executor.submit(_render_shard, template, chunk)))
+                return True
+            
+            while len(in_flight) < window and submit_next():
+                pass
+            while in_flight:
+                chunk, future = in_flight.popleft()
+                rendered = future.result()
+                submit_next()
+                sink([
+                    {"to": lead["email"], "subject": subject, "body": body, "lead": lead}
+                    for lead, (subject, body) in zip(chunk, rendered)
+                ])
+                written += len(chunk)
+        return written